@@ -1,7 +1,9 @@
 """
 Модуль запуска FastAPI приложения с управлением жизненным циклом
 подключения к базе данных. Для контроля раюоты приложения и
-взаимодействия с БД настроено логирование.
+взаимодействия с БД настроено логирование (неблокирующее, через очередь,
+с уровнем логирования, задаваемым для отдельного запроса) и сбор метрик
+производительности запросов (GET /metrics).
 """
 
 import logging
@@ -9,20 +11,20 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from app.db import DatabaseSingleton
+from app.routes.metrics_routes import router as metrics_router
 from app.routes.tasks_routes import router
+from app.utils.archiver import TASK_ARCHIVE_ENABLED, task_archiver
+from app.utils.cache import task_cache
+from app.utils.lease_reaper import TASK_LEASE_REAPER_ENABLED, lease_reaper
+from app.utils.logs import RequestLogLevelMiddleware, setup_logging
+from app.utils import tasks_utils
+from app.utils.metrics import MetricsMiddleware
+from app.utils.responses import FastJSONResponse
+from app.utils.task_events import TASK_EVENTS_ENABLED, task_events
 
 
 # Настройка логирования
-log_file_path = "app.log"
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file_path, encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 logger.info("Приложение запускается.")
@@ -33,21 +35,35 @@ async def lifespan(app: FastAPI):
     """
     Асинхронный контекстный менеджер, который управляет
     жизненным циклом подключения к БД в FastAPI приложении.
+    События об изменении задач из БД слушаются, только если их
+    отправляет хранилище (хранилище в памяти передает их само).
     """
-    db = DatabaseSingleton.get_db()
+    task_cache.clear()
     try:
-        await db.connect()
+        await tasks_utils.repository.connect()
         logger.info("Подключение к БД выполнено.")
+        if TASK_EVENTS_ENABLED and tasks_utils.repository.database_events:
+            await task_events.start()
+        if TASK_ARCHIVE_ENABLED:
+            await task_archiver.start()
+        if TASK_LEASE_REAPER_ENABLED:
+            await lease_reaper.start()
         yield
     except Exception as exc:
         logger.error(f"Ошибка подключения к БД: {exc}.")
         raise RuntimeError(f"Ошибка подключения к БД: {exc}.")
     finally:
-        await db.disconnect()
+        await lease_reaper.stop()
+        await task_archiver.stop()
+        await task_events.stop()
+        await tasks_utils.repository.disconnect()
         logger.info("Отключение от БД выполнено.")
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+app.add_middleware(RequestLogLevelMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 app.include_router(router)
+app.include_router(metrics_router)
@@ -1,15 +1,23 @@
 """
 Модуль с определением таблицы задач для Alembic-миграций.
 Содержит схему таблицы 'tasks' с колонками для UUID, названия,
-описания и статуса (Создано, В работе, Завершено).
+описания и статуса (Создано, В работе, Завершено), а также версии
+строки и времени последнего изменения (ведутся триггером в БД) и
+вычисляемого вектора полнотекстового поиска по названию и описанию,
+схему таблицы 'task_status_counts' со счетчиками задач по статусам
+(ведутся триггерами на таблице 'tasks'), а также схему таблицы
+'tasks_archive', в которую переносятся давно завершенные задачи.
 Используется для создания/обновления структуры базы данных в PostgreSQL.
 """
 
 import enum
 
 from sqlalchemy import Enum
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import Table, Column, MetaData, String, Text, text
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
+from sqlalchemy import (
+    BigInteger, Column, Computed, DateTime, Index, MetaData, SmallInteger,
+    String, Table, Text, text
+)
 
 
 metadata = MetaData()
@@ -30,12 +38,132 @@ tasks_table = Table(
         primary_key=True,
         server_default=text("gen_random_uuid()")
     ),
-    Column("name", String(256), nullable=False, index=True),
+    Column("name", String(256), nullable=False, index=True, unique=True),
     Column("description", Text),
     Column(
         "status",
         Enum(TaskStatus, name="taskstatus", create_type=False),
         nullable=False,
         default=TaskStatus.CREATED.value
+    ),
+    # Версия из последовательности tasks_version_seq, обновляется
+    # триггером при каждом изменении строки. Используется для ETag.
+    Column(
+        "version",
+        BigInteger,
+        nullable=False,
+        index=True,
+        server_default=text("nextval('tasks_version_seq')")
+    ),
+    Column(
+        "updated_at",
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=text("now()")
+    ),
+    # Аренда задачи обработчиком очереди (POST /tasks/claim): кто взял
+    # задачу в работу и до какого времени. Снимается триггером при
+    # смене статуса с "В работе" на другой.
+    Column("lease_owner", String(256)),
+    Column("lease_expires_at", DateTime(timezone=True)),
+    # Вектор для полнотекстового поиска: название (вес A) без морфологии,
+    # описание (вес B) со стеммингом русского языка.
+    Column(
+        "search_vector",
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(description, '')), "
+            "'B')",
+            persisted=True
+        )
+    ),
+    # Индексы для keyset-пагинации списка задач и фильтрации по статусу
+    # и префиксу названия.
+    Index("ix_tasks_name_uuid", "name", "uuid"),
+    Index("ix_tasks_status_name_uuid", "status", "name", "uuid"),
+    Index(
+        "ix_tasks_name_pattern",
+        "name",
+        postgresql_ops={"name": "varchar_pattern_ops"}
+    ),
+    # Частичные индексы по незавершенным задачам: они в разы меньше
+    # полных и не обновляются для завершенных задач. Используются
+    # списком задач с фильтром active (условие запроса должно совпадать
+    # с предикатом индекса).
+    Index(
+        "ix_tasks_active_name_uuid",
+        "name",
+        "uuid",
+        postgresql_where=text("status <> 'COMPLETED'")
+    ),
+    Index(
+        "ix_tasks_active_version",
+        "version",
+        postgresql_where=text("status <> 'COMPLETED'")
+    ),
+    # Поиск завершенных задач для переноса в архив.
+    Index(
+        "ix_tasks_completed_updated_at",
+        "updated_at",
+        postgresql_where=text("status = 'COMPLETED'")
+    ),
+    # Очередь задач для захвата обработчиками и поиск истекших аренд.
+    Index(
+        "ix_tasks_claimable",
+        "updated_at",
+        postgresql_where=text("status = 'CREATED'")
+    ),
+    Index(
+        "ix_tasks_lease_expires_at",
+        "lease_expires_at",
+        postgresql_where=text("status = 'IN_PROGRESS'")
+    ),
+    # GIN-индекс для поиска. Триграммный индекс ix_tasks_name_trgm
+    # создается миграцией, только если доступно расширение pg_trgm.
+    Index(
+        "ix_tasks_search_vector", "search_vector", postgresql_using="gin"
     )
 )
+
+
+# Число задач в каждом статусе хранится в нескольких строках (slot),
+# итог по статусу - сумма count по всем его строкам. Сумма changes -
+# число изменений задач статуса (версия списка задач для ETag).
+task_status_counts_table = Table(
+    "task_status_counts",
+    metadata,
+    Column(
+        "status",
+        Enum(TaskStatus, name="taskstatus", create_type=False),
+        primary_key=True
+    ),
+    Column("slot", SmallInteger, primary_key=True),
+    Column("count", BigInteger, nullable=False, server_default=text("0")),
+    Column("changes", BigInteger, nullable=False, server_default=text("0"))
+)
+
+
+# Архив завершенных задач. Название в архиве не уникально: после
+# переноса в архив задачу с тем же названием можно создать снова.
+tasks_archive_table = Table(
+    "tasks_archive",
+    metadata,
+    Column("uuid", UUID(as_uuid=False), primary_key=True),
+    Column("name", String(256), nullable=False),
+    Column("description", Text),
+    Column(
+        "status",
+        Enum(TaskStatus, name="taskstatus", create_type=False),
+        nullable=False
+    ),
+    Column("version", BigInteger, nullable=False),
+    Column("updated_at", DateTime(timezone=True), nullable=False),
+    Column(
+        "archived_at",
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=text("now()")
+    ),
+    Index("ix_tasks_archive_name_uuid", "name", "uuid")
+)
@@ -0,0 +1,87 @@
+"""
+Модуль служебных маршрутов FastAPI с метриками приложения.
+Определяет эндпоинты:
+    - метрики HTTP-запросов и запросов к БД в формате Prometheus
+    - метрики пула соединений с БД (занятость, ожидание соединений)
+      и состояние реплик для чтения
+    - метрики кэша задач (попадания, промахи, вытеснения), слушателя
+      событий об изменении задач и ленты событий для клиентов
+    - метрики архиватора завершенных задач и возврата в очередь задач
+      с истекшей арендой
+    - метрики очереди записей журнала (в том числе отброшенные записи)
+    - запросы к БД с наибольшим суммарным временем и планы медленных
+      запросов (журнал медленных запросов)
+Префикс маршрутов: /metrics.
+"""
+
+from fastapi import APIRouter, Query, Response
+from starlette import status
+
+from app.db import DatabaseSingleton
+from app.utils.archiver import task_archiver
+from app.utils.cache import task_cache
+from app.utils.lease_reaper import lease_reaper
+from app.utils.logs import setup_logging
+from app.utils.metrics import CONTENT_TYPE, render_metrics
+from app.utils.query_log import query_log
+from app.utils.task_events import task_events
+from app.utils.task_feed import task_feed
+
+
+router = APIRouter(prefix="/metrics")
+
+
+@router.get("")
+async def get_metrics() -> Response:
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+
+@router.get("/db")
+async def get_db_metrics() -> dict:
+    read_db = DatabaseSingleton.get_read_db()
+    return {
+        **DatabaseSingleton.get_db().pool_stats(),
+        "replicas": [
+            {**status, **replica.pool_stats()}
+            for status, replica in zip(read_db.status(), read_db.replicas)
+        ]
+    }
+
+
+@router.get("/cache")
+async def get_cache_metrics() -> dict:
+    return {
+        **task_cache.stats(),
+        "events": task_events.stats(),
+        "feed": task_feed.stats()
+    }
+
+
+@router.get("/archive")
+async def get_archive_metrics() -> dict:
+    return task_archiver.stats()
+
+
+@router.get("/leases")
+async def get_lease_metrics() -> dict:
+    return lease_reaper.stats()
+
+
+@router.get("/logs")
+async def get_log_metrics() -> dict:
+    return setup_logging().stats()
+
+
+@router.get("/queries")
+async def get_query_metrics(limit: int = Query(20, ge=1, le=1000)) -> dict:
+    return {**query_log.stats(), "top": query_log.top(limit)}
+
+
+@router.get("/queries/plans")
+async def get_query_plans() -> list[dict]:
+    return query_log.plans()
+
+
+@router.delete("/queries", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_query_metrics():
+    query_log.reset()
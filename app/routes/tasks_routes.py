@@ -1,62 +1,296 @@
 """
 Модуль маршрутов FastAPI для работы с задачами.
 Определяет REST API эндпоинты для CRUD операций над сущностью задачи:
-    - получение списка всех задач
+    - постраничное получение списка задач с фильтрами
+    - потоковая выгрузка всех задач
+    - поиск задач по названию и описанию
+    - число задач по статусам
+    - чтение архива завершенных задач
+    - захват задач обработчиками очереди, продление и освобождение
+      аренды задачи
+    - лента изменений задач (Server-Sent Events и long-poll)
     - получение задачи по имени
     - создание новой задачи
     - обновление существующей задачи
     - обновление или создание задачи по имени
     - удаление задачи по имени
+    - пакетные создание, изменение статуса и удаление задач
+Ответы с задачей и списком задач содержат ETag, поддерживаются условные
+запросы If-None-Match (ответ 304) и If-Match (ответ 412 при изменении
+задачи другим клиентом).
+Задачи, прочитанные из БД, не проходят повторную валидацию по
+response_model: ответы формируются напрямую из TaskBase.to_dict, а
+список задач - из строк БД, и кодируются через FastJSONResponse
+(response_model остается для документации OpenAPI).
 Использует вспомогательные функции из модуля task_utils для бизнес-логики.
 Префикс маршрутов: /tasks.
 """
 
-from typing import Optional
+from typing import Literal, Optional
 
 from starlette import status
-from fastapi import APIRouter, Body, Response
+from fastapi import APIRouter, Body, Header, Query, Response
+from fastapi.responses import StreamingResponse
 
-from app.utils import tasks_utils
-from app.schemas.tasks_schemas import TaskBase, TaskUpdate
+from app.models.tasks_model import TaskStatus
+from app.utils import task_feed, tasks_utils
+from app.utils.responses import FastJSONResponse
+from app.schemas.tasks_schemas import (
+    TaskBase, TaskBulkResult, TaskBulkUpdate, TaskLease, TaskUpdate
+)
 
 
 router = APIRouter(prefix="/tasks")
 
 
+def task_response(
+    task: TaskBase, status_code: int = status.HTTP_200_OK
+) -> FastJSONResponse:
+    """Ответ с задачей и ее ETag."""
+    return FastJSONResponse(
+        task.to_dict(), status_code=status_code, headers={"ETag": task.etag}
+    )
+
+
+def bulk_response(results: list[TaskBulkResult]) -> FastJSONResponse:
+    """Ответ с результатами пакетной операции."""
+    return FastJSONResponse([result.to_dict() for result in results])
+
+
+def lease_response(task_lease: TaskLease) -> FastJSONResponse:
+    """Ответ с арендой задачи и ETag задачи."""
+    return FastJSONResponse(
+        task_lease.to_dict(), headers={"ETag": task_lease.task.etag}
+    )
+
+
+def not_modified(etag: str) -> Response:
+    """Ответ 304 на условный запрос с совпавшим ETag."""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+    )
+
+
 @router.get("/", response_model=list[TaskBase])
-async def get_list() -> list[TaskBase]:
-    return await tasks_utils.get_all_tasks()
+async def get_list(
+    limit: int = Query(
+        tasks_utils.DEFAULT_PAGE_SIZE, ge=1, le=tasks_utils.MAX_PAGE_SIZE
+    ),
+    after: Optional[str] = None,
+    task_status: Optional[TaskStatus] = Query(None, alias="status"),
+    name_prefix: Optional[str] = Query(None, max_length=256),
+    active: bool = False,
+    if_none_match: Optional[str] = Header(None)
+) -> list[TaskBase]:
+    params = {
+        "limit": limit,
+        "after": after,
+        "task_status": task_status,
+        "name_prefix": name_prefix,
+        "active": active
+    }
+    async with tasks_utils.same_source():
+        etag = await tasks_utils.get_tasks_etag(**params)
+        if tasks_utils.etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        tasks, next_cursor = await tasks_utils.get_all_tasks(**params)
+    headers = {"ETag": etag}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    return FastJSONResponse(tasks, headers=headers)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_tasks(
+    export_format: Literal["ndjson", "json"] = Query(
+        "ndjson", alias="format"
+    )
+) -> StreamingResponse:
+    json_array = export_format == "json"
+    return StreamingResponse(
+        tasks_utils.export_tasks(json_array=json_array),
+        media_type="application/json" if json_array
+        else "application/x-ndjson"
+    )
+
+
+@router.get("/search", response_model=list[TaskBase])
+async def search_tasks(
+    q: str = Query(
+        ..., min_length=1, max_length=tasks_utils.SEARCH_MAX_QUERY_LENGTH
+    ),
+    limit: int = Query(
+        tasks_utils.DEFAULT_PAGE_SIZE, ge=1, le=tasks_utils.MAX_PAGE_SIZE
+    ),
+    after: Optional[str] = None,
+    task_status: Optional[TaskStatus] = Query(None, alias="status"),
+    active: bool = False
+) -> list[TaskBase]:
+    tasks, next_cursor = await tasks_utils.search_tasks(
+        q, limit, after, task_status, active
+    )
+    headers = {}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    return FastJSONResponse(tasks, headers=headers)
+
+
+@router.get("/stats")
+async def get_task_stats(verify: bool = False) -> dict:
+    return await tasks_utils.get_task_stats(verify=verify)
+
+
+@router.get("/archive", response_model=list[TaskBase])
+async def get_archive(
+    limit: int = Query(
+        tasks_utils.DEFAULT_PAGE_SIZE, ge=1, le=tasks_utils.MAX_PAGE_SIZE
+    ),
+    after: Optional[str] = None,
+    name_prefix: Optional[str] = Query(None, max_length=256)
+) -> list[TaskBase]:
+    tasks, next_cursor = await tasks_utils.get_archived_tasks(
+        limit, after, name_prefix
+    )
+    headers = {}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    return FastJSONResponse(tasks, headers=headers)
+
+
+@router.get("/events", response_class=StreamingResponse)
+async def task_events_stream(
+    names: Optional[list[str]] = Query(None, alias="name"),
+    last_event_id: Optional[str] = Header(None)
+) -> StreamingResponse:
+    return StreamingResponse(
+        task_feed.subscribe_events(names, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/events/poll")
+async def poll_task_events(
+    since: Optional[str] = None,
+    names: Optional[list[str]] = Query(None, alias="name"),
+    timeout: float = Query(25, ge=0, le=60)
+) -> dict:
+    return await task_feed.poll_events(since, names, timeout)
+
+
+@router.post("/bulk", response_model=list[TaskBulkResult])
+async def bulk_create_tasks(
+    tasks: list[TaskBase] = Body(
+        ..., min_length=1, max_length=tasks_utils.BULK_MAX_ITEMS
+    )
+) -> list[TaskBulkResult]:
+    return bulk_response(await tasks_utils.bulk_create_tasks(tasks))
+
+
+@router.patch("/bulk", response_model=list[TaskBulkResult])
+async def bulk_update_tasks(
+    tasks: list[TaskBulkUpdate] = Body(
+        ..., min_length=1, max_length=tasks_utils.BULK_MAX_ITEMS
+    )
+) -> list[TaskBulkResult]:
+    return bulk_response(await tasks_utils.bulk_modify_tasks(tasks))
+
+
+@router.delete("/bulk", response_model=list[TaskBulkResult])
+async def bulk_delete_tasks(
+    names: list[str] = Body(
+        ..., min_length=1, max_length=tasks_utils.BULK_MAX_ITEMS
+    )
+) -> list[TaskBulkResult]:
+    return bulk_response(await tasks_utils.bulk_remove_tasks(names))
+
+
+@router.post("/claim", response_model=list[TaskLease])
+async def claim_tasks(
+    worker: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(1, ge=1, le=tasks_utils.MAX_PAGE_SIZE),
+    lease: int = Query(
+        tasks_utils.TASK_LEASE_SECONDS,
+        ge=1,
+        le=tasks_utils.MAX_LEASE_SECONDS
+    )
+) -> list[TaskLease]:
+    leases = await tasks_utils.claim_tasks(worker, limit, lease)
+    return FastJSONResponse([task_lease.to_dict() for task_lease in leases])
 
 
 @router.get("/{name}", response_model=TaskBase)
-async def get_one_task(name: str) -> TaskBase:
-    return await tasks_utils.get_one_task(name=name)
+async def get_one_task(
+    name: str,
+    include_archived: bool = False,
+    if_none_match: Optional[str] = Header(None)
+) -> TaskBase:
+    task = await tasks_utils.get_one_task(
+        name=name, include_archived=include_archived
+    )
+    if tasks_utils.etag_matches(if_none_match, task.etag):
+        return not_modified(task.etag)
+    return task_response(task)
 
 
 @router.post(
     "/", response_model=TaskBase, status_code=status.HTTP_201_CREATED
 )
 async def create_task(task: TaskBase) -> TaskBase:
-    return await tasks_utils.create_task(task=task)
+    new_task = await tasks_utils.create_task(task=task)
+    return task_response(new_task, status.HTTP_201_CREATED)
 
 
 @router.patch("/{name}", response_model=TaskBase)
 async def update_task(
-    name: str, task: Optional[TaskUpdate] = Body(None)
+    name: str,
+    task: Optional[TaskUpdate] = Body(None),
+    if_match: Optional[str] = Header(None)
 ) -> TaskBase:
-    return await tasks_utils.task_modify(name, task)
+    new_task = await tasks_utils.task_modify(name, task, if_match)
+    return task_response(new_task)
 
 
 @router.put("/{name}", response_model=TaskBase)
 async def update_or_create_task(
-    name: str, response: Response, task: Optional[TaskBase] = Body(None)
+    name: str,
+    task: Optional[TaskBase] = Body(None),
+    if_match: Optional[str] = Header(None)
 ) -> TaskBase:
-    new_task, status_code = await tasks_utils.task_modify_or_create(name, task)
-    response.status_code = status_code
-    return new_task
+    new_task, status_code = await tasks_utils.task_modify_or_create(
+        name, task, if_match
+    )
+    return task_response(new_task, status_code)
 
 
 @router.delete("/{name}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_task(name: str) -> Response:
-    status_code = await tasks_utils.remove_task(name)
+async def delete_task(
+    name: str, if_match: Optional[str] = Header(None)
+) -> Response:
+    status_code = await tasks_utils.remove_task(name, if_match)
     return Response(status_code=status_code)
+
+
+@router.post("/{name}/lease", response_model=TaskLease)
+async def renew_lease(
+    name: str,
+    worker: str = Query(..., min_length=1, max_length=256),
+    lease: int = Query(
+        tasks_utils.TASK_LEASE_SECONDS,
+        ge=1,
+        le=tasks_utils.MAX_LEASE_SECONDS
+    )
+) -> TaskLease:
+    return lease_response(
+        await tasks_utils.renew_lease(name, worker, lease)
+    )
+
+
+@router.delete("/{name}/lease", response_model=TaskBase)
+async def release_task(
+    name: str,
+    worker: str = Query(..., min_length=1, max_length=256),
+    task_status: TaskStatus = Query(TaskStatus.CREATED, alias="status")
+) -> TaskBase:
+    task = await tasks_utils.release_task(name, worker, task_status)
+    return task_response(task)
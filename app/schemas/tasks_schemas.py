@@ -1,14 +1,21 @@
 """
 Модуль с Pydantic мщделями для работы с задачами.
 Содержит базовую модель задачи (TaskBase), модель для создания
-задачи (TaskCreate) и модель для обновления задачи (TaskCreate).
+задачи (TaskCreate) и модель для обновления задачи (TaskCreate),
+а также модели для пакетных операций над задачами и аренды задач
+обработчиками очереди.
 Модели обеспечивают валидацию данных, ограничения длины полей,
 дефолтные значения, конвертацию UUID в строковый формат.
+Задачи, прочитанные из БД, создаются без повторной валидации
+(TaskBase.from_row) и отдаются в ответ через TaskBase.to_dict.
 """
 
-from typing import Optional
+from datetime import datetime
+from typing import Mapping, Optional
 
-from pydantic import BaseModel, UUID4, field_validator, Field, ConfigDict
+from pydantic import (
+    BaseModel, UUID4, field_validator, Field, ConfigDict, PrivateAttr
+)
 
 from app.models.tasks_model import TaskStatus
 
@@ -19,6 +26,7 @@ class TaskBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=256)
     description: Optional[str] = None
     status: TaskStatus = Field(default=TaskStatus.CREATED)
+    _version: Optional[int] = PrivateAttr(default=None)
 
     @field_validator("uuid")
     def convert_uuid_to_hex(cls, value):
@@ -30,6 +38,37 @@ class TaskBase(BaseModel):
         populate_by_name=True, extra="forbid"
     )
 
+    @classmethod
+    def from_row(cls, row: Mapping) -> "TaskBase":
+        """
+        Создает задачу из строки таблицы tasks без валидации (данные из БД
+        уже соответствуют схеме) и сохраняет версию строки.
+        """
+        task = cls.model_construct(
+            uuid=str(row["uuid"]).replace("-", ""),
+            name=row["name"],
+            description=row["description"],
+            status=row["status"]
+        )
+        task._version = row["version"]
+        return task
+
+    def to_dict(self) -> dict:
+        """Возвращает задачу в виде словаря для JSON-ответа."""
+        return {
+            "uuid": self.uuid,
+            "name": self.name,
+            "description": self.description,
+            "status": self.status.value
+        }
+
+    @property
+    def etag(self) -> Optional[str]:
+        """Строгий ETag задачи: uuid и версия строки."""
+        if self._version is None:
+            return None
+        return f'"{self.uuid}-{self._version}"'
+
 
 class TaskUpdate(BaseModel):
     """Модель для изменения задачи."""
@@ -38,3 +77,53 @@ class TaskUpdate(BaseModel):
     status: Optional[TaskStatus] = None
 
     model_config = ConfigDict(extra="forbid")
+
+
+class TaskBulkUpdate(BaseModel):
+    """Модель элемента пакетного изменения задач."""
+    name: str = Field(..., min_length=1, max_length=256)
+    description: Optional[str] = None
+    status: Optional[TaskStatus] = None
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class TaskBulkResult(BaseModel):
+    """Результат пакетной операции для одной задачи."""
+    name: str
+    status_code: int
+    task: Optional[TaskBase] = None
+    detail: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        """Возвращает результат в виде словаря для JSON-ответа."""
+        return {
+            "name": self.name,
+            "status_code": self.status_code,
+            "task": self.task.to_dict() if self.task is not None else None,
+            "detail": self.detail
+        }
+
+
+class TaskLease(BaseModel):
+    """Задача, взятая в работу обработчиком, и срок ее аренды."""
+    task: TaskBase
+    lease_owner: str
+    lease_expires_at: datetime
+
+    @classmethod
+    def from_row(cls, row: Mapping) -> "TaskLease":
+        """Создает аренду из строки таблицы tasks без валидации."""
+        return cls.model_construct(
+            task=TaskBase.from_row(row),
+            lease_owner=row["lease_owner"],
+            lease_expires_at=row["lease_expires_at"]
+        )
+
+    def to_dict(self) -> dict:
+        """Возвращает аренду в виде словаря для JSON-ответа."""
+        return {
+            "task": self.task.to_dict(),
+            "lease_owner": self.lease_owner,
+            "lease_expires_at": self.lease_expires_at.isoformat()
+        }
@@ -0,0 +1,25 @@
+"""
+Содержит хранилища задач.
+Хранилище выбирается переменной окружения STORAGE_BACKEND:
+postgres (по умолчанию) - PostgreSQL, memory - память процесса (для
+тестов и бенчмарков без БД). Модуль хранилища импортируется только при
+создании, поэтому хранилище в памяти не подключается к БД.
+"""
+
+import os
+
+from app.storage.base import TaskRepository
+
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "postgres").lower()
+
+
+def create_repository(backend: str = STORAGE_BACKEND) -> TaskRepository:
+    """Создает хранилище задач по названию backend."""
+    if backend == "postgres":
+        from app.storage.postgres import PostgresTaskRepository
+        return PostgresTaskRepository()
+    if backend == "memory":
+        from app.storage.memory import MemoryTaskRepository
+        return MemoryTaskRepository()
+    raise ValueError(f"Неизвестное хранилище задач: {backend}.")
@@ -0,0 +1,233 @@
+"""
+Модуль интерфейса хранилища задач.
+'TaskRepository' описывает операции с задачами на уровне хранилища:
+функции tasks_utils строят из них бизнес-логику (ошибки HTTP, кэш,
+курсоры, ETag) и не зависят от того, где хранятся задачи.
+Методы возвращают строки задач - отображения с ключами uuid, name,
+description, status (TaskStatus) и version, для аренды также
+lease_owner и lease_expires_at, для поиска - rank. Строки передаются
+в TaskBase.from_row, TaskLease.from_row и task_row_to_dict.
+Ограничение limit в методах списков - число возвращаемых строк:
+чтобы узнать, есть ли следующая страница, вызывающий запрашивает на
+одну строку больше.
+"""
+
+from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from typing import AsyncContextManager, AsyncIterator, Mapping, Optional
+
+from app.models.tasks_model import TaskStatus
+
+
+Row = Mapping
+
+
+class TaskExistsError(Exception):
+    """Задача с таким названием уже существует."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.name = name
+
+
+class TaskRepository(ABC):
+    """Хранилище задач."""
+
+    # Отправляет ли БД события об изменении задач (LISTEN/NOTIFY). Иначе
+    # хранилище передает их в task_events.dispatch само.
+    database_events = False
+
+    async def connect(self):
+        """Подключается к хранилищу при запуске приложения."""
+
+    async def disconnect(self):
+        """Отключается от хранилища при остановке приложения."""
+
+    def same_source(self) -> AsyncContextManager:
+        """
+        Контекст, в котором чтения идут из одного источника данных (для
+        хранилища с репликами - из одной реплики), чтобы их результаты
+        были сопоставимы.
+        """
+        return nullcontext()
+
+    @abstractmethod
+    async def get(self, name: str, replica: bool = False) -> Optional[Row]:
+        """
+        Возвращает задачу по названию. При replica=True чтение может
+        идти с реплики.
+        """
+
+    @abstractmethod
+    async def exists(self, name: str) -> bool:
+        """Есть ли задача с таким названием (чтение с основной БД)."""
+
+    @abstractmethod
+    async def list_tasks(
+        self,
+        limit: int,
+        after: Optional[tuple] = None,
+        task_status: Optional[TaskStatus] = None,
+        name_prefix: Optional[str] = None,
+        active: bool = False
+    ) -> list[Row]:
+        """
+        Возвращает задачи, упорядоченные по (name, uuid), после позиции
+        after = (name, uuid). При active=True - только незавершенные.
+        """
+
+    @abstractmethod
+    async def list_version(
+        self,
+        task_status: Optional[TaskStatus] = None,
+        name_prefix: Optional[str] = None,
+        active: bool = False
+    ) -> tuple[int, int]:
+        """
+        Возвращает число подходящих под фильтры задач и версию, которая
+        меняется при любом изменении этих задач (для ETag списка). Число
+        и версия могут учитывать и задачи, не подходящие под фильтр по
+        префиксу названия.
+        """
+
+    @abstractmethod
+    async def search(
+        self,
+        q: str,
+        limit: int,
+        after: Optional[tuple] = None,
+        task_status: Optional[TaskStatus] = None,
+        active: bool = False
+    ) -> list[Row]:
+        """
+        Ищет задачи по названию и описанию. Строки содержат rank
+        (релевантность) и упорядочены по (-rank, name, uuid), позиция
+        after = (rank, name, uuid).
+        """
+
+    @abstractmethod
+    async def status_counts(
+        self, verify: bool = False
+    ) -> dict[str, dict[TaskStatus, int]]:
+        """
+        Возвращает число задач по статусам: в поле counters - из
+        счетчиков, при verify=True в поле actual - подсчитанное по
+        самим задачам.
+        """
+
+    @abstractmethod
+    def iterate(self) -> AsyncIterator[Row]:
+        """Потоково перебирает все задачи."""
+
+    @abstractmethod
+    async def get_archived(self, name: str) -> Optional[Row]:
+        """Возвращает последнюю перенесенную в архив задачу с названием."""
+
+    @abstractmethod
+    async def list_archived(
+        self,
+        limit: int,
+        after: Optional[tuple] = None,
+        name_prefix: Optional[str] = None
+    ) -> list[Row]:
+        """Возвращает задачи из архива, упорядоченные по (name, uuid)."""
+
+    @abstractmethod
+    async def archive_completed(
+        self, age: float, batch_size: int
+    ) -> list[str]:
+        """
+        Переносит в архив до batch_size завершенных задач, не менявшихся
+        дольше age секунд. Возвращает их названия.
+        """
+
+    @abstractmethod
+    async def create(
+        self, name: str, description: Optional[str], task_status: TaskStatus
+    ) -> Optional[Row]:
+        """Создает задачу. Возвращает None, если название занято."""
+
+    @abstractmethod
+    async def update(
+        self,
+        name: str,
+        changes: dict,
+        etags: Optional[list[tuple[str, int]]] = None
+    ) -> Optional[Row]:
+        """
+        Изменяет поля changes (name, description, status) задачи, при
+        заданных etags - только если пара (uuid без дефисов, версия
+        строки) среди них.
+        Возвращает None, если задача не изменена. Вызывает
+        TaskExistsError, если новое название занято.
+        """
+
+    @abstractmethod
+    async def upsert(self, name: str, changes: dict) -> tuple[Row, bool]:
+        """
+        Изменяет поля changes задачи name или создает ее (статус по
+        умолчанию "Создано"). Возвращает строку и признак создания.
+        """
+
+    @abstractmethod
+    async def delete(
+        self, name: str, etags: Optional[list[tuple[str, int]]] = None
+    ) -> bool:
+        """
+        Удаляет задачу (при заданных etags - только с этими uuid и
+        версией строки).
+        """
+
+    @abstractmethod
+    async def bulk_create(
+        self, tasks: list[tuple[str, Optional[str], TaskStatus]]
+    ) -> list[Row]:
+        """
+        Создает задачи (название, описание, статус) в одной транзакции.
+        Возвращает созданные, занятые названия пропускаются (для повторно
+        указанной задачи создается первое вхождение).
+        """
+
+    @abstractmethod
+    async def bulk_update(
+        self,
+        changes: list[tuple[str, Optional[str], Optional[TaskStatus]]]
+    ) -> list[Row]:
+        """
+        Изменяет описание и статус задач (None - не менять) в одной
+        транзакции. Для повторно указанной задачи применяются последние
+        значения. Возвращает измененные задачи, каждую один раз.
+        """
+
+    @abstractmethod
+    async def bulk_delete(self, names: list[str]) -> set[str]:
+        """Удаляет задачи в одной транзакции, возвращает их названия."""
+
+    @abstractmethod
+    async def claim(self, worker: str, limit: int, lease: int) -> list[Row]:
+        """
+        Переводит в работу до limit задач в статусе "Создано" (в порядке
+        последнего изменения) с арендой worker на lease секунд.
+        """
+
+    @abstractmethod
+    async def renew_lease(
+        self, name: str, worker: str, lease: int
+    ) -> Optional[Row]:
+        """Продлевает неистекшую аренду worker на lease секунд."""
+
+    @abstractmethod
+    async def release(
+        self, name: str, worker: str, task_status: TaskStatus
+    ) -> Optional[Row]:
+        """
+        Снимает неистекшую аренду worker и переводит задачу
+        в task_status.
+        """
+
+    @abstractmethod
+    async def reap_expired_leases(self, batch_size: int) -> list[str]:
+        """
+        Возвращает в статус "Создано" до batch_size задач с истекшей
+        арендой. Возвращает их названия.
+        """
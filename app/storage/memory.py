@@ -0,0 +1,481 @@
+"""
+Модуль хранилища задач в памяти процесса.
+'MemoryTaskRepository' повторяет поведение хранилища в PostgreSQL без
+БД: задачи хранятся в словаре по названию, а для списков поддерживаются
+отсортированные индексы (name, uuid) - общий и по каждому статусу,
+поэтому страница списка и ETag списка выбираются бинарным поиском
+без перебора всех задач. Названия упорядочены по кодам символов (как
+COLLATE "C"), а списки PostgreSQL - по правилам сортировки БД, поэтому
+для названий не из ASCII порядок хранилищ может различаться. Задачи
+в статусе "Создано" хранятся в очереди в порядке последнего изменения
+(для захвата обработчиками).
+Версии строк, снятие аренды при смене статуса и события об изменении
+задач (передаются обработчикам task_events, как уведомления из БД)
+ведутся самим хранилищем. Поиск - по подстрокам названия и описания
+перебором задач, без полнотекстового индекса.
+Хранилище предназначено для тестов и бенчмарков HTTP-слоя
+(STORAGE_BACKEND=memory): данные не переживают перезапуск процесса
+и не разделяются между воркерами.
+"""
+
+import heapq
+import sys
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator, Optional
+
+from app.models.tasks_model import TaskStatus
+from app.storage.base import Row, TaskExistsError, TaskRepository
+from app.utils.task_events import task_events
+
+
+Key = tuple[str, uuid.UUID]
+
+
+def now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def position(after: Optional[tuple]) -> Optional[Key]:
+    """Позиция курсора (name, uuid) в ключ индекса."""
+    if after is None:
+        return None
+    name, task_uuid = after
+    return name, uuid.UUID(str(task_uuid))
+
+
+def prefix_end(prefix: str) -> Optional[tuple[str]]:
+    """
+    Ключ, с которого начинаются названия больше всех с префиксом, или
+    None, если таких названий нет (префикс из символов U+10FFFF).
+    """
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    return (prefix[:-1] + chr(ord(prefix[-1]) + 1),)
+
+
+def index_range(
+    index: list[Key],
+    after: Optional[Key] = None,
+    name_prefix: Optional[str] = None
+) -> tuple[int, int]:
+    """Границы ключей индекса после after с префиксом name_prefix."""
+    start, stop = 0, len(index)
+    if name_prefix:
+        start = bisect_left(index, (name_prefix,))
+        end = prefix_end(name_prefix)
+        if end is not None:
+            stop = bisect_left(index, end)
+    if after is not None:
+        start = max(start, bisect_right(index, after))
+    return start, stop
+
+
+def keys_between(index: list[Key], start: int, stop: int) -> Iterator[Key]:
+    """Перебирает ключи индекса с позиции start до stop без копирования."""
+    for i in range(start, stop):
+        yield index[i]
+
+
+class MemoryTaskRepository(TaskRepository):
+    """Хранилище задач в памяти процесса."""
+
+    database_events = False
+
+    def __init__(self):
+        self._tasks: dict[str, dict] = {}
+        self._index: list[Key] = []
+        self._status_index: dict[TaskStatus, list[Key]] = {
+            task_status: [] for task_status in TaskStatus
+        }
+        # Задачи в статусе "Создано" в порядке последнего изменения.
+        self._queue: dict[str, None] = {}
+        self._archive: dict[uuid.UUID, dict] = {}
+        self._archive_index: list[Key] = []
+        self._version = 0
+        self._changes = 0
+
+    @staticmethod
+    def _key(record: dict) -> Key:
+        return record["name"], record["uuid"]
+
+    def _add(self, record: dict):
+        self._tasks[record["name"]] = record
+        key = self._key(record)
+        insort(self._index, key)
+        insort(self._status_index[record["status"]], key)
+        if record["status"] == TaskStatus.CREATED:
+            self._queue[record["name"]] = None
+
+    def _remove(self, record: dict):
+        del self._tasks[record["name"]]
+        key = self._key(record)
+        for index in (self._index, self._status_index[record["status"]]):
+            del index[bisect_left(index, key)]
+        self._queue.pop(record["name"], None)
+
+    def _notify(self, op: str, record: dict, old_name: Optional[str] = None):
+        """Передает событие об изменении задачи обработчикам task_events."""
+        self._changes += 1
+        event = {"op": op, "name": record["name"]}
+        if op == "update":
+            event["old_name"] = old_name
+        event.update(version=self._changes, status=record["status"].name)
+        task_events.dispatch(event)
+
+    def _insert(
+        self, name: str, description: Optional[str], task_status: TaskStatus
+    ) -> dict:
+        self._version += 1
+        record = {
+            "uuid": uuid.uuid4(),
+            "name": name,
+            "description": description,
+            "status": task_status,
+            "version": self._version,
+            "updated_at": now(),
+            "lease_owner": None,
+            "lease_expires_at": None,
+        }
+        self._add(record)
+        self._notify("insert", record)
+        return record
+
+    def _apply(self, record: dict, changes: dict) -> dict:
+        """
+        Изменяет поля задачи. Как и триггеры в БД, меняет версию и время
+        изменения, только если поля изменились, и снимает аренду, если
+        задача больше не в работе.
+        """
+        new_name = changes.get("name", record["name"])
+        if new_name != record["name"] and new_name in self._tasks:
+            raise TaskExistsError(new_name)
+        changed = {
+            key: value for key, value in changes.items()
+            if record[key] != value
+        }
+        new_status = changed.get("status", TaskStatus.IN_PROGRESS)
+        if new_status != TaskStatus.IN_PROGRESS:
+            changed.update(lease_owner=None, lease_expires_at=None)
+        if not changed:
+            return record
+        old_name = record["name"]
+        self._remove(record)
+        record.update(changed)
+        self._version += 1
+        record.update(version=self._version, updated_at=now())
+        self._add(record)
+        self._notify("update", record, old_name)
+        return record
+
+    def _delete(self, record: dict):
+        self._remove(record)
+        self._notify("delete", record)
+
+    @staticmethod
+    def _etag_in(
+        record: dict, etags: Optional[list[tuple[str, int]]]
+    ) -> bool:
+        """Совпадают ли uuid и версия задачи с одной из пар etags."""
+        if etags is None:
+            return True
+        return (record["uuid"].hex, record["version"]) in etags
+
+    def _matches(
+        self, task_status: Optional[TaskStatus], active: bool
+    ) -> list[list[Key]]:
+        """Индексы, из которых выбираются задачи с фильтрами."""
+        if task_status is not None:
+            if active and task_status == TaskStatus.COMPLETED:
+                return []
+            return [self._status_index[task_status]]
+        if active:
+            return [
+                self._status_index[TaskStatus.CREATED],
+                self._status_index[TaskStatus.IN_PROGRESS],
+            ]
+        return [self._index]
+
+    def _select(
+        self,
+        indexes: Iterable[list[Key]],
+        after: Optional[Key],
+        name_prefix: Optional[str]
+    ) -> Iterator[Key]:
+        """Ключи нескольких индексов в общем порядке (name, uuid)."""
+        return heapq.merge(*(
+            keys_between(index, *index_range(index, after, name_prefix))
+            for index in indexes
+        ))
+
+    async def get(self, name: str, replica: bool = False) -> Optional[Row]:
+        record = self._tasks.get(name)
+        return dict(record) if record is not None else None
+
+    async def exists(self, name: str) -> bool:
+        return name in self._tasks
+
+    async def list_tasks(
+        self,
+        limit: int,
+        after: Optional[tuple] = None,
+        task_status: Optional[TaskStatus] = None,
+        name_prefix: Optional[str] = None,
+        active: bool = False
+    ) -> list[Row]:
+        keys = self._select(
+            self._matches(task_status, active),
+            position(after),
+            name_prefix
+        )
+        return [dict(self._tasks[name]) for name, _ in islice(keys, limit)]
+
+    async def list_version(
+        self,
+        task_status: Optional[TaskStatus] = None,
+        name_prefix: Optional[str] = None,
+        active: bool = False
+    ) -> tuple[int, int]:
+        """Версия - номер последнего изменения любой задачи."""
+        count = 0
+        for index in self._matches(task_status, active):
+            start, stop = index_range(index, name_prefix=name_prefix)
+            count += stop - start
+        return count, self._changes
+
+    async def search(
+        self,
+        q: str,
+        limit: int,
+        after: Optional[tuple] = None,
+        task_status: Optional[TaskStatus] = None,
+        active: bool = False
+    ) -> list[Row]:
+        """
+        Задача найдена, если все слова запроса входят в название или
+        описание. Релевантность 1 - все слова в названии, иначе 0.5.
+        """
+        words = q.lower().split()
+        found = []
+        for key in self._select(
+            self._matches(task_status, active), None, None
+        ):
+            record = self._tasks[key[0]]
+            name = record["name"].lower()
+            text = f"{name} {(record['description'] or '').lower()}"
+            if not all(word in text for word in words):
+                continue
+            rank = 1.0 if all(word in name for word in words) else 0.5
+            found.append(((-rank, *key), record))
+        found.sort(key=lambda item: item[0])
+        if after is not None:
+            last = (-float(after[0]), *position(after[1:]))
+            found = [item for item in found if item[0] > last]
+        return [
+            {**record, "rank": -order[0]} for order, record in found[:limit]
+        ]
+
+    async def status_counts(
+        self, verify: bool = False
+    ) -> dict[str, dict[TaskStatus, int]]:
+        counts = {"counters": {
+            task_status: len(index)
+            for task_status, index in self._status_index.items()
+        }}
+        if verify:
+            actual = dict.fromkeys(TaskStatus, 0)
+            for record in self._tasks.values():
+                actual[record["status"]] += 1
+            counts["actual"] = actual
+        return counts
+
+    async def iterate(self) -> AsyncIterator[Row]:
+        """Задачи перебираются по снимку индекса на момент начала."""
+        for name, _ in list(self._index):
+            record = self._tasks.get(name)
+            if record is not None:
+                yield dict(record)
+
+    async def get_archived(self, name: str) -> Optional[Row]:
+        index = self._archive_index
+        records = []
+        for i in range(bisect_left(index, (name,)), len(index)):
+            archived_name, task_uuid = index[i]
+            if archived_name != name:
+                break
+            records.append(self._archive[task_uuid])
+        if not records:
+            return None
+        return dict(max(records, key=lambda record: record["archived_at"]))
+
+    async def list_archived(
+        self,
+        limit: int,
+        after: Optional[tuple] = None,
+        name_prefix: Optional[str] = None
+    ) -> list[Row]:
+        start, stop = index_range(
+            self._archive_index, position(after), name_prefix
+        )
+        return [
+            dict(self._archive[task_uuid])
+            for _, task_uuid in self._archive_index[start:min(
+                stop, start + limit
+            )]
+        ]
+
+    async def archive_completed(
+        self, age: float, batch_size: int
+    ) -> list[str]:
+        archive_before = now() - timedelta(seconds=age)
+        records = sorted(
+            (
+                self._tasks[name]
+                for name, _ in self._status_index[TaskStatus.COMPLETED]
+                if self._tasks[name]["updated_at"] < archive_before
+            ),
+            key=lambda record: record["updated_at"]
+        )[:batch_size]
+        archived_at = now()
+        for record in records:
+            self._delete(record)
+            self._archive[record["uuid"]] = {
+                key: record[key] for key in (
+                    "uuid", "name", "description", "status", "version",
+                    "updated_at"
+                )
+            } | {"archived_at": archived_at}
+            insort(self._archive_index, self._key(record))
+        return [record["name"] for record in records]
+
+    async def create(
+        self, name: str, description: Optional[str], task_status: TaskStatus
+    ) -> Optional[Row]:
+        if name in self._tasks:
+            return None
+        return dict(self._insert(name, description, task_status))
+
+    async def update(
+        self,
+        name: str,
+        changes: dict,
+        etags: Optional[list[tuple[str, int]]] = None
+    ) -> Optional[Row]:
+        record = self._tasks.get(name)
+        if record is None or not self._etag_in(record, etags):
+            return None
+        return dict(self._apply(record, changes))
+
+    async def upsert(self, name: str, changes: dict) -> tuple[Row, bool]:
+        record = self._tasks.get(name)
+        if record is not None:
+            return dict(self._apply(record, changes)), False
+        record = self._insert(
+            name,
+            changes.get("description"),
+            changes.get("status", TaskStatus.CREATED)
+        )
+        return dict(record), True
+
+    async def delete(
+        self, name: str, etags: Optional[list[tuple[str, int]]] = None
+    ) -> bool:
+        record = self._tasks.get(name)
+        if record is None or not self._etag_in(record, etags):
+            return False
+        self._delete(record)
+        return True
+
+    async def bulk_create(
+        self, tasks: list[tuple[str, Optional[str], TaskStatus]]
+    ) -> list[Row]:
+        return [
+            dict(self._insert(name, description, task_status))
+            for name, description, task_status in tasks
+            if name not in self._tasks
+        ]
+
+    async def bulk_update(
+        self,
+        changes: list[tuple[str, Optional[str], Optional[TaskStatus]]]
+    ) -> list[Row]:
+        rows = []
+        changes = {change[0]: change for change in changes}.values()
+        for name, description, task_status in changes:
+            record = self._tasks.get(name)
+            if record is None:
+                continue
+            fields = {"description": description, "status": task_status}
+            rows.append(dict(self._apply(record, {
+                key: value for key, value in fields.items()
+                if value is not None
+            })))
+        return rows
+
+    async def bulk_delete(self, names: list[str]) -> set[str]:
+        deleted = set()
+        for name in names:
+            record = self._tasks.get(name)
+            if record is not None:
+                self._delete(record)
+                deleted.add(name)
+        return deleted
+
+    async def claim(self, worker: str, limit: int, lease: int) -> list[Row]:
+        rows = []
+        for name in list(islice(self._queue, limit)):
+            record = self._apply(
+                self._tasks[name], {"status": TaskStatus.IN_PROGRESS}
+            )
+            record.update(
+                lease_owner=worker,
+                lease_expires_at=now() + timedelta(seconds=lease)
+            )
+            rows.append(dict(record))
+        return rows
+
+    def _leased(self, name: str, worker: str) -> Optional[dict]:
+        """Задача в работе с неистекшей арендой worker."""
+        record = self._tasks.get(name)
+        if record is None or record["status"] != TaskStatus.IN_PROGRESS:
+            return None
+        if record["lease_owner"] != worker:
+            return None
+        if record["lease_expires_at"] <= now():
+            return None
+        return record
+
+    async def renew_lease(
+        self, name: str, worker: str, lease: int
+    ) -> Optional[Row]:
+        record = self._leased(name, worker)
+        if record is None:
+            return None
+        record = self._apply(
+            record, {"lease_expires_at": now() + timedelta(seconds=lease)}
+        )
+        return dict(record)
+
+    async def release(
+        self, name: str, worker: str, task_status: TaskStatus
+    ) -> Optional[Row]:
+        record = self._leased(name, worker)
+        if record is None:
+            return None
+        return dict(self._apply(record, {"status": task_status}))
+
+    async def reap_expired_leases(self, batch_size: int) -> list[str]:
+        current = now()
+        records = []
+        for name, _ in self._status_index[TaskStatus.IN_PROGRESS]:
+            record = self._tasks[name]
+            expires_at = record["lease_expires_at"]
+            if expires_at is not None and expires_at < current:
+                records.append(record)
+        records.sort(key=lambda record: record["lease_expires_at"])
+        for record in records[:batch_size]:
+            self._apply(record, {"status": TaskStatus.CREATED})
+        return [record["name"] for record in records[:batch_size]]
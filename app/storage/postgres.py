@@ -0,0 +1,591 @@
+"""
+Модуль хранилища задач в PostgreSQL.
+'PostgresTaskRepository' выполняет операции с задачами запросами
+SQLAlchemy Core через Singleton-класс подключения к БД: чтение списков,
+поиска, статистики и задачи по имени может идти через реплики, запись -
+только в основную БД. Каждая операция - один запрос (пакетные операции -
+пачки запросов по BULK_BATCH_SIZE строк в одной транзакции), проверки
+на дубликаты и версии строк выполняются в самих запросах (ON CONFLICT,
+условия WHERE), а выборки в очередь и в архив - с FOR UPDATE SKIP LOCKED.
+Версии строк, счетчики статусов, снятие аренды и уведомления об
+изменении задач ведут триггеры на таблице tasks.
+"""
+
+import os
+from datetime import timedelta
+from typing import AsyncIterator, Iterator, Optional, Sequence
+
+from asyncpg.exceptions import UniqueViolationError
+from sqlalchemy import (
+    Interval, String, Text, any_, bindparam, cast, column, exists, func,
+    literal_column, select, table, tuple_, values
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
+from app.db import DatabaseSingleton
+from app.models.tasks_model import (
+    task_status_counts_table, tasks_archive_table, tasks_table, TaskStatus
+)
+from app.storage.base import Row, TaskExistsError, TaskRepository
+
+
+db = DatabaseSingleton()
+read_db = DatabaseSingleton.get_read_db()
+
+# Размер пачки строк в одном запросе пакетных операций.
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+
+# Колонки, которые отдаются в ответе со списком задач.
+TASK_COLUMNS = (
+    tasks_table.c.uuid,
+    tasks_table.c.name,
+    tasks_table.c.description,
+    tasks_table.c.status,
+)
+# Колонки для TaskBase.from_row (без служебного search_vector).
+TASK_ROW_COLUMNS = (*TASK_COLUMNS, tasks_table.c.version)
+# Колонки для TaskLease.from_row.
+TASK_LEASE_COLUMNS = (
+    *TASK_ROW_COLUMNS,
+    tasks_table.c.lease_owner,
+    tasks_table.c.lease_expires_at
+)
+ARCHIVE_COLUMNS = (
+    "uuid", "name", "description", "status", "version", "updated_at"
+)
+
+
+def chunked(items: Sequence, size: int) -> Iterator:
+    """Разбивает последовательность на пачки заданного размера."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def names_param(names: Sequence[str]):
+    """Параметр запроса со списком названий задач."""
+    return bindparam("names", list(names), type_=ARRAY(String))
+
+
+def lock_tasks(names: Sequence[str]):
+    """
+    Запрос, блокирующий строки задач names в порядке названий (побайтово,
+    как sorted в Python). Пакетные изменения блокируют строки этим
+    запросом до изменения, поэтому параллельные пакеты с общими задачами
+    ждут друг друга, а не взаимоблокируются.
+    """
+    return select(tasks_table.c.name).where(
+        tasks_table.c.name == any_(names_param(names))
+    ).order_by(tasks_table.c.name.collate("C")).with_for_update()
+
+
+def status_values(changes: dict) -> dict:
+    """Заменяет статус в изменяемых полях на имя члена TaskStatus."""
+    return {
+        key: value.name if key == "status" else value
+        for key, value in changes.items()
+    }
+
+
+def where_etag_in(query, etags: Optional[list[tuple[str, int]]]):
+    """Добавляет к запросу условие на uuid и версию строки."""
+    if etags is None:
+        return query
+    return query.where(
+        tuple_(tasks_table.c.uuid, tasks_table.c.version).in_(etags)
+    )
+
+
+def filter_tasks(
+    query,
+    task_status: Optional[TaskStatus] = None,
+    name_prefix: Optional[str] = None,
+    active: bool = False
+):
+    """
+    Добавляет к запросу фильтры списка задач.
+    При active=True остаются только незавершенные задачи: условие
+    записано литералом, как предикат частичных индексов ix_tasks_active_*,
+    чтобы планировщик выбирал их и для подготовленных запросов.
+    """
+    if task_status is not None:
+        query = query.where(tasks_table.c.status == task_status.name)
+    if active:
+        query = query.where(
+            tasks_table.c.status != literal_column("'COMPLETED'")
+        )
+    if name_prefix:
+        query = query.where(
+            tasks_table.c.name.startswith(name_prefix, autoescape=True)
+        )
+    return query
+
+
+def lease_until(seconds: int):
+    """Выражение времени окончания аренды, отсчитанного от now() в БД."""
+    return func.now() + cast(timedelta(seconds=seconds), Interval)
+
+
+def archive_batch_query(age: float, batch_size: int):
+    """
+    Запрос переноса одной пачки задач в архив: строки выбираются
+    с FOR UPDATE SKIP LOCKED, удаляются из tasks и вставляются в
+    tasks_archive одним запросом. Возвращает названия перенесенных задач.
+    """
+    archive_before = func.now() - cast(timedelta(seconds=age), Interval)
+    batch = select(tasks_table.c.uuid).where(
+        tasks_table.c.status == literal_column("'COMPLETED'"),
+        tasks_table.c.updated_at < archive_before
+    ).order_by(
+        tasks_table.c.updated_at
+    ).limit(batch_size).with_for_update(skip_locked=True).cte("batch")
+    moved = tasks_table.delete().where(
+        tasks_table.c.uuid == batch.c.uuid
+    ).returning(
+        *(tasks_table.c[name] for name in ARCHIVE_COLUMNS)
+    ).cte("moved")
+    return tasks_archive_table.insert().from_select(
+        ARCHIVE_COLUMNS, select(*(moved.c[name] for name in ARCHIVE_COLUMNS))
+    ).returning(tasks_archive_table.c.name)
+
+
+class PostgresTaskRepository(TaskRepository):
+    """Хранилище задач в PostgreSQL."""
+
+    # События об изменении задач отправляет триггер через LISTEN/NOTIFY.
+    database_events = True
+
+    def __init__(self):
+        # Наличие расширения pg_trgm в БД (проверяется при первом поиске).
+        self._trigram_available: Optional[bool] = None
+
+    async def connect(self):
+        await db.connect()
+        await read_db.connect()
+
+    async def disconnect(self):
+        await read_db.disconnect()
+        await db.disconnect()
+
+    def same_source(self):
+        """Чтения контекста закрепляются за одной репликой."""
+        return read_db.same_database()
+
+    async def get(self, name: str, replica: bool = False) -> Optional[Row]:
+        database = read_db if replica else db
+        return await database.fetch_one(
+            select(*TASK_ROW_COLUMNS).where(tasks_table.c.name == name)
+        )
+
+    async def exists(self, name: str) -> bool:
+        row = await db.fetch_one(
+            select(tasks_table.c.uuid).where(tasks_table.c.name == name)
+        )
+        return row is not None
+
+    async def list_tasks(
+        self,
+        limit: int,
+        after: Optional[tuple] = None,
+        task_status: Optional[TaskStatus] = None,
+        name_prefix: Optional[str] = None,
+        active: bool = False
+    ) -> list[Row]:
+        """
+        Пагинация курсорная (keyset): вместо OFFSET используется условие
+        (name, uuid) > after, поэтому время выборки не зависит от номера
+        страницы.
+        """
+        query = filter_tasks(
+            select(*TASK_COLUMNS), task_status, name_prefix, active
+        )
+        if after is not None:
+            position = tuple_(tasks_table.c.name, tasks_table.c.uuid)
+            query = query.where(position > tuple_(*after))
+        query = query.order_by(
+            tasks_table.c.name, tasks_table.c.uuid
+        ).limit(limit)
+        return await read_db.fetch_all(query)
+
+    async def list_version(
+        self,
+        task_status: Optional[TaskStatus] = None,
+        name_prefix: Optional[str] = None,
+        active: bool = False
+    ) -> tuple[int, int]:
+        """
+        Число задач и число их изменений читаются из счетчиков статусов,
+        которые триггеры меняют при фиксации транзакции, поэтому время
+        не зависит от размера таблицы задач, а версия не меняется до
+        фиксации изменения. Учитываются только фильтры по статусу: при
+        фильтре по префиксу названия версия меняется при изменении любой
+        задачи подходящих статусов.
+        """
+        counts_table = task_status_counts_table
+        query = select(
+            func.coalesce(func.sum(counts_table.c.count), 0).label("count"),
+            func.coalesce(
+                func.sum(counts_table.c.changes), 0
+            ).label("changes")
+        )
+        if task_status is not None:
+            query = query.where(counts_table.c.status == task_status.name)
+        if active:
+            query = query.where(
+                counts_table.c.status != literal_column("'COMPLETED'")
+            )
+        row = await read_db.fetch_one(query)
+        return int(row["count"]), int(row["changes"])
+
+    async def trigram_search_available(self) -> bool:
+        """
+        Проверяет, установлено ли расширение pg_trgm (оно создается
+        миграцией, только если доступно в сборке PostgreSQL).
+        """
+        if self._trigram_available is None:
+            extensions = table("pg_extension", column("extname"))
+            self._trigram_available = await read_db.fetch_val(
+                select(exists().where(extensions.c.extname == "pg_trgm"))
+            )
+        return self._trigram_available
+
+    async def search(
+        self,
+        q: str,
+        limit: int,
+        after: Optional[tuple] = None,
+        task_status: Optional[TaskStatus] = None,
+        active: bool = False
+    ) -> list[Row]:
+        """
+        Запрос разбирается websearch_to_tsquery (кавычки, OR, минус) и
+        сравнивается с вычисляемой колонкой search_vector (GIN-индекс),
+        при наличии pg_trgm дополнительно находятся задачи с похожим
+        названием или с подстрокой q в названии (триграммный GIN-индекс).
+        Релевантность - ts_rank_cd и similarity.
+        """
+        vector = tasks_table.c.search_vector
+        tsquery = func.websearch_to_tsquery(
+            literal_column("'simple'::regconfig"), q
+        ).op("||")(func.websearch_to_tsquery(
+            literal_column("'russian'::regconfig"), q
+        ))
+        matches = vector.op("@@")(tsquery)
+        # Нормализация 32 приводит ранг к диапазону [0, 1), как similarity.
+        rank = func.ts_rank_cd(vector, tsquery, 32)
+        if await self.trigram_search_available():
+            name = tasks_table.c.name
+            matches = matches | name.op("%")(q) | name.icontains(
+                q, autoescape=True
+            )
+            rank = rank + func.similarity(name, q)
+        rank = rank.label("rank")
+        query = filter_tasks(
+            select(*TASK_COLUMNS, rank).where(matches), task_status,
+            active=active
+        )
+        if after is not None:
+            last_rank, last_name, last_uuid = after
+            position = tuple_(-rank, tasks_table.c.name, tasks_table.c.uuid)
+            query = query.where(
+                position > tuple_(-float(last_rank), last_name, last_uuid)
+            )
+        query = query.order_by(
+            rank.desc(), tasks_table.c.name, tasks_table.c.uuid
+        ).limit(limit)
+        return await read_db.fetch_all(query)
+
+    async def status_counts(
+        self, verify: bool = False
+    ) -> dict[str, dict[TaskStatus, int]]:
+        """
+        Счетчики читаются из таблицы task_status_counts, которую ведут
+        триггеры на tasks, поэтому время ответа не зависит от размера
+        таблицы задач. При verify=True те же данные считаются GROUP BY
+        по таблице tasks в том же запросе (на одном снимке данных).
+        """
+        counts_table = task_status_counts_table
+        query = select(
+            literal_column("'counters'").label("source"),
+            counts_table.c.status,
+            func.sum(counts_table.c.count).label("count")
+        ).group_by(counts_table.c.status)
+        if verify:
+            query = query.union_all(select(
+                literal_column("'actual'").label("source"),
+                tasks_table.c.status,
+                func.count().label("count")
+            ).group_by(tasks_table.c.status))
+        counts = {"counters": {}}
+        if verify:
+            counts["actual"] = {}
+        for row in await read_db.fetch_all(query):
+            counts[row["source"]][row["status"]] = int(row["count"])
+        return counts
+
+    async def iterate(self) -> AsyncIterator[Row]:
+        """Строки читаются серверным курсором (read_db.iterate)."""
+        async for row in read_db.iterate(select(*TASK_COLUMNS)):
+            yield row
+
+    async def get_archived(self, name: str) -> Optional[Row]:
+        archive = tasks_archive_table
+        return await read_db.fetch_one(
+            select(
+                archive.c.uuid,
+                archive.c.name,
+                archive.c.description,
+                archive.c.status,
+                archive.c.version
+            ).where(archive.c.name == name).order_by(
+                archive.c.archived_at.desc()
+            ).limit(1)
+        )
+
+    async def list_archived(
+        self,
+        limit: int,
+        after: Optional[tuple] = None,
+        name_prefix: Optional[str] = None
+    ) -> list[Row]:
+        archive = tasks_archive_table
+        query = select(
+            archive.c.uuid, archive.c.name, archive.c.description,
+            archive.c.status
+        )
+        if name_prefix:
+            query = query.where(
+                archive.c.name.startswith(name_prefix, autoescape=True)
+            )
+        if after is not None:
+            position = tuple_(archive.c.name, archive.c.uuid)
+            query = query.where(position > tuple_(*after))
+        query = query.order_by(archive.c.name, archive.c.uuid).limit(limit)
+        return await read_db.fetch_all(query)
+
+    async def archive_completed(
+        self, age: float, batch_size: int
+    ) -> list[str]:
+        rows = await db.fetch_all(archive_batch_query(age, batch_size))
+        return [row["name"] for row in rows]
+
+    async def create(
+        self, name: str, description: Optional[str], task_status: TaskStatus
+    ) -> Optional[Row]:
+        """
+        Один запрос INSERT ... ON CONFLICT DO NOTHING RETURNING: если
+        задача с таким названием уже есть, вставка ничего не возвращает.
+        Уникальный индекс по названию исключает дубликаты при
+        параллельных запросах.
+        """
+        query = (
+            insert(tasks_table)
+            .values(
+                name=name, description=description, status=task_status.name
+            )
+            .on_conflict_do_nothing(index_elements=[tasks_table.c.name])
+            .returning(*TASK_ROW_COLUMNS)
+        )
+        return await db.fetch_one(query)
+
+    async def update(
+        self,
+        name: str,
+        changes: dict,
+        etags: Optional[list[tuple[str, int]]] = None
+    ) -> Optional[Row]:
+        """Один запрос UPDATE ... RETURNING."""
+        query = where_etag_in(
+            tasks_table.update().where(tasks_table.c.name == name), etags
+        ).values(**status_values(changes)).returning(*TASK_ROW_COLUMNS)
+        try:
+            return await db.fetch_one(query)
+        except UniqueViolationError:
+            raise TaskExistsError(changes["name"])
+
+    async def upsert(self, name: str, changes: dict) -> tuple[Row, bool]:
+        """
+        Один запрос INSERT ... ON CONFLICT (name) DO UPDATE ... RETURNING,
+        признак вставки - xmax = 0.
+        """
+        changes = status_values(changes)
+        query = insert(tasks_table).values(
+            **{"status": TaskStatus.CREATED.name, **changes, "name": name}
+        )
+        if not changes:
+            # Пустое обновление, чтобы RETURNING вернул существующую строку.
+            changes = {"name": query.excluded.name}
+        query = query.on_conflict_do_update(
+            index_elements=[tasks_table.c.name], set_=changes
+        ).returning(
+            *TASK_ROW_COLUMNS, literal_column("xmax = 0").label("inserted")
+        )
+        row = dict(await db.fetch_one(query))
+        inserted = row.pop("inserted")
+        return row, inserted
+
+    async def delete(
+        self, name: str, etags: Optional[list[tuple[str, int]]] = None
+    ) -> bool:
+        query = where_etag_in(
+            tasks_table.delete().where(tasks_table.c.name == name), etags
+        ).returning(tasks_table.c.name)
+        return await db.fetch_one(query) is not None
+
+    async def bulk_create(
+        self, tasks: list[tuple[str, Optional[str], TaskStatus]]
+    ) -> list[Row]:
+        """
+        Пачки многострочных INSERT ... VALUES ON CONFLICT DO NOTHING
+        RETURNING в одной транзакции. Задачи вставляются в порядке
+        названий, как в lock_tasks (для повторно указанной задачи -
+        первое вхождение): параллельные пакеты с общими названиями ждут
+        друг друга на уникальном индексе, а не взаимоблокируются.
+        """
+        tasks = sorted({task[0]: task for task in reversed(tasks)}.values())
+        rows = []
+        async with db.transaction():
+            for batch in chunked(tasks, BULK_BATCH_SIZE):
+                query = (
+                    insert(tasks_table)
+                    .values([
+                        {
+                            "name": name,
+                            "description": description,
+                            "status": task_status.name
+                        }
+                        for name, description, task_status in batch
+                    ])
+                    .on_conflict_do_nothing(
+                        index_elements=[tasks_table.c.name]
+                    )
+                    .returning(*TASK_ROW_COLUMNS)
+                )
+                rows.extend(await db.fetch_all(query))
+        return rows
+
+    async def bulk_update(
+        self,
+        changes: list[tuple[str, Optional[str], Optional[TaskStatus]]]
+    ) -> list[Row]:
+        """
+        Пачки запросов UPDATE ... FROM (VALUES ...) RETURNING в одной
+        транзакции. Задачи изменяются в порядке названий (для повторно
+        указанной задачи - последние значения), строки каждой пачки
+        перед изменением блокируются lock_tasks.
+        """
+        changes = sorted({change[0]: change for change in changes}.values())
+        rows = []
+        async with db.transaction():
+            for batch in chunked(changes, BULK_BATCH_SIZE):
+                await db.fetch_all(lock_tasks([name for name, *_ in batch]))
+                data = values(
+                    column("name", String),
+                    column("description", Text),
+                    column("status", String),
+                    name="data"
+                ).data([
+                    (
+                        name,
+                        description,
+                        task_status.name if task_status is not None else None
+                    )
+                    for name, description, task_status in batch
+                ])
+                query = (
+                    tasks_table.update()
+                    .where(tasks_table.c.name == data.c.name)
+                    .values(
+                        description=func.coalesce(
+                            data.c.description, tasks_table.c.description
+                        ),
+                        status=func.coalesce(
+                            cast(data.c.status, tasks_table.c.status.type),
+                            tasks_table.c.status
+                        )
+                    )
+                    .returning(*TASK_ROW_COLUMNS)
+                )
+                rows.extend(await db.fetch_all(query))
+        return rows
+
+    async def bulk_delete(self, names: list[str]) -> set[str]:
+        """
+        Пачки запросов DELETE ... WHERE name = ANY(...) в одной
+        транзакции. Задачи удаляются в порядке названий, строки каждой
+        пачки перед удалением блокируются lock_tasks.
+        """
+        deleted = set()
+        async with db.transaction():
+            for batch in chunked(sorted(set(names)), BULK_BATCH_SIZE):
+                await db.fetch_all(lock_tasks(batch))
+                query = (
+                    tasks_table.delete()
+                    .where(tasks_table.c.name == any_(names_param(batch)))
+                    .returning(tasks_table.c.name)
+                )
+                deleted.update(
+                    row["name"] for row in await db.fetch_all(query)
+                )
+        return deleted
+
+    async def claim(self, worker: str, limit: int, lease: int) -> list[Row]:
+        """
+        Один запрос: задачи выбираются в порядке последнего изменения
+        (частичный индекс ix_tasks_claimable) с FOR UPDATE SKIP LOCKED,
+        поэтому параллельные обработчики не ждут друг друга и не получают
+        одну задачу дважды.
+        """
+        batch = select(tasks_table.c.uuid).where(
+            tasks_table.c.status == literal_column("'CREATED'")
+        ).order_by(
+            tasks_table.c.updated_at
+        ).limit(limit).with_for_update(skip_locked=True).cte("batch")
+        query = tasks_table.update().where(
+            tasks_table.c.uuid == batch.c.uuid
+        ).values(
+            status=TaskStatus.IN_PROGRESS.name,
+            lease_owner=worker,
+            lease_expires_at=lease_until(lease)
+        ).returning(*TASK_LEASE_COLUMNS)
+        return await db.fetch_all(query)
+
+    async def renew_lease(
+        self, name: str, worker: str, lease: int
+    ) -> Optional[Row]:
+        query = tasks_table.update().where(
+            tasks_table.c.name == name,
+            tasks_table.c.status == TaskStatus.IN_PROGRESS.name,
+            tasks_table.c.lease_owner == worker,
+            tasks_table.c.lease_expires_at > func.now()
+        ).values(lease_expires_at=lease_until(lease)).returning(
+            *TASK_LEASE_COLUMNS
+        )
+        return await db.fetch_one(query)
+
+    async def release(
+        self, name: str, worker: str, task_status: TaskStatus
+    ) -> Optional[Row]:
+        """Аренду снимает триггер tasks_clear_lease при смене статуса."""
+        query = tasks_table.update().where(
+            tasks_table.c.name == name,
+            tasks_table.c.status == TaskStatus.IN_PROGRESS.name,
+            tasks_table.c.lease_owner == worker,
+            tasks_table.c.lease_expires_at > func.now()
+        ).values(status=task_status.name).returning(*TASK_ROW_COLUMNS)
+        return await db.fetch_one(query)
+
+    async def reap_expired_leases(self, batch_size: int) -> list[str]:
+        """
+        Задачи выбираются по частичному индексу ix_tasks_lease_expires_at
+        с FOR UPDATE SKIP LOCKED.
+        """
+        batch = select(tasks_table.c.uuid).where(
+            tasks_table.c.status == literal_column("'IN_PROGRESS'"),
+            tasks_table.c.lease_expires_at < func.now()
+        ).order_by(
+            tasks_table.c.lease_expires_at
+        ).limit(batch_size).with_for_update(skip_locked=True).cte("batch")
+        query = tasks_table.update().where(
+            tasks_table.c.uuid == batch.c.uuid
+        ).values(status=TaskStatus.CREATED.name).returning(tasks_table.c.name)
+        return [row["name"] for row in await db.fetch_all(query)]
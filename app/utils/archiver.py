@@ -0,0 +1,145 @@
+"""
+Модуль переноса давно завершенных задач в архив.
+Задачи в статусе 'Завершено', не менявшиеся дольше TASK_ARCHIVE_AGE
+секунд, переносятся из таблицы 'tasks' в 'tasks_archive' пачками по
+TASK_ARCHIVE_BATCH_SIZE строк через хранилище задач. В PostgreSQL каждая
+пачка - один запрос (одна короткая транзакция): строки выбираются
+с FOR UPDATE SKIP LOCKED, поэтому архиватор не ждет задачи, которые
+сейчас изменяются, и несколько архиваторов (например, по одному
+в каждом воркере) не мешают друг другу.
+Между пачками выдерживается пауза TASK_ARCHIVE_BATCH_DELAY, чтобы
+архивирование не увеличивало задержки основных запросов.
+Удаление из 'tasks' вызывает те же триггеры, что и удаление через API
+(уведомления об изменении задач, счетчики статусов).
+Запускается фоновой задачей приложения (TASK_ARCHIVE_ENABLED=True) или
+из командной строки: python -m app.utils.archiver [--once].
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+from app.utils import tasks_utils
+from app.utils.logs import setup_logging
+from app.utils.periodic import PeriodicTask
+
+
+logger = logging.getLogger(__name__)
+
+TASK_ARCHIVE_ENABLED = (
+    os.getenv("TASK_ARCHIVE_ENABLED", "False").lower() == "true"
+)
+# Возраст завершенной задачи (сек с последнего изменения) для переноса.
+TASK_ARCHIVE_AGE = float(os.getenv("TASK_ARCHIVE_AGE", str(30 * 24 * 3600)))
+TASK_ARCHIVE_BATCH_SIZE = int(os.getenv("TASK_ARCHIVE_BATCH_SIZE", "500"))
+# Пауза между пачками (сек): не более BATCH_SIZE / BATCH_DELAY строк в сек.
+TASK_ARCHIVE_BATCH_DELAY = float(
+    os.getenv("TASK_ARCHIVE_BATCH_DELAY", "0.5")
+)
+# Пауза между запусками, когда переносить больше нечего (сек).
+TASK_ARCHIVE_INTERVAL = float(os.getenv("TASK_ARCHIVE_INTERVAL", "300"))
+
+
+class TaskArchiver(PeriodicTask):
+    """Фоновый перенос завершенных задач в архив."""
+
+    error_message = "Ошибка архивирования задач"
+
+    def __init__(
+        self,
+        age: float = TASK_ARCHIVE_AGE,
+        batch_size: int = TASK_ARCHIVE_BATCH_SIZE,
+        batch_delay: float = TASK_ARCHIVE_BATCH_DELAY,
+        interval: float = TASK_ARCHIVE_INTERVAL
+    ):
+        super().__init__(interval)
+        self.age = age
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.archived = 0
+        self.batches = 0
+        self.last_run: Optional[float] = None
+
+    async def archive_batch(self) -> int:
+        """Переносит в архив одну пачку задач, возвращает их число."""
+        names = await tasks_utils.archive_completed_tasks(
+            self.age, self.batch_size
+        )
+        if names:
+            self.archived += len(names)
+            self.batches += 1
+        return len(names)
+
+    async def run_once(self) -> int:
+        """
+        Переносит в архив все подходящие задачи пачками с паузой между
+        ними. Возвращает число перенесенных задач.
+        """
+        total = 0
+        while True:
+            moved = await self.archive_batch()
+            total += moved
+            if moved < self.batch_size:
+                break
+            await asyncio.sleep(self.batch_delay)
+        self.last_run = time.time()
+        if total:
+            logger.info(f"В архив перенесено задач: {total}.")
+        return total
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "archived": self.archived,
+            "batches": self.batches,
+            "last_run": self.last_run,
+        }
+
+
+task_archiver = TaskArchiver()
+
+
+async def run(args):
+    await tasks_utils.repository.connect()
+    archiver = TaskArchiver(
+        age=args.age,
+        batch_size=args.batch_size,
+        batch_delay=args.batch_delay,
+        interval=args.interval
+    )
+    try:
+        if args.once:
+            await archiver.run_once()
+        else:
+            await archiver.run_forever()
+    finally:
+        await tasks_utils.repository.disconnect()
+
+
+def main():
+    setup_logging()
+    parser = argparse.ArgumentParser(
+        description="Перенос завершенных задач в архив."
+    )
+    parser.add_argument(
+        "--once", action="store_true",
+        help="перенести подходящие задачи и завершить работу"
+    )
+    parser.add_argument("--age", type=float, default=TASK_ARCHIVE_AGE)
+    parser.add_argument(
+        "--batch-size", type=int, default=TASK_ARCHIVE_BATCH_SIZE
+    )
+    parser.add_argument(
+        "--batch-delay", type=float, default=TASK_ARCHIVE_BATCH_DELAY
+    )
+    parser.add_argument(
+        "--interval", type=float, default=TASK_ARCHIVE_INTERVAL
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
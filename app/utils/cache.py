@@ -0,0 +1,96 @@
+"""
+Модуль внутрипроцессного кэша задач.
+Содержит класс 'TTLCache' - ограниченный по размеру кэш с вытеснением
+давно не использованных записей (LRU) и временем жизни записей (TTL),
+а также экземпляр 'task_cache' для кэширования задач по названию.
+Размер и время жизни задаются переменными окружения TASK_CACHE_SIZE
+(0 - кэш отключен) и TASK_CACHE_TTL (секунды).
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+TASK_CACHE_SIZE = int(os.getenv("TASK_CACHE_SIZE", "10000"))
+TASK_CACHE_TTL = float(os.getenv("TASK_CACHE_TTL", "5"))
+
+
+class TTLCache:
+    """
+    LRU-кэш с ограничением времени жизни записей.
+    Счетчик 'generation' увеличивается при каждой инвалидации: значение,
+    прочитанное из БД до изменения, не попадет в кэш после него
+    (см. 'set_if_fresh').
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Возвращает значение по ключу или None, если его нет в кэше."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Сохраняет значение, вытесняя самую старую запись."""
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def set_if_fresh(self, key: Hashable, value: Any, generation: int):
+        """
+        Сохраняет прочитанное из БД значение, только если с момента
+        чтения (generation) в кэше не было инвалидаций.
+        """
+        if generation == self.generation:
+            self.set(key, value)
+
+    def invalidate(self, *keys: Hashable):
+        """Удаляет записи по ключам."""
+        self.generation += 1
+        for key in keys:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Удаляет все записи."""
+        self.generation += 1
+        self._data.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Возвращает размер кэша и счетчики попаданий и вытеснений."""
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+task_cache = TTLCache(TASK_CACHE_SIZE, TASK_CACHE_TTL)
@@ -0,0 +1,63 @@
+"""
+Модуль возврата в очередь задач с истекшей арендой.
+Обработчик очереди захватывает задачи через POST /tasks/claim и должен
+продлевать аренду, пока работает над задачей. Если он завершился
+аварийно, аренда истекает, и 'LeaseReaper' в фоне возвращает такие
+задачи в статус 'Создано' пачками по TASK_LEASE_REAPER_BATCH_SIZE
+(FOR UPDATE SKIP LOCKED, поэтому фоновые задачи всех воркеров
+не мешают друг другу).
+"""
+
+import logging
+import os
+
+from app.utils import tasks_utils
+from app.utils.periodic import PeriodicTask
+
+
+logger = logging.getLogger(__name__)
+
+TASK_LEASE_REAPER_ENABLED = (
+    os.getenv("TASK_LEASE_REAPER_ENABLED", "True").lower() == "true"
+)
+# Период проверки истекших аренд (сек).
+TASK_LEASE_REAPER_INTERVAL = float(
+    os.getenv("TASK_LEASE_REAPER_INTERVAL", "5")
+)
+TASK_LEASE_REAPER_BATCH_SIZE = int(
+    os.getenv("TASK_LEASE_REAPER_BATCH_SIZE", "500")
+)
+
+
+class LeaseReaper(PeriodicTask):
+    """Фоновый возврат в очередь задач с истекшей арендой."""
+
+    error_message = "Ошибка возврата задач в очередь"
+
+    def __init__(
+        self,
+        interval: float = TASK_LEASE_REAPER_INTERVAL,
+        batch_size: int = TASK_LEASE_REAPER_BATCH_SIZE
+    ):
+        super().__init__(interval)
+        self.batch_size = batch_size
+        self.reaped = 0
+
+    async def run_once(self) -> int:
+        """Возвращает в очередь все задачи с истекшей арендой."""
+        total = 0
+        while True:
+            names = await tasks_utils.reap_expired_leases(self.batch_size)
+            total += len(names)
+            if len(names) < self.batch_size:
+                break
+        self.reaped += total
+        if total:
+            logger.info(f"Возвращено в очередь задач: {total}.")
+        return total
+
+    def stats(self) -> dict:
+        return {**super().stats(), "reaped": self.reaped}
+
+
+lease_reaper = LeaseReaper()
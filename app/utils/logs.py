@@ -0,0 +1,193 @@
+"""
+Модуль настройки логирования приложения.
+Записи журнала не пишутся в файл и консоль в потоке обработки запросов:
+'DropQueueHandler' кладет их в ограниченную очередь, а 'QueueListener'
+в отдельном потоке передает их обработчикам файла и консоли. Если
+очередь заполнена (например, при всплеске логирования во время
+инцидента), запись отбрасывается и учитывается в счетчике dropped,
+чтобы логирование не увеличивало задержки запросов.
+Записи форматируются в JSON (одна запись на строку) или в текст.
+Для одного запроса логирование можно сделать подробнее заголовком
+X-Log-Level (ASGI-middleware 'RequestLogLevelMiddleware'), не меняя
+уровень для остальных запросов. Скрыть заголовком записи уровня
+LOG_LEVEL и выше нельзя.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+
+LOG_LEVEL = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO").upper())
+# Файл журнала, пустое значение - только вывод в консоль.
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+# Формат записей: json или text.
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Заголовок с уровнем логирования для одного запроса.
+LOG_LEVEL_HEADER = os.getenv("LOG_LEVEL_HEADER", "X-Log-Level")
+# Минимальный уровень, который можно задать заголовком запроса.
+# Заголовок только понижает уровень запроса относительно LOG_LEVEL, но
+# не ниже этого значения. По умолчанию совпадает с LOG_LEVEL (заголовок
+# не действует), при меньшем значении логгеры создают записи и этих
+# уровней, а лишние отбрасывает RequestLevelFilter.
+LOG_REQUEST_MIN_LEVEL = logging.getLevelName(
+    os.getenv("LOG_REQUEST_MIN_LEVEL", logging.getLevelName(LOG_LEVEL))
+    .upper()
+)
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Уровень логирования текущего запроса (None - общий уровень LOG_LEVEL).
+request_log_level: ContextVar[Optional[int]] = ContextVar(
+    "request_log_level", default=None
+)
+
+# Атрибуты LogRecord, которые не относятся к дополнительным полям extra.
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {
+    "message", "asctime", "taskName"
+}
+
+
+class RequestLevelFilter(logging.Filter):
+    """Пропускает записи не ниже уровня текущего запроса или LOG_LEVEL."""
+
+    def __init__(self, level: int = LOG_LEVEL):
+        super().__init__()
+        self.level = level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        level = request_log_level.get()
+        return record.levelno >= (self.level if level is None else level)
+
+
+class DropQueueHandler(QueueHandler):
+    """
+    Обработчик, передающий записи в ограниченную очередь без ожидания.
+    При заполненной очереди запись отбрасывается и учитывается.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Подготавливает копию записи для передачи в другой поток: текст
+        сообщения и исключения вычисляются сразу, форматирование
+        выполняют обработчики QueueListener.
+        """
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info
+            )
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "capacity": self.queue.maxsize,
+            "dropped": self.dropped,
+        }
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись в одну строку JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value) for key, value in vars(record).items()
+            if key not in RECORD_ATTRIBUTES
+        )
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RequestLogLevelMiddleware:
+    """
+    ASGI-middleware: уровень логирования из заголовка LOG_LEVEL_HEADER
+    действует только на время обработки этого запроса. Уровень выше
+    LOG_LEVEL не применяется (клиент не может скрыть свои ошибки),
+    ниже LOG_REQUEST_MIN_LEVEL - ограничивается им.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.header = LOG_LEVEL_HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        level = None
+        if scope["type"] == "http":
+            for key, value in scope["headers"]:
+                if key == self.header:
+                    level = logging.getLevelName(
+                        value.decode("latin-1").strip().upper()
+                    )
+                    break
+        if not isinstance(level, int) or level >= LOG_LEVEL:
+            return await self.app(scope, receive, send)
+        token = request_log_level.set(max(level, LOG_REQUEST_MIN_LEVEL))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_log_level.reset(token)
+
+
+queue_handler: Optional[DropQueueHandler] = None
+
+
+def setup_logging() -> DropQueueHandler:
+    """
+    Настраивает корневой логгер: очередь с отбрасыванием записей и поток
+    QueueListener с обработчиками файла и консоли. Повторный вызов
+    возвращает уже созданный обработчик очереди.
+    """
+    global queue_handler
+    if queue_handler is not None:
+        return queue_handler
+    if LOG_FORMAT == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if LOG_FILE:
+        handlers.append(logging.FileHandler(LOG_FILE, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    queue_handler = DropQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RequestLevelFilter())
+    root = logging.getLogger()
+    root.setLevel(min(LOG_LEVEL, LOG_REQUEST_MIN_LEVEL))
+    root.addHandler(queue_handler)
+    listener = QueueListener(
+        queue_handler.queue, *handlers, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    return queue_handler
@@ -0,0 +1,323 @@
+"""
+Модуль метрик производительности в формате Prometheus.
+ASGI-middleware 'MetricsMiddleware' для каждого запроса учитывает:
+    - длительность обработки по маршруту (шаблону пути, например
+      /tasks/{name}), методу и коду ответа
+    - число запросов, обрабатываемых в данный момент
+    - размер тела ответа
+    - число запросов к БД и суммарное время их выполнения
+Время запросов к БД передает наблюдатель запросов соединения с БД
+(app.db.add_query_observer), поэтому учитываются все запросы, в том
+числе выполняемые в транзакциях и на репликах для чтения.
+Счетчики изменяются только в потоке цикла событий, поэтому обходятся
+без блокировок: увеличение счетчика - одна операция над словарем.
+Гистограмма хранит число наблюдений в каждом интервале и суммирует
+их только при выдаче метрик (GET /metrics).
+Если METRICS_SERVER_TIMING=True, в ответ добавляется заголовок
+Server-Timing со временем запросов к БД и обработки запроса.
+"""
+
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Iterable, Optional
+
+from app.db import (
+    DatabaseSingleton, PooledPostgresBackend, Statement, add_query_observer
+)
+
+
+METRICS_SERVER_TIMING = (
+    os.getenv("METRICS_SERVER_TIMING", "True").lower() == "true"
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+UNMATCHED_ROUTE = "<unmatched>"
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def format_labels(names: Iterable[str], values: Iterable[Any]) -> str:
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\")
+                         .replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    ]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """Базовый класс метрики со значениями по наборам меток."""
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, Any] = {}
+
+    def clear(self):
+        self._values.clear()
+
+    def samples(self) -> Iterable[tuple[str, tuple, tuple, float]]:
+        """Возвращает (суффикс, имена меток, значения меток, значение)."""
+        for labels, value in self._values.items():
+            yield "", self.labelnames, labels, value
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for suffix, names, labels, value in self.samples():
+            lines.append(
+                f"{self.name}{suffix}{format_labels(names, labels)} "
+                f"{format_value(value)}"
+            )
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, labels: tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+    def set(self, value: float, labels: tuple = ()):
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    Гистограмма: для каждого набора меток хранит число наблюдений по
+    интервалам (последний - больше верхней границы) и сумму значений.
+    """
+    type = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames=(),
+        buckets: Iterable[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: tuple = ()):
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [
+                [0] * (len(self.buckets) + 1), 0.0
+            ]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def get(self, labels: tuple = ()) -> tuple[int, float]:
+        """Возвращает число наблюдений и их сумму."""
+        series = self._values.get(labels)
+        if series is None:
+            return 0, 0.0
+        return sum(series[0]), series[1]
+
+    def samples(self):
+        names = (*self.labelnames, "le")
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                yield "_bucket", names, (*labels, format_value(bound)), \
+                    cumulative
+            yield "_sum", self.labelnames, labels, total
+            yield "_count", self.labelnames, labels, cumulative
+
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "Число обработанных HTTP-запросов.",
+    ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Число HTTP-запросов в обработке.",
+    ("method",)
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Длительность обработки HTTP-запроса.",
+    ("method", "route")
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Размер тела HTTP-ответа.",
+    ("method", "route"), SIZE_BUCKETS
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Число запросов к БД за HTTP-запрос.",
+    ("method", "route"), QUERY_COUNT_BUCKETS
+)
+HTTP_REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "Суммарное время запросов к БД за HTTP-запрос.",
+    ("method", "route")
+)
+DB_QUERIES = Counter(
+    "db_queries_total", "Число запросов к БД.", ("operation",)
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Длительность запроса к БД.",
+    ("operation",)
+)
+
+REGISTRY: list[Metric] = [
+    HTTP_REQUESTS,
+    HTTP_REQUESTS_IN_PROGRESS,
+    HTTP_REQUEST_DURATION,
+    HTTP_RESPONSE_SIZE,
+    HTTP_REQUEST_DB_QUERIES,
+    HTTP_REQUEST_DB_DURATION,
+    DB_QUERIES,
+    DB_QUERY_DURATION,
+]
+
+
+class RequestStats:
+    """Запросы к БД, выполненные при обработке одного HTTP-запроса."""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Статистика текущего HTTP-запроса (None вне обработки запроса).
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def observe_db_query(
+    operation: str,
+    statement: Optional[Statement],
+    seconds: float,
+    backend: PooledPostgresBackend
+):
+    """Наблюдатель запросов к БД: общие счетчики и счетчики запроса."""
+    DB_QUERIES.inc((operation,))
+    DB_QUERY_DURATION.observe(seconds, (operation,))
+    stats = request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += seconds
+
+
+add_query_observer(observe_db_query)
+
+
+def server_timing(stats: RequestStats, elapsed: float) -> bytes:
+    """Значение заголовка Server-Timing (длительность в мс)."""
+    return (
+        f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.queries} '
+        f'queries", app;dur={elapsed * 1000:.2f}'
+    ).encode("latin-1")
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: метрики длительности и размера HTTP-запросов."""
+
+    def __init__(self, app, server_timing: bool = METRICS_SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        response = {"status": 500, "size": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                if self.server_timing:
+                    message["headers"] = [
+                        *message.get("headers", ()),
+                        (b"server-timing", server_timing(
+                            stats, time.perf_counter() - start
+                        )),
+                    ]
+            elif message["type"] == "http.response.body":
+                response["size"] += len(message.get("body", b""))
+            await send(message)
+
+        method = scope["method"]
+        HTTP_REQUESTS_IN_PROGRESS.inc((method,))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec((method,))
+            request_stats.reset(token)
+            route = scope.get("route")
+            labels = (method, getattr(route, "path", UNMATCHED_ROUTE))
+            HTTP_REQUESTS.inc((*labels, str(response["status"])))
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, labels)
+            HTTP_RESPONSE_SIZE.observe(response["size"], labels)
+            HTTP_REQUEST_DB_QUERIES.observe(stats.queries, labels)
+            HTTP_REQUEST_DB_DURATION.observe(stats.db_seconds, labels)
+
+
+def pool_metrics() -> list[Metric]:
+    """Метрики пулов соединений основной БД и реплик на момент выдачи."""
+    pools = [("primary", DatabaseSingleton.get_db())]
+    read_db = DatabaseSingleton.get_read_db()
+    pools.extend(
+        (f"replica{number}", replica)
+        for number, replica in enumerate(read_db.replicas)
+    )
+    metrics = [
+        Gauge("db_pool_size", "Число соединений в пуле.", ("pool",)),
+        Gauge("db_pool_in_use", "Число занятых соединений.", ("pool",)),
+        Gauge("db_pool_waiting", "Число ожидающих соединения.", ("pool",)),
+        Counter(
+            "db_pool_acquire_timeouts_total",
+            "Число превышений времени ожидания соединения.", ("pool",)
+        ),
+        Counter(
+            "db_pool_acquire_wait_seconds_total",
+            "Суммарное время ожидания соединения.", ("pool",)
+        ),
+    ]
+    size, in_use, waiting, timeouts, wait = metrics
+    for pool, database in pools:
+        stats = database.pool_stats()
+        size.set(stats["size"], (pool,))
+        in_use.set(stats["in_use"], (pool,))
+        waiting.set(stats["waiting"], (pool,))
+        timeouts.inc((pool,), stats["acquire_timeouts_total"])
+        wait.inc((pool,), stats["acquire_wait_seconds_total"])
+    return metrics
+
+
+def render_metrics() -> str:
+    """Возвращает все метрики в текстовом формате Prometheus."""
+    lines = []
+    for metric in (*REGISTRY, *pool_metrics()):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
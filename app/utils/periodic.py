@@ -0,0 +1,60 @@
+"""
+Модуль периодических фоновых задач приложения.
+Класс 'PeriodicTask' запускает run_once подкласса каждые interval
+секунд в фоновой задаче asyncio (start/stop при запуске и остановке
+приложения) или в текущей задаче (run_forever, для командной строки).
+Ошибка одного запуска записывается в журнал с трассировкой и в счетчик
+errors, после чего запуски продолжаются по расписанию: фоновая задача
+завершается только при остановке.
+На классе основаны перенос задач в архив ('TaskArchiver') и возврат
+в очередь задач с истекшей арендой ('LeaseReaper').
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Периодическая фоновая задача."""
+
+    # Сообщение в журнале при ошибке запуска.
+    error_message = "Ошибка фоновой задачи"
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.errors = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self):
+        """Один запуск задачи."""
+        raise NotImplementedError
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_forever(self):
+        """Выполняет run_once каждые interval секунд до отмены."""
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                self.errors += 1
+                logger.exception(f"{self.error_message}.")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        return {"running": self._task is not None, "errors": self.errors}
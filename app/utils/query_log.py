@@ -0,0 +1,247 @@
+"""
+Модуль журнала медленных запросов к БД.
+'QueryLog' получает каждый выполненный запрос от наблюдателя запросов
+соединения с БД (app.db.add_query_observer) и:
+    - накапливает по нормализованному тексту SQL (параметры и литералы
+      заменены на ?, списки значений и повторяющиеся строки VALUES
+      свернуты) число выполнений, суммарное и наибольшее время;
+      хранится не более DB_QUERY_STATS_SIZE различных запросов, при
+      переполнении вытесняются редко выполняемые (счетчик evicted)
+    - пишет в журнал запросы дольше DB_SLOW_QUERY_THRESHOLD секунд
+      вместе с типами параметров (значения параметров в журнал
+      не попадают)
+    - с вероятностью DB_EXPLAIN_SAMPLE_RATE получает план медленного
+      запроса EXPLAIN (ANALYZE, BUFFERS) на той же БД (основной или
+      реплике), где выполнен запрос, и сохраняет его в кольцевом
+      буфере из DB_EXPLAIN_BUFFER_SIZE планов
+EXPLAIN ANALYZE выполняет запрос повторно, поэтому планы собираются
+только для SELECT без блокировки строк, не более одного одновременно,
+в отдельной фоновой задаче и с ограничением DB_EXPLAIN_TIMEOUT.
+Статистика доступна в GET /metrics/queries, планы - в
+GET /metrics/queries/plans.
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import random
+import re
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from app.db import PooledPostgresBackend, Statement, add_query_observer
+
+
+logger = logging.getLogger(__name__)
+
+# Порог медленного запроса (сек), 0 - не записывать запросы в журнал.
+DB_SLOW_QUERY_THRESHOLD = float(os.getenv("DB_SLOW_QUERY_THRESHOLD", "0.2"))
+DB_QUERY_STATS_SIZE = int(os.getenv("DB_QUERY_STATS_SIZE", "1000"))
+# Доля медленных запросов, для которых собирается план (0 - не собирать).
+DB_EXPLAIN_SAMPLE_RATE = float(os.getenv("DB_EXPLAIN_SAMPLE_RATE", "0"))
+DB_EXPLAIN_BUFFER_SIZE = int(os.getenv("DB_EXPLAIN_BUFFER_SIZE", "50"))
+# Ограничение времени выполнения EXPLAIN ANALYZE (сек).
+DB_EXPLAIN_TIMEOUT = float(os.getenv("DB_EXPLAIN_TIMEOUT", "5"))
+
+EXPLAINABLE = re.compile(r"\s*SELECT\b", re.IGNORECASE)
+LOCKING = re.compile(r"\bFOR\s+(NO\s+KEY\s+)?(UPDATE|SHARE)\b", re.IGNORECASE)
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+PARAMETER = re.compile(r"\$\d+")
+NUMBER_LITERAL = re.compile(r"(?<![\w$.])\d+(?:\.\d+)?\b")
+PLACEHOLDER = r"\?(?:::\w+)?"
+PLACEHOLDER_LIST = re.compile(
+    rf"\(\s*{PLACEHOLDER}(?:\s*,\s*{PLACEHOLDER})*\s*\)"
+)
+REPEATED_ROWS = re.compile(r"(\([^()]*\))(?:\s*,\s*\1)+")
+# Доля запросов, вытесняемых из статистики при ее переполнении.
+EVICT_SHARE = 0.05
+
+
+def param_shape(value: Any) -> str:
+    """Тип параметра запроса без значения, для списков - и длина."""
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Приводит текст запроса к виду без значений: параметры и литералы
+    заменяются на ?, списки параметров - на (...), повторяющиеся
+    строки VALUES сворачиваются в одну.
+    """
+    sql = STRING_LITERAL.sub("?", sql)
+    sql = PARAMETER.sub("?", sql)
+    sql = NUMBER_LITERAL.sub("?", sql)
+    sql = PLACEHOLDER_LIST.sub("(...)", sql)
+    return REPEATED_ROWS.sub(r"\1", sql)
+
+
+def explainable(sql: str) -> bool:
+    """Можно ли безопасно выполнить EXPLAIN ANALYZE для запроса."""
+    return bool(EXPLAINABLE.match(sql)) and not LOCKING.search(sql)
+
+
+class QueryLog:
+    """Статистика запросов к БД, журнал и планы медленных запросов."""
+
+    def __init__(
+        self,
+        threshold: float = DB_SLOW_QUERY_THRESHOLD,
+        stats_size: int = DB_QUERY_STATS_SIZE,
+        sample_rate: float = DB_EXPLAIN_SAMPLE_RATE,
+        buffer_size: int = DB_EXPLAIN_BUFFER_SIZE,
+        explain_timeout: float = DB_EXPLAIN_TIMEOUT
+    ):
+        self.threshold = threshold
+        self.stats_size = stats_size
+        self.sample_rate = sample_rate
+        self.explain_timeout = explain_timeout
+        self.slow = 0
+        self.evicted = 0
+        self.explain_errors = 0
+        self._statements: dict[str, list] = {}
+        self._plans: deque[dict[str, Any]] = deque(maxlen=buffer_size)
+        self._explain_task: Optional[asyncio.Task] = None
+
+    def observe(
+        self,
+        operation: str,
+        statement: Optional[Statement],
+        seconds: float,
+        backend: PooledPostgresBackend
+    ):
+        """Наблюдатель запросов к БД."""
+        if statement is None:
+            return
+        sql, args = statement
+        key = normalize_sql(sql)
+        entry = self._statements.get(key)
+        if entry is None:
+            if len(self._statements) >= self.stats_size:
+                self.evict()
+            self._statements[key] = [1, seconds, seconds, operation]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+        if not self.threshold or seconds < self.threshold:
+            return
+        self.slow += 1
+        params = [param_shape(arg) for arg in args]
+        logger.warning(
+            f"Медленный запрос к БД ({seconds * 1000:.1f} мс).",
+            extra={
+                "sql": sql,
+                "params": params,
+                "operation": operation,
+                "duration_ms": round(seconds * 1000, 3),
+            }
+        )
+        if self._explain_task is not None or not explainable(sql):
+            return
+        if random.random() < self.sample_rate:
+            self._explain_task = asyncio.get_running_loop().create_task(
+                self.explain(backend, sql, args, params, seconds)
+            )
+
+    def evict(self):
+        """
+        Вытесняет из статистики EVICT_SHARE запросов с наименьшим числом
+        выполнений, чтобы освободить место для новых.
+        """
+        count = max(1, int(self.stats_size * EVICT_SHARE))
+        for key in heapq.nsmallest(
+            count, self._statements, key=lambda key: self._statements[key][0]
+        ):
+            del self._statements[key]
+            self.evicted += 1
+
+    async def explain(
+        self,
+        backend: PooledPostgresBackend,
+        sql: str,
+        args: list,
+        params: list[str],
+        seconds: float
+    ):
+        """
+        Получает план запроса EXPLAIN (ANALYZE, BUFFERS) на бэкенде БД,
+        где выполнен запрос, и добавляет его в буфер планов. Запрос
+        выполняется напрямую через asyncpg, чтобы не попасть
+        в статистику запросов.
+        """
+        connection = backend.connection()
+        try:
+            await connection.acquire()
+            try:
+                raw = connection.raw_connection
+                async with raw.transaction():
+                    await raw.execute(
+                        "SET LOCAL statement_timeout = "
+                        f"{int(self.explain_timeout * 1000)}"
+                    )
+                    rows = await raw.fetch(
+                        f"EXPLAIN (ANALYZE, BUFFERS) {sql}", *args
+                    )
+            finally:
+                await connection.release()
+            self._plans.append({
+                "time": datetime.now(timezone.utc).isoformat(),
+                "sql": sql,
+                "params": params,
+                "duration_ms": round(seconds * 1000, 3),
+                "plan": "\n".join(row[0] for row in rows),
+            })
+        except Exception as exc:
+            self.explain_errors += 1
+            logger.warning(f"Ошибка получения плана запроса: {exc}.")
+        finally:
+            self._explain_task = None
+
+    def top(self, limit: int = 20) -> list[dict[str, Any]]:
+        """Возвращает limit запросов с наибольшим суммарным временем."""
+        entries = sorted(
+            self._statements.items(), key=lambda item: item[1][1],
+            reverse=True
+        )[:limit]
+        return [
+            {
+                "sql": sql,
+                "operation": operation,
+                "calls": calls,
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total / calls * 1000, 3),
+                "max_ms": round(longest * 1000, 3),
+            }
+            for sql, (calls, total, longest, operation) in entries
+        ]
+
+    def plans(self) -> list[dict[str, Any]]:
+        """Возвращает сохраненные планы, начиная с последнего."""
+        return list(reversed(self._plans))
+
+    def reset(self):
+        self.slow = 0
+        self.evicted = 0
+        self.explain_errors = 0
+        self._statements.clear()
+        self._plans.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "threshold": self.threshold,
+            "statements": len(self._statements),
+            "evicted": self.evicted,
+            "slow": self.slow,
+            "plans": len(self._plans),
+            "explain_errors": self.explain_errors,
+        }
+
+
+query_log = QueryLog()
+add_query_observer(query_log.observe)
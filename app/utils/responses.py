@@ -0,0 +1,43 @@
+"""
+Модуль быстрых JSON-ответов.
+Содержит функцию 'dumps' и класс ответа 'FastJSONResponse', который
+используется приложением по умолчанию. Кодирование выполняется через
+orjson, а если он не установлен или в переменной окружения
+JSON_RESPONSE_BACKEND указано 'json' - через стандартный модуль json
+с теми же параметрами, что и у JSONResponse.
+"""
+
+import json
+import os
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+JSON_RESPONSE_BACKEND = os.getenv("JSON_RESPONSE_BACKEND", "orjson").lower()
+USE_ORJSON = JSON_RESPONSE_BACKEND == "orjson" and orjson is not None
+
+
+def dumps(content: Any) -> bytes:
+    """Кодирует данные в JSON (UTF-8)."""
+    if USE_ORJSON:
+        return orjson.dumps(content)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ, кодируемый через orjson (или json, см. dumps)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,137 @@
+"""
+Модуль получения событий об изменении задач через LISTEN/NOTIFY.
+Триггер на таблице 'tasks' отправляет в канал 'tasks_changes'
+уведомление при каждой вставке, изменении и удалении задачи:
+JSON с операцией (op), названием (name), прежним названием (old_name,
+только для изменения), номером версии (version) и статусом задачи
+(status, имя члена TaskStatus).
+Класс 'TaskEventListener' держит отдельное соединение с БД, слушает
+канал в фоне и передает события обработчикам. При потере соединения
+он переподключается, а так как уведомления за время разрыва потеряны,
+вызывает обработчики сброса (например, полную очистку кэша).
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Callable, Optional
+
+import asyncpg
+
+from app.db import CONNECTION_ERRORS, SQLALCHEMY_DATABASE_URL
+
+
+logger = logging.getLogger(__name__)
+
+TASK_EVENTS_CHANNEL = "tasks_changes"
+TASK_EVENTS_ENABLED = (
+    os.getenv("TASK_EVENTS_ENABLED", "True").lower() == "true"
+)
+# Пауза перед повторным подключением (сек), удваивается до максимума.
+TASK_EVENTS_RECONNECT_DELAY = float(
+    os.getenv("TASK_EVENTS_RECONNECT_DELAY", "1")
+)
+TASK_EVENTS_RECONNECT_MAX_DELAY = 30.0
+# Период проверки соединения слушателя (сек).
+TASK_EVENTS_HEALTHCHECK_INTERVAL = float(
+    os.getenv("TASK_EVENTS_HEALTHCHECK_INTERVAL", "10")
+)
+
+
+class TaskEventListener:
+    """Фоновый слушатель канала уведомлений об изменении задач."""
+
+    def __init__(self, dsn: str, channel: str = TASK_EVENTS_CHANNEL):
+        self.dsn = dsn
+        self.channel = channel
+        self.connected = asyncio.Event()
+        self.received = 0
+        self.reconnects = 0
+        self.last_version: Optional[int] = None
+        self._handlers: list[Callable[[dict[str, Any]], None]] = []
+        self._reset_handlers: list[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def add_handler(self, handler: Callable[[dict[str, Any]], None]):
+        """Добавляет обработчик события об изменении задачи."""
+        self._handlers.append(handler)
+
+    def add_reset_handler(self, handler: Callable[[], None]):
+        """Добавляет обработчик возможного пропуска событий."""
+        self._reset_handlers.append(handler)
+
+    async def start(self):
+        if self._task is None:
+            self.connected = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _reset(self):
+        for handler in self._reset_handlers:
+            handler()
+
+    def _on_notification(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Некорректное событие задачи: {payload!r}.")
+            return
+        self.dispatch(event)
+
+    def dispatch(self, event: dict[str, Any]):
+        """
+        Передает событие об изменении задачи обработчикам. Вызывается при
+        уведомлении из БД и хранилищами без LISTEN/NOTIFY напрямую.
+        """
+        self.received += 1
+        self.last_version = event.get("version")
+        for handler in self._handlers:
+            handler(event)
+
+    async def _run(self):
+        delay = TASK_EVENTS_RECONNECT_DELAY
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                await connection.add_listener(
+                    self.channel, self._on_notification
+                )
+                # События, отправленные до подписки, могли быть пропущены.
+                self._reset()
+                self.connected.set()
+                delay = TASK_EVENTS_RECONNECT_DELAY
+                while True:
+                    await asyncio.sleep(TASK_EVENTS_HEALTHCHECK_INTERVAL)
+                    await connection.fetchval("SELECT 1")
+            except (*CONNECTION_ERRORS, asyncpg.PostgresError) as exc:
+                logger.warning(
+                    f"Соединение для событий задач потеряно: {exc!r}."
+                )
+            finally:
+                self.connected.clear()
+                if connection is not None:
+                    connection.terminate()
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, TASK_EVENTS_RECONNECT_MAX_DELAY)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "connected": self.connected.is_set(),
+            "received": self.received,
+            "reconnects": self.reconnects,
+            "last_version": self.last_version,
+        }
+
+
+task_events = TaskEventListener(SQLALCHEMY_DATABASE_URL)
@@ -0,0 +1,311 @@
+"""
+Модуль ленты изменений задач для клиентов (SSE и long-poll).
+События приходят от общего для воркера слушателя LISTEN/NOTIFY
+(task_events) и раздаются всем подписчикам воркера без обращений к БД.
+Каждое событие получает номер в ленте: курсор вида '<эпоха>-<номер>'.
+Последние TASK_FEED_BUFFER_SIZE событий хранятся в кольцевом буфере,
+чтобы клиент мог продолжить с курсора после переподключения. Эпоха
+меняется при перезапуске процесса и при переподключении слушателя (когда
+события могли быть потеряны). Курсор другой эпохи или слишком старый
+считается устаревшим, клиенту нужно заново прочитать нужные задачи.
+У каждого подписчика своя очередь на TASK_FEED_CLIENT_BUFFER событий:
+подписчик, не успевающий их забирать, отключается, чтобы не расходовать
+память и не задерживать остальных.
+"""
+
+import asyncio
+import os
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Iterable, Optional
+
+from fastapi import HTTPException
+from starlette import status
+
+from app.utils.responses import dumps
+from app.utils.task_events import task_events
+
+
+# Число последних событий, доступных для продолжения по курсору.
+TASK_FEED_BUFFER_SIZE = int(os.getenv("TASK_FEED_BUFFER_SIZE", "10000"))
+# Размер очереди одного подписчика.
+TASK_FEED_CLIENT_BUFFER = int(os.getenv("TASK_FEED_CLIENT_BUFFER", "100"))
+TASK_FEED_MAX_SUBSCRIBERS = int(
+    os.getenv("TASK_FEED_MAX_SUBSCRIBERS", "10000")
+)
+# Период отправки комментария-пинга в SSE-соединение (сек).
+TASK_FEED_HEARTBEAT = float(os.getenv("TASK_FEED_HEARTBEAT", "15"))
+
+
+class FeedReset(Exception):
+    """Курсор устарел: события после него могли быть потеряны."""
+
+
+def event_matches(event: dict[str, Any], names: Optional[set[str]]) -> bool:
+    """Относится ли событие к задачам names (None - ко всем задачам)."""
+    return names is None or bool(
+        names & {event.get("name"), event.get("old_name")}
+    )
+
+
+class FeedSubscriber:
+    """Подписчик ленты с ограниченной очередью событий."""
+
+    def __init__(self, names: Optional[set[str]], size: int):
+        self.names = names
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.evicted = False
+
+    async def get(self) -> dict[str, Any]:
+        """
+        Возвращает следующее событие. Вызывает FeedReset, если подписчик
+        отключен или лента сброшена.
+        """
+        event = await self.queue.get()
+        if event is None:
+            raise FeedReset()
+        return event
+
+    def get_nowait(self) -> Optional[dict[str, Any]]:
+        """Возвращает событие из очереди без ожидания или None."""
+        try:
+            event = self.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+        if event is None:
+            raise FeedReset()
+        return event
+
+    def close(self):
+        """Очищает очередь и передает подписчику признак отключения."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class TaskFeed:
+    """Раздача событий об изменении задач подписчикам воркера."""
+
+    def __init__(
+        self,
+        buffer_size: int = TASK_FEED_BUFFER_SIZE,
+        client_buffer: int = TASK_FEED_CLIENT_BUFFER,
+        max_subscribers: int = TASK_FEED_MAX_SUBSCRIBERS
+    ):
+        self.client_buffer = client_buffer
+        self.max_subscribers = max_subscribers
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.published = 0
+        self.evicted = 0
+        self.resets = 0
+        self._buffer: deque[dict[str, Any]] = deque(maxlen=buffer_size)
+        self._subscribers: set[FeedSubscriber] = set()
+
+    @property
+    def cursor(self) -> str:
+        """Курсор текущего конца ленты."""
+        return f"{self.epoch}-{self.seq}"
+
+    def publish(self, event: dict[str, Any]):
+        """Добавляет событие в ленту и раздает его подписчикам."""
+        self.seq += 1
+        event = {"id": f"{self.epoch}-{self.seq}", **event}
+        self._buffer.append(event)
+        self.published += 1
+        for subscriber in list(self._subscribers):
+            if not event_matches(event, subscriber.names):
+                continue
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.evict(subscriber)
+
+    def reset(self):
+        """
+        Начинает новую эпоху: события могли быть потеряны, поэтому буфер
+        очищается, а подписчики отключаются.
+        """
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.resets += 1
+        self._buffer.clear()
+        for subscriber in list(self._subscribers):
+            self._subscribers.discard(subscriber)
+            subscriber.close()
+
+    def evict(self, subscriber: FeedSubscriber):
+        """Отключает подписчика, не успевающего забирать события."""
+        self._subscribers.discard(subscriber)
+        subscriber.evicted = True
+        subscriber.close()
+        self.evicted += 1
+
+    def subscribe(
+        self, names: Optional[Iterable[str]] = None
+    ) -> Optional[FeedSubscriber]:
+        """
+        Добавляет подписчика на события задач names (всех задач, если
+        names не заданы). Возвращает None, если подписчиков слишком много.
+        """
+        if self.full():
+            return None
+        subscriber = FeedSubscriber(
+            set(names) if names else None, self.client_buffer
+        )
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def full(self) -> bool:
+        """Достигнуто ли наибольшее число подписчиков."""
+        return len(self._subscribers) >= self.max_subscribers
+
+    def unsubscribe(self, subscriber: FeedSubscriber):
+        self._subscribers.discard(subscriber)
+
+    def read_since(
+        self, cursor: str, names: Optional[Iterable[str]] = None
+    ) -> list[dict[str, Any]]:
+        """
+        Возвращает события после курсора из буфера. Вызывает FeedReset,
+        если курсор другой эпохи или события после него уже вытеснены
+        из буфера.
+        """
+        epoch, _, seq = cursor.partition("-")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self.seq:
+            raise FeedReset()
+        seq = int(seq)
+        first = self.seq - len(self._buffer) + 1
+        if seq + 1 < first:
+            raise FeedReset()
+        names = set(names) if names else None
+        events = list(self._buffer)[seq + 1 - first:]
+        return [event for event in events if event_matches(event, names)]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "cursor": self.cursor,
+            "subscribers": len(self._subscribers),
+            "buffered": len(self._buffer),
+            "published": self.published,
+            "evicted": self.evicted,
+            "resets": self.resets,
+        }
+
+
+task_feed = TaskFeed()
+task_events.add_handler(task_feed.publish)
+task_events.add_reset_handler(task_feed.reset)
+
+
+def too_many_subscribers_error() -> HTTPException:
+    """Возвращает исключение о превышении числа подписчиков ленты."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Слишком много подписчиков ленты событий."
+    )
+
+
+def format_sse(event: str, data: Any, event_id: Optional[str] = None) -> bytes:
+    """Кодирует событие в формат text/event-stream."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return b"".join((
+        f"{head}event: {event}\ndata: ".encode("utf-8"), dumps(data), b"\n\n"
+    ))
+
+
+def subscribe_events(
+    names: Optional[list[str]] = None, last_event_id: Optional[str] = None
+) -> AsyncIterator[bytes]:
+    """
+    Возвращает генератор потока SSE для клиента. Подписка выполняется
+    при начале чтения потока, поэтому клиент, отключившийся до начала
+    ответа, не остается в числе подписчиков. Если подписчиков уже
+    слишком много, ошибка 503 возвращается сразу.
+    """
+    if task_feed.full():
+        raise too_many_subscribers_error()
+    return stream_events(names, last_event_id)
+
+
+async def stream_events(
+    names: Optional[list[str]], last_event_id: Optional[str]
+) -> AsyncIterator[bytes]:
+    """
+    Поток SSE: пропущенные после last_event_id события, затем новые
+    события по мере поступления и комментарий-пинг каждые
+    TASK_FEED_HEARTBEAT секунд. Подписка и чтение пропущенных событий
+    выполняются сразу (без ожидания между ними), поэтому события
+    не теряются и не повторяются. При устаревшем курсоре или отключении
+    подписчика отправляет событие reset с текущим курсором и завершает
+    поток.
+    """
+    subscriber = task_feed.subscribe(names)
+    if subscriber is None:
+        yield format_sse("reset", {
+            "cursor": task_feed.cursor, "evicted": True
+        })
+        return
+    try:
+        if last_event_id:
+            try:
+                missed = task_feed.read_since(last_event_id, names)
+            except FeedReset:
+                yield format_sse("reset", {"cursor": task_feed.cursor})
+                return
+        else:
+            missed = []
+        yield format_sse("ready", {"cursor": task_feed.cursor})
+        for event in missed:
+            yield format_sse("task", event, event["id"])
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscriber.get(), TASK_FEED_HEARTBEAT
+                )
+            except TimeoutError:
+                yield b": ping\n\n"
+                continue
+            except FeedReset:
+                yield format_sse("reset", {
+                    "cursor": task_feed.cursor, "evicted": subscriber.evicted
+                })
+                return
+            yield format_sse("task", event, event["id"])
+    finally:
+        task_feed.unsubscribe(subscriber)
+
+
+async def poll_events(
+    since: Optional[str] = None,
+    names: Optional[list[str]] = None,
+    timeout: float = 0
+) -> dict[str, Any]:
+    """
+    Long-poll: возвращает события после курсора since сразу, если они
+    есть в буфере, иначе ждет первое событие до timeout секунд.
+    Без since ожидаются события, начиная с текущего момента. Ответ
+    содержит курсор для следующего запроса; reset=True означает, что
+    курсор устарел и задачи нужно перечитать.
+    """
+    cursor = since or task_feed.cursor
+    try:
+        events = task_feed.read_since(cursor, names)
+    except FeedReset:
+        return {"events": [], "cursor": task_feed.cursor, "reset": True}
+    if not events and timeout > 0:
+        subscriber = task_feed.subscribe(names)
+        if subscriber is None:
+            raise too_many_subscribers_error()
+        try:
+            events.append(await asyncio.wait_for(subscriber.get(), timeout))
+            while (event := subscriber.get_nowait()) is not None:
+                events.append(event)
+        except TimeoutError:
+            pass
+        except FeedReset:
+            return {"events": [], "cursor": task_feed.cursor, "reset": True}
+        finally:
+            task_feed.unsubscribe(subscriber)
+    cursor = events[-1]["id"] if events else task_feed.cursor
+    return {"events": events, "cursor": cursor, "reset": False}
@@ -1,156 +1,744 @@
 """
 Модуль бизнес-логики для операций CRUD с задачами.
-Содержит асинхронные функции для работы с задачами в базе данных:
-    - получение списка всех задач
+Содержит асинхронные функции для работы с задачами в хранилище:
+    - постраничное получение списка задач с фильтрами
+    - потоковая выгрузка всех задач (NDJSON или JSON-массив)
+    - полнотекстовый и нечеткий поиск задач по названию и описанию
+    - число задач по статусам (из счетчиков)
+    - чтение задач из архива завершенных задач
+    - захват задач обработчиками очереди (аренда), продление и
+      освобождение аренды, возврат в очередь задач с истекшей арендой
     - получение задачи по имени
     - создание новой задачи с проверкой на дубликаты
     - обновление существующей задачи
     - обновление или создание задачи, если такой еще не существует
     - удаление задачи
-Использует Singleton-класс для подключения к БД, модели из tasks_model
-и схемы из tasks_schemas для валидации данных.
+    - пакетные создание, изменение и удаление задач
+    - ETag задачи и списка задач, условные (If-Match) изменение,
+      замена и удаление задачи
+Использует хранилище задач из app.storage (PostgreSQL или память
+процесса, чтение списка и задачи по имени может идти через реплики),
+внутрипроцессный кэш задач по названию (заполняется при чтении
+и записи одной задачи, инвалидируется при пакетных операциях и
+захвате задач, а также по событиям об изменении задач из других
+процессов), модели из tasks_model и схемы из tasks_schemas для
+валидации данных.
 Все функции обрабатывают ошибки с помощью HTTPException и возвращают
 коды статуса.
 """
 
-from typing import Optional
+import base64
+import binascii
+import hashlib
+import json
+import math
+import os
+import uuid
+from typing import AsyncIterator, Optional
 
 from fastapi import HTTPException
 from starlette import status
 
-from app.db import DatabaseSingleton
-from app.models.tasks_model import tasks_table
-from app.schemas.tasks_schemas import TaskBase, TaskUpdate
-from models.tasks_model import TaskStatus
+from app.models.tasks_model import TaskStatus
+from app.schemas.tasks_schemas import (
+    TaskBase, TaskBulkResult, TaskBulkUpdate, TaskLease, TaskUpdate
+)
+from app.storage import create_repository
+from app.storage.base import TaskExistsError
+from app.utils.cache import task_cache
+from app.utils.responses import dumps
+from app.utils.task_events import task_events
 
 
-db = DatabaseSingleton()
+# Хранилище задач (выбирается переменной окружения STORAGE_BACKEND).
+repository = create_repository()
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_CHUNK_SIZE = 500
+SEARCH_MAX_QUERY_LENGTH = 256
+# Максимальное число задач в одном пакетном запросе.
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+# Срок аренды задачи обработчиком по умолчанию и максимальный (сек).
+TASK_LEASE_SECONDS = int(os.getenv("TASK_LEASE_SECONDS", "60"))
+MAX_LEASE_SECONDS = int(os.getenv("MAX_LEASE_SECONDS", "3600"))
 
-async def get_task_by_name(name: str) -> TaskBase | None:
-    """Вспомогательная функция для получения задачи из БД по имени."""
-    task = await db.fetch_one(
-        tasks_table.select().where(tasks_table.c.name == name)
+
+def invalidate_changed_task(event: dict):
+    """Инвалидирует кэш по событию об изменении задачи в хранилище."""
+    names = (event.get("name"), event.get("old_name"))
+    task_cache.invalidate(*(name for name in names if name))
+
+
+task_events.add_handler(invalidate_changed_task)
+task_events.add_reset_handler(task_cache.clear)
+
+
+def task_exists_error(name: str) -> HTTPException:
+    """Возвращает исключение о том, что задача с таким именем уже есть."""
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Задача {name} уже существует."
     )
-    if task:
-        return TaskBase(**task)
-    return None
 
 
-async def get_all_tasks() -> list[TaskBase]:
-    """Получает все задачи."""
-    query = tasks_table.select()
-    rows = await db.fetch_all(query)
-    return [TaskBase(**row) for row in rows]
+def task_not_found_error(name: str) -> HTTPException:
+    """Возвращает исключение о том, что задача не найдена."""
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Задача {name} не найдена."
+    )
+
 
+def precondition_failed_error(name: str) -> HTTPException:
+    """Возвращает исключение о том, что версия задачи не совпала."""
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail=f"Задача {name} была изменена."
+    )
 
-async def get_one_task(name: str) -> TaskBase:
-    """Выполняет поиск задачи по названию."""
-    query = tasks_table.select().where(tasks_table.c.name == name)
-    result = await db.fetch_one(query)
-    if result is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Задача {name} не найдена."
-        )
-    return TaskBase(**result)
 
+def lease_conflict_error(name: str) -> HTTPException:
+    """
+    Возвращает исключение о том, что аренда задачи истекла или
+    принадлежит другому обработчику.
+    """
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Аренда задачи {name} истекла или принадлежит "
+               "другому обработчику."
+    )
 
-async def create_task(task: TaskBase) -> TaskBase:
-    """Создает новую задачу."""
-    db_task = await get_task_by_name(task.name)
-    if db_task is not None:
+
+def parse_etags(header: str) -> Optional[list[str]]:
+    """
+    Разбирает заголовок If-Match/If-None-Match в список ETag в том виде,
+    в каком они переданы (в кавычках, слабые - с префиксом W/). Для "*"
+    возвращает None (подходит любая версия).
+    """
+    if header.strip() == "*":
+        return None
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def etag_matches(
+    header: Optional[str], etag: Optional[str], strong: bool = False
+) -> bool:
+    """
+    Проверяет, совпадает ли ETag с одним из тегов заголовка: для
+    If-None-Match - слабым сравнением (префикс W/ не учитывается), для
+    If-Match (strong=True) - строгим, при котором слабые теги не
+    совпадают ни с чем (RFC 9110).
+    """
+    if not header or etag is None:
+        return False
+    tags = parse_etags(header)
+    if tags is None:
+        return True
+    if strong:
+        return etag in tags
+    return etag.removeprefix("W/") in [tag.removeprefix("W/") for tag in tags]
+
+
+def if_match_etags(if_match: Optional[str]) -> Optional[list[tuple[str, int]]]:
+    """
+    Возвращает пары (uuid, версия строки) из ETag задачи в заголовке
+    If-Match или None, если условие не задано или задано как "*".
+    Сравнение строгое: слабые теги и теги не в формате ETag задачи
+    не совпадают ни с одной версией.
+    """
+    if if_match is None:
+        return None
+    tags = parse_etags(if_match)
+    if tags is None:
+        return None
+    etags = []
+    for tag in tags:
+        task_uuid, _, version = tag.strip('"').rpartition("-")
+        try:
+            task_uuid, version = uuid.UUID(task_uuid).hex, int(version)
+        except ValueError:
+            continue
+        if tag == f'"{task_uuid}-{version}"':
+            etags.append((task_uuid, version))
+    return etags
+
+
+async def missing_or_changed_error(
+    name: str, if_match: Optional[str]
+) -> HTTPException:
+    """
+    Определяет причину, по которой условный запрос не затронул строку:
+    задачи нет (404) или ее версия не совпала с If-Match (412).
+    """
+    if if_match is not None and await repository.exists(name):
+        return precondition_failed_error(name)
+    return task_not_found_error(name)
+
+
+def encode_cursor(*position) -> str:
+    """
+    Кодирует позицию последней задачи страницы в курсор
+    (по умолчанию - пара название и uuid).
+    """
+    raw = json.dumps(
+        [value if isinstance(value, float) else str(value)
+         for value in position],
+        ensure_ascii=False
+    )
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, size: int = 2) -> tuple:
+    """
+    Декодирует курсор в позицию последней задачи из size значений,
+    последние два из которых - название и uuid задачи, а предыдущие
+    (релевантность в поиске) - конечные числа.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii"))
+        position = json.loads(raw.decode("utf-8"))
+        if not isinstance(position, list) or len(position) != size:
+            raise ValueError(cursor)
+        name, task_uuid = position[-2:]
+        if not isinstance(name, str) or not isinstance(task_uuid, str):
+            raise ValueError(cursor)
+        uuid.UUID(task_uuid)
+        for value in position[:-2]:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(cursor)
+            if not math.isfinite(value):
+                raise ValueError(cursor)
+    except (
+        binascii.Error, UnicodeError, ValueError, TypeError
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Задача {task.name} уже существует."
+            detail="Некорректный курсор."
         )
-    query = tasks_table.insert().values(
-        name=task.name,
-        description=task.description,
-        status=task.status.name
+    return tuple(position)
+
+
+def task_row_to_dict(row) -> dict:
+    """
+    Преобразует строку задачи в словарь для JSON-ответа напрямую,
+    без создания TaskBase (формат совпадает с TaskBase.to_dict).
+    """
+    return {
+        "uuid": str(row["uuid"]).replace("-", ""),
+        "name": row["name"],
+        "description": row["description"],
+        "status": row["status"].value
+    }
+
+
+def cache_task(task: TaskBase, *old_names: str) -> TaskBase:
+    """
+    Обновляет кэш после записи: удаляет записи по прежним названиям
+    задачи и сохраняет ее актуальное состояние.
+    """
+    task_cache.invalidate(task.name, *old_names)
+    task_cache.set(task.name, task)
+    return task
+
+
+async def get_task_by_name(
+    name: str, replica: bool = False, use_cache: bool = True
+) -> TaskBase | None:
+    """
+    Вспомогательная функция для получения задачи по имени.
+    Сначала задача ищется в кэше, при промахе читается из хранилища
+    (при replica=True - возможно, с реплики).
+    """
+    if use_cache:
+        task = task_cache.get(name)
+        if task is not None:
+            return task
+    generation = task_cache.generation
+    row = await repository.get(name, replica=replica)
+    if row is None:
+        return None
+    task = TaskBase.from_row(row)
+    task_cache.set_if_fresh(name, task, generation)
+    return task
+
+
+def same_source():
+    """
+    Контекст, в котором чтения из хранилища идут из одного источника
+    (ETag списка и страница списка).
+    """
+    return repository.same_source()
+
+
+async def get_tasks_etag(
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    task_status: Optional[TaskStatus] = None,
+    name_prefix: Optional[str] = None,
+    active: bool = False
+) -> str:
+    """
+    Вычисляет ETag страницы списка задач без чтения самих строк:
+    по числу подходящих под фильтры задач, версии списка в хранилище
+    (меняется при любом изменении задач) и параметрам запроса.
+    ETag вычисляется до чтения страницы в том же контексте
+    same_source(): изменение между двумя чтениями делает ETag только
+    старее страницы, и следующий запрос получит ее заново.
+    """
+    count, version = await repository.list_version(
+        task_status, name_prefix, active
+    )
+    params = json.dumps(
+        [
+            limit, after, task_status and task_status.name, name_prefix,
+            active
+        ],
+        ensure_ascii=False
     )
-    await db.execute(query)
-    return await get_task_by_name(task.name)
+    digest = hashlib.sha1(params.encode("utf-8")).hexdigest()[:16]
+    return f'"{count}-{version}-{digest}"'
 
 
-async def task_modify(name: str, task: TaskUpdate) -> TaskBase:
-    """Изменяет задачу."""
-    db_task = await get_task_by_name(name)
-    if db_task is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Задача {name} не найдена."
+async def get_all_tasks(
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    task_status: Optional[TaskStatus] = None,
+    name_prefix: Optional[str] = None,
+    active: bool = False
+) -> tuple[list[dict], Optional[str]]:
+    """
+    Получает страницу задач, упорядоченных по (name, uuid).
+    Пагинация курсорная (keyset): курсор - позиция (name, uuid) последней
+    задачи страницы, поэтому время выборки не зависит от номера
+    страницы. Возвращает задачи в виде словарей для JSON-ответа (строки
+    преобразуются напрямую, без TaskBase) и курсор следующей страницы
+    (None, если страница последняя).
+    """
+    rows = await repository.list_tasks(
+        limit + 1,
+        decode_cursor(after) if after is not None else None,
+        task_status,
+        name_prefix,
+        active
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["name"], last["uuid"])
+    return [task_row_to_dict(row) for row in rows], next_cursor
+
+
+async def search_tasks(
+    q: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    task_status: Optional[TaskStatus] = None,
+    active: bool = False
+) -> tuple[list[dict], Optional[str]]:
+    """
+    Ищет задачи по названию и описанию.
+    Результаты упорядочены по убыванию релевантности, затем по
+    (name, uuid). Пагинация курсорная по (релевантность, name, uuid).
+    Возвращает задачи в виде словарей и курсор следующей страницы.
+    """
+    rows = await repository.search(
+        q,
+        limit + 1,
+        decode_cursor(after, size=3) if after is not None else None,
+        task_status,
+        active
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            float(last["rank"]), last["name"], last["uuid"]
         )
-    if not task or not task.model_dump(exclude_unset=True):
-        return db_task
-    data_to_change = {
-        k: v.name if k == "status" else v
-        for k, v in task.model_dump(exclude_unset=True).items()
+    return [task_row_to_dict(row) for row in rows], next_cursor
+
+
+async def get_task_stats(verify: bool = False) -> dict:
+    """
+    Возвращает число задач по статусам и общее число задач.
+    Значения читаются из счетчиков статусов, которые хранилище ведет при
+    каждой записи, поэтому время ответа не зависит от числа задач.
+    При verify=True те же данные подсчитываются по самим задачам и
+    возвращаются в поле actual вместе с признаком совпадения consistent.
+    """
+    counts = {
+        source: {task_status.value: 0 for task_status in TaskStatus}
+        for source in ("counters", "actual")
+    }
+    for source, values in (await repository.status_counts(verify)).items():
+        for task_status, count in values.items():
+            counts[source][task_status.value] += count
+    stats = {
+        "counts": counts["counters"],
+        "total": sum(counts["counters"].values())
+    }
+    if verify:
+        stats["actual"] = counts["actual"]
+        stats["consistent"] = counts["actual"] == counts["counters"]
+    return stats
+
+
+async def export_tasks(json_array: bool = False) -> AsyncIterator[bytes]:
+    """
+    Потоково выгружает все задачи.
+    Строки читаются из хранилища потоком и кодируются по мере чтения,
+    поэтому память не зависит от числа задач. По умолчанию отдает
+    NDJSON (одна задача на строку), при json_array=True - JSON-массив.
+    Закодированные строки отправляются пачками по EXPORT_CHUNK_SIZE.
+    """
+    separator = b"," if json_array else b"\n"
+    chunk = [b"["] if json_array else []
+    first = True
+    count = 0
+    async for row in repository.iterate():
+        if json_array and not first:
+            chunk.append(separator)
+        chunk.append(dumps(task_row_to_dict(row)))
+        if not json_array:
+            chunk.append(separator)
+        first = False
+        count += 1
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield b"".join(chunk)
+            chunk = []
+    if json_array:
+        chunk.append(b"]")
+    if chunk:
+        yield b"".join(chunk)
+
+
+async def get_archived_task(name: str) -> TaskBase | None:
+    """Возвращает последнюю перенесенную в архив задачу с таким названием."""
+    row = await repository.get_archived(name)
+    if row is None:
+        return None
+    return TaskBase.from_row(row)
+
+
+async def get_archived_tasks(
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    name_prefix: Optional[str] = None
+) -> tuple[list[dict], Optional[str]]:
+    """
+    Получает страницу задач из архива, упорядоченных по (name, uuid),
+    с курсорной пагинацией, как в get_all_tasks.
+    """
+    rows = await repository.list_archived(
+        limit + 1,
+        decode_cursor(after) if after is not None else None,
+        name_prefix
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["name"], last["uuid"])
+    return [task_row_to_dict(row) for row in rows], next_cursor
+
+
+async def archive_completed_tasks(age: float, batch_size: int) -> list[str]:
+    """
+    Переносит в архив до batch_size завершенных задач, не менявшихся
+    дольше age секунд. Возвращает названия перенесенных задач.
+    """
+    names = await repository.archive_completed(age, batch_size)
+    task_cache.invalidate(*names)
+    return names
+
+
+async def get_one_task(
+    name: str, include_archived: bool = False
+) -> TaskBase:
+    """
+    Выполняет поиск задачи по названию. При include_archived=True
+    задача, не найденная среди текущих задач, ищется в архиве.
+    """
+    task = await get_task_by_name(name, replica=True)
+    if task is None and include_archived:
+        task = await get_archived_task(name)
+    if task is None:
+        raise task_not_found_error(name)
+    return task
+
+
+async def create_task(task: TaskBase) -> TaskBase:
+    """
+    Создает новую задачу. Проверка на дубликаты выполняется хранилищем
+    при вставке (в PostgreSQL - уникальным индексом по названию, в том
+    числе при параллельных запросах): если задача с таким названием уже
+    есть, возвращается ошибка 400.
+    """
+    row = await repository.create(task.name, task.description, task.status)
+    if row is None:
+        raise task_exists_error(task.name)
+    return cache_task(TaskBase.from_row(row))
+
+
+def task_changes(task: Optional[TaskUpdate]) -> dict:
+    """Возвращает заданные (не None) поля задачи для изменения."""
+    if task is None:
+        return {}
+    return {
+        k: v for k, v in task.model_dump(exclude_unset=True).items()
         if v is not None
     }
-    query = (
-        tasks_table.update()
-        .where(tasks_table.c.name == name)
-        .values(**data_to_change)
-        .returning(
-            tasks_table.c.name,
-            tasks_table.c.description,
-            tasks_table.c.status
+
+
+async def update_task(
+    name: str, changes: dict, if_match: Optional[str]
+) -> Optional[TaskBase]:
+    """
+    Изменяет задачу (при заданном If-Match - только нужной версии).
+    Возвращает None, если задача не изменена.
+    """
+    try:
+        row = await repository.update(
+            name, changes, if_match_etags(if_match)
         )
-    )
-    modify = await db.fetch_one(query)
-    return TaskBase(**modify)
+    except TaskExistsError as exc:
+        raise task_exists_error(exc.name)
+    if row is None:
+        task_cache.invalidate(name)
+        return None
+    return cache_task(TaskBase.from_row(row), name)
+
+
+async def task_modify(
+    name: str,
+    task: Optional[TaskUpdate],
+    if_match: Optional[str] = None
+) -> TaskBase:
+    """
+    Изменяет задачу одной операцией хранилища: пустой результат
+    означает, что задачи нет. Только для пустого (no-op) тела запроса
+    задача читается по названию.
+    При заданном If-Match задача изменяется только при совпадении версии,
+    иначе возвращается ошибка 412.
+    """
+    data_to_change = task_changes(task)
+    if not data_to_change:
+        db_task = await get_task_by_name(name, use_cache=if_match is None)
+        if db_task is None:
+            raise task_not_found_error(name)
+        if if_match is not None and not etag_matches(
+            if_match, db_task.etag, strong=True
+        ):
+            raise precondition_failed_error(name)
+        return db_task
+    modified = await update_task(name, data_to_change, if_match)
+    if modified is None:
+        raise await missing_or_changed_error(name, if_match)
+    return modified
 
 
 async def task_modify_or_create(
-    name: str, task: Optional[TaskBase] = None
+    name: str,
+    task: Optional[TaskBase] = None,
+    if_match: Optional[str] = None
 ) -> tuple[TaskBase, int]:
-    """Изменяет или создает (если такой не существует) задачу."""
-    db_task = await get_task_by_name(name)
-    if task is not None:
-        data = {
-            k: v.name if k == "status" else v
-            for k, v in task.model_dump(exclude_unset=True).items()
-            if v is not None
-        }
-    else:
-        data = {"name": name, "status": TaskStatus.CREATED.name}
-    if db_task is None:
-        query = tasks_table.insert().values(**data)
-        await db.execute(query)
-        query_get_task = tasks_table.select().where(
-            tasks_table.c.name == name
-        )
-        row = await db.fetch_one(query_get_task)
-        return TaskBase(**row), status.HTTP_201_CREATED
-    else:
-        if task is None:
-            return db_task.model_dump(), status.HTTP_200_OK
-        query = (
-            tasks_table.update()
-            .where(tasks_table.c.name == name)
-            .values(**data)
-            .returning(
-                tasks_table.c.name,
-                tasks_table.c.description,
-                tasks_table.c.status
-            )
-        )
-        modify = await db.fetch_one(query)
-        return TaskBase(**modify), status.HTTP_200_OK
+    """
+    Изменяет или создает (если такой не существует) задачу.
+    Если название задачи не меняется, выполняется одна операция
+    хранилища (в PostgreSQL - INSERT ... ON CONFLICT DO UPDATE), а код
+    ответа (201 или 200) определяется по признаку вставки.
+    Переименование выполняется изменением по старому названию, а если
+    такой задачи нет - вставкой новой.
+    При заданном If-Match задача только изменяется, и только при
+    совпадении версии, иначе возвращается ошибка 412.
+    """
+    data = task_changes(task) if task is not None else {"name": name}
+    if data["name"] != name or if_match is not None:
+        modified = await update_task(name, data, if_match)
+        if modified is not None:
+            return modified, status.HTTP_200_OK
+        if if_match is not None:
+            raise precondition_failed_error(name)
+        return await create_task(task), status.HTTP_201_CREATED
+    row, inserted = await repository.upsert(
+        name, {k: v for k, v in data.items() if k != "name"}
+    )
+    new_task = cache_task(TaskBase.from_row(row))
+    if inserted:
+        return new_task, status.HTTP_201_CREATED
+    return new_task, status.HTTP_200_OK
 
 
-async def remove_task(name: str) -> int:
-    """Удаляет задачу."""
-    query = (
-        tasks_table.delete()
-        .where(tasks_table.c.name == name)
-        .returning(tasks_table.c.name)
-    )
-    deleted = await db.fetch_one(query)
-    if deleted is None:
+async def remove_task(name: str, if_match: Optional[str] = None) -> int:
+    """Удаляет задачу (при заданном If-Match - только нужной версии)."""
+    deleted = await repository.delete(name, if_match_etags(if_match))
+    task_cache.invalidate(name)
+    if not deleted:
+        raise await missing_or_changed_error(name, if_match)
+    return status.HTTP_204_NO_CONTENT
+
+
+async def bulk_create_tasks(tasks: list[TaskBase]) -> list[TaskBulkResult]:
+    """
+    Создает задачи одной пакетной операцией хранилища (в одной
+    транзакции). Для каждой задачи возвращает 201 или 400, если задача
+    с таким названием уже существует (в хранилище или ранее в этом же
+    пакете). Созданные задачи не кладутся в кэш: пакет до BULK_MAX_ITEMS
+    задач вытеснил бы из него часто читаемые задачи.
+    """
+    rows = await repository.bulk_create([
+        (task.name, task.description, task.status) for task in tasks
+    ])
+    created = {row["name"]: TaskBase.from_row(row) for row in rows}
+    task_cache.invalidate(*created)
+    results = []
+    for task in tasks:
+        new_task = created.pop(task.name, None)
+        if new_task is None:
+            results.append(TaskBulkResult(
+                name=task.name,
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=task_exists_error(task.name).detail
+            ))
+        else:
+            results.append(TaskBulkResult(
+                name=task.name,
+                status_code=status.HTTP_201_CREATED,
+                task=new_task
+            ))
+    return results
+
+
+async def bulk_modify_tasks(
+    tasks: list[TaskBulkUpdate]
+) -> list[TaskBulkResult]:
+    """
+    Изменяет описание и/или статус задач одной пакетной операцией
+    хранилища (в одной транзакции). Незаданные (None) поля не меняются.
+    Если задача указана в пакете несколько раз, применяются значения
+    последнего вхождения. Записи измененных задач удаляются из кэша.
+    """
+    changes = {
+        task.name: (task.name, task.description, task.status)
+        for task in tasks
+    }
+    modified = {
+        row["name"]: TaskBase.from_row(row)
+        for row in await repository.bulk_update(list(changes.values()))
+    }
+    task_cache.invalidate(*modified)
+    results = []
+    for task in tasks:
+        if task.name in modified:
+            results.append(TaskBulkResult(
+                name=task.name,
+                status_code=status.HTTP_200_OK,
+                task=modified[task.name]
+            ))
+        else:
+            results.append(TaskBulkResult(
+                name=task.name,
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=task_not_found_error(task.name).detail
+            ))
+    return results
+
+
+async def bulk_remove_tasks(names: list[str]) -> list[TaskBulkResult]:
+    """
+    Удаляет задачи одной пакетной операцией хранилища (в одной
+    транзакции). Для каждого названия возвращает 204 или 404.
+    """
+    deleted = await repository.bulk_delete(names)
+    task_cache.invalidate(*names)
+    results = []
+    for name in names:
+        if name in deleted:
+            deleted.discard(name)
+            results.append(TaskBulkResult(
+                name=name, status_code=status.HTTP_204_NO_CONTENT
+            ))
+        else:
+            results.append(TaskBulkResult(
+                name=name,
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=task_not_found_error(name).detail
+            ))
+    return results
+
+
+async def claim_tasks(
+    worker: str,
+    limit: int = 1,
+    lease: int = TASK_LEASE_SECONDS
+) -> list[TaskLease]:
+    """
+    Захватывает до limit задач в статусе "Создано" в порядке последнего
+    изменения: параллельные обработчики не ждут друг друга и не получают
+    одну задачу дважды. Захваченные задачи переводятся в статус
+    "В работе" с арендой на lease секунд. Записи захваченных задач
+    удаляются из кэша, а не обновляются.
+    """
+    leases = [
+        TaskLease.from_row(row)
+        for row in await repository.claim(worker, limit, lease)
+    ]
+    task_cache.invalidate(*(task_lease.task.name for task_lease in leases))
+    return leases
+
+
+async def lease_error(name: str) -> HTTPException:
+    """Определяет, нет задачи (404) или аренда не принадлежит (409)."""
+    if not await repository.exists(name):
+        return task_not_found_error(name)
+    return lease_conflict_error(name)
+
+
+async def renew_lease(
+    name: str, worker: str, lease: int = TASK_LEASE_SECONDS
+) -> TaskLease:
+    """
+    Продлевает аренду задачи обработчиком worker на lease секунд.
+    Продлить можно только свою еще не истекшую аренду.
+    """
+    row = await repository.renew_lease(name, worker, lease)
+    if row is None:
+        raise await lease_error(name)
+    task_lease = TaskLease.from_row(row)
+    cache_task(task_lease.task)
+    return task_lease
+
+
+async def release_task(
+    name: str,
+    worker: str,
+    task_status: TaskStatus = TaskStatus.CREATED
+) -> TaskBase:
+    """
+    Освобождает аренду задачи обработчиком worker: возвращает задачу
+    в очередь (статус "Создано") или завершает ее (статус "Завершено").
+    Освободить можно только свою еще не истекшую аренду: задачу с
+    истекшей арендой уже может вернуть в очередь и захватить другой
+    обработчик. Аренда снимается хранилищем при смене статуса.
+    """
+    if task_status == TaskStatus.IN_PROGRESS:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Задача {name} не найдена."
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Освобожденная задача не может остаться в работе."
         )
-    return status.HTTP_204_NO_CONTENT
+    row = await repository.release(name, worker, task_status)
+    if row is None:
+        raise await lease_error(name)
+    return cache_task(TaskBase.from_row(row))
+
+
+async def reap_expired_leases(batch_size: int) -> list[str]:
+    """
+    Возвращает в очередь (статус "Создано") до batch_size задач с
+    истекшей арендой. Возвращает названия этих задач.
+    """
+    names = await repository.reap_expired_leases(batch_size)
+    task_cache.invalidate(*names)
+    return names
@@ -0,0 +1 @@
+"""Бенчмарки менеджера задач."""
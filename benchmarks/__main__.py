@@ -0,0 +1,32 @@
+"""
+Точка входа бенчмарков: python -m benchmarks <бенчмарк> [параметры].
+    - load: нагрузочный тест API задач (benchmarks.load_test)
+    - active: список активных задач на большой таблице
+      (benchmarks.bench_active_tasks)
+    - rows: обработка строк БД при отдаче списка задач
+      (benchmarks.bench_task_rows)
+Параметры бенчмарка: python -m benchmarks <бенчмарк> --help.
+"""
+
+import importlib
+import sys
+
+
+BENCHMARKS = {
+    "load": "benchmarks.load_test",
+    "active": "benchmarks.bench_active_tasks",
+    "rows": "benchmarks.bench_task_rows",
+}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(__doc__.strip(), file=sys.stderr)
+        sys.exit(2)
+    module = importlib.import_module(BENCHMARKS[sys.argv[1]])
+    sys.argv[0] = f"python -m benchmarks {sys.argv[1]}"
+    module.main(sys.argv[2:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Бенчмарк списка активных (незавершенных) задач на большой таблице.
+Заполняет таблицу tasks (--fill) total задачами, из которых active
+незавершенные, равномерно распределенные по названию, и измеряет время
+страницы списка задач и ETag списка через tasks_utils для случаев:
+    - all: без фильтров
+    - active: active=True (частичные индексы ix_tasks_active_*)
+    - in_progress: status=IN_PROGRESS
+Заполнение удаляет все задачи и счетчики статусов, поэтому выполняется
+только на отдельной БД с примененными миграциями
+(POSTGRES_DB=bench_db alembic upgrade head) и с хранилищем PostgreSQL
+(STORAGE_BACKEND=postgres): название БД передается в --fill и должно
+совпадать с БД подключения, а основная БД из .env (POSTGRES_DB)
+не заполняется.
+Запуск: POSTGRES_DB=bench_db python -m benchmarks active
+    [--fill bench_db] [--total N] [--active N] [--pages N] [--explain]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import Optional
+
+from dotenv import dotenv_values
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.models.tasks_model import TaskStatus, tasks_table
+from app.storage import postgres
+from app.utils import tasks_utils
+
+
+FILL_BATCH_SIZE = 1_000_000
+
+CASES = {
+    "all": {},
+    "active": {"active": True},
+    "in_progress": {"task_status": TaskStatus.IN_PROGRESS},
+}
+
+
+async def check_fill_database(name: str):
+    """
+    Проверяет, что заполняемая БД - та, к которой выполнено подключение.
+    Иначе завершает бенчмарк.
+    """
+    current = await postgres.db.fetch_val("SELECT current_database()")
+    if current != name:
+        sys.exit(
+            f"Подключение к БД {current}, а не {name}: заполнение "
+            "отменено. Задайте POSTGRES_DB."
+        )
+
+
+async def fill(total: int, active: int):
+    """
+    Заполняет таблицу задач пачками по FILL_BATCH_SIZE строк.
+    Каждая (total // active)-я задача незавершенная. Триггер уведомлений
+    на время заполнения отключается, чтобы не переполнить очередь NOTIFY.
+    """
+    step = max(total // active, 1)
+    db = postgres.db
+    await db.execute("TRUNCATE tasks, task_status_counts")
+    await db.execute("ALTER TABLE tasks DISABLE TRIGGER tasks_notify_change")
+    try:
+        for start in range(1, total + 1, FILL_BATCH_SIZE):
+            stop = min(start + FILL_BATCH_SIZE - 1, total)
+            await db.execute(
+                f"""
+                INSERT INTO tasks (name, description, status)
+                SELECT
+                    'bench_task_' || lpad(i::text, 10, '0'),
+                    'Описание задачи ' || i,
+                    CASE
+                        WHEN i % {step} <> 0 THEN 'COMPLETED'
+                        WHEN i % 2 = 0 THEN 'IN_PROGRESS'
+                        ELSE 'CREATED'
+                    END::taskstatus
+                FROM generate_series({start}, {stop}) AS i
+                """
+            )
+            print(f"заполнено {stop} из {total}")
+    finally:
+        await db.execute(
+            "ALTER TABLE tasks ENABLE TRIGGER tasks_notify_change"
+        )
+    await db.execute("VACUUM ANALYZE tasks")
+
+
+async def explain(params: dict):
+    """Печатает план запроса первой страницы списка задач."""
+    query = postgres.filter_tasks(
+        select(*postgres.TASK_COLUMNS), **params
+    ).order_by(
+        tasks_table.c.name, tasks_table.c.uuid
+    ).limit(tasks_utils.DEFAULT_PAGE_SIZE + 1)
+    sql = query.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    for row in await postgres.db.fetch_all(f"EXPLAIN ANALYZE {sql}"):
+        print("   ", row[0])
+
+
+async def measure(params: dict, pages: int) -> tuple[float, float]:
+    """
+    Возвращает среднее время (мс) страницы списка и ETag списка
+    для pages страниц подряд.
+    """
+    after = None
+    page_time = etag_time = 0.0
+    for _ in range(pages):
+        start = time.perf_counter()
+        await tasks_utils.get_tasks_etag(after=after, **params)
+        etag_time += time.perf_counter() - start
+        start = time.perf_counter()
+        _, after = await tasks_utils.get_all_tasks(after=after, **params)
+        page_time += time.perf_counter() - start
+        if after is None:
+            break
+    return page_time / pages * 1000, etag_time / pages * 1000
+
+
+async def run(args):
+    await tasks_utils.repository.connect()
+    try:
+        if args.fill:
+            await check_fill_database(args.fill)
+            await fill(args.total, args.active)
+        for name, params in CASES.items():
+            page_ms, etag_ms = await measure(params, args.pages)
+            print(
+                f"{name + ':':13} страница {page_ms:.2f} мс, "
+                f"ETag {etag_ms:.2f} мс"
+            )
+            if args.explain:
+                await explain(params)
+    finally:
+        await tasks_utils.repository.disconnect()
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--fill", metavar="DB_NAME",
+        help="заполнить таблицу задач в БД DB_NAME (текущей БД подключения)"
+    )
+    parser.add_argument("--total", type=int, default=10_000_000)
+    parser.add_argument("--active", type=int, default=100_000)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--explain", action="store_true")
+    args = parser.parse_args(argv)
+    if args.fill and args.fill == dotenv_values().get("POSTGRES_DB"):
+        parser.error(
+            f"БД {args.fill} - основная БД из .env, ее заполнять нельзя."
+        )
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Микробенчмарк обработки строк БД при отдаче списка задач.
+Сравнивает стоимость одной строки:
+    - validated: TaskBase(**row) с полной валидацией, затем повторная
+      валидация и сериализация по response_model, как это делает FastAPI
+    - trusted: TaskBase.from_row (без валидации) и TaskBase.to_dict
+    - direct: строка БД сразу в словарь (task_row_to_dict) и кодирование
+      через app.utils.responses.dumps (orjson), как в GET /tasks/
+В первых двух случаях результат кодируется через json.dumps.
+Запуск: python -m benchmarks rows [--rows N] [--repeat N]
+"""
+
+import argparse
+import json
+import time
+import uuid
+import warnings
+from typing import Optional
+
+from pydantic import TypeAdapter
+
+from app.models.tasks_model import TaskStatus
+from app.schemas.tasks_schemas import TaskBase
+from app.utils.responses import dumps
+from app.utils.tasks_utils import task_row_to_dict
+
+
+def make_rows(count: int) -> list[dict]:
+    """Создает строки в том виде, в каком их возвращает БД."""
+    statuses = list(TaskStatus)
+    return [
+        {
+            "uuid": str(uuid.uuid4()),
+            "name": f"task_{i}",
+            "description": f"Описание задачи {i}" if i % 2 else None,
+            "status": statuses[i % len(statuses)],
+            "version": i,
+        }
+        for i in range(count)
+    ]
+
+
+def validated(rows: list[dict], adapter: TypeAdapter) -> bytes:
+    tasks = [
+        TaskBase(
+            uuid=row["uuid"],
+            name=row["name"],
+            description=row["description"],
+            status=row["status"]
+        )
+        for row in rows
+    ]
+    content = adapter.validate_python([task.model_dump() for task in tasks])
+    content = adapter.dump_python(content, mode="json")
+    return json.dumps(content, ensure_ascii=False).encode("utf-8")
+
+
+def trusted(rows: list[dict], adapter: TypeAdapter) -> bytes:
+    content = [TaskBase.from_row(row).to_dict() for row in rows]
+    return json.dumps(content, ensure_ascii=False).encode("utf-8")
+
+
+def direct(rows: list[dict], adapter: TypeAdapter) -> bytes:
+    return dumps([task_row_to_dict(row) for row in rows])
+
+
+def measure(func, rows: list[dict], repeat: int) -> float:
+    """Возвращает лучшее время на одну строку в микросекундах."""
+    adapter = TypeAdapter(list[TaskBase])
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(rows, adapter)
+        best = min(best, time.perf_counter() - start)
+    return best / len(rows) * 1_000_000
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    rows = make_rows(args.rows)
+    warnings.simplefilter("ignore")
+    before = measure(validated, rows, args.repeat)
+    print(f"validated: {before:.2f} мкс/строка")
+    for func in (trusted, direct):
+        after = measure(func, rows, args.repeat)
+        print(
+            f"{func.__name__ + ':':10} {after:.2f} мкс/строка "
+            f"(ускорение {before / after:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
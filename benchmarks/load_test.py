@@ -0,0 +1,606 @@
+"""
+Нагрузочный тест API задач.
+Заполняет БД seed_tasks задачами через пакетное создание (POST
+/tasks/bulk) и выполняет смешанную нагрузку из чтений и записей
+concurrency параллельными клиентами: в процессе через ASGI (--target
+asgi), через uvicorn, запущенный в отдельном процессе (--target uvicorn),
+или на уже запущенный сервер (--url). Каждый клиент выбирает операции
+по весам (--weight операция=вес) генератором случайных чисел с заданным
+зерном (--seed), поэтому при --requests последовательность запросов
+воспроизводима.
+Для каждого эндпоинта из app/routes/tasks_routes.py выводятся задержки
+p50/p95/p99 и пропускная способность. Поток SSE (GET /tasks/events)
+не измеряется - задержка долгого соединения не имеет смысла, лента
+событий измеряется через long-poll (GET /tasks/events/poll).
+Результаты сохраняются в JSON (--output) и сравниваются с предыдущим
+результатом (--baseline): рост p95 или падение пропускной способности
+больше --threshold процентов считается регрессией (код возврата 1).
+Заполнение добавляет задачи bench_<номер> (уже существующие
+пропускаются), созданные во время теста задачи удаляются в конце.
+Запускать только на отдельной БД с примененными миграциями.
+Запуск: python -m benchmarks load [--target asgi|uvicorn] [--url URL]
+    [--seed-tasks N] [--concurrency N] [--duration S | --requests N]
+    [--weight op=N ...] [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Optional
+
+import httpx
+
+from app.models.tasks_model import TaskStatus
+
+
+SEED_PREFIX = "bench_"
+SEED_BATCH_SIZE = 10_000
+BULK_SIZE = 10
+# Наименьшее число запросов эндпоинта для сравнения с базовым результатом.
+MIN_SAMPLES = 20
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+ENDPOINTS = {
+    "list": "GET /tasks/",
+    "export": "GET /tasks/export",
+    "search": "GET /tasks/search",
+    "stats": "GET /tasks/stats",
+    "archive": "GET /tasks/archive",
+    "poll": "GET /tasks/events/poll",
+    "bulk_create": "POST /tasks/bulk",
+    "bulk_update": "PATCH /tasks/bulk",
+    "bulk_delete": "DELETE /tasks/bulk",
+    "claim": "POST /tasks/claim",
+    "get": "GET /tasks/{name}",
+    "create": "POST /tasks/",
+    "patch": "PATCH /tasks/{name}",
+    "put": "PUT /tasks/{name}",
+    "delete": "DELETE /tasks/{name}",
+    "renew": "POST /tasks/{name}/lease",
+    "release": "DELETE /tasks/{name}/lease",
+}
+
+# Веса операций смешанной нагрузки. Операция claim также продлевает
+# и освобождает аренду захваченной задачи (renew, release).
+DEFAULT_WEIGHTS = {
+    "get": 30,
+    "list": 15,
+    "search": 8,
+    "stats": 3,
+    "archive": 2,
+    "export": 1,
+    "poll": 3,
+    "create": 10,
+    "patch": 8,
+    "put": 4,
+    "delete": 5,
+    "bulk_create": 2,
+    "bulk_update": 2,
+    "bulk_delete": 2,
+    "claim": 5,
+}
+
+
+def seed_name(number: int) -> str:
+    return f"{SEED_PREFIX}{number:08d}"
+
+
+def seed_status(number: int) -> TaskStatus:
+    """Каждая десятая задача завершена, каждая десятая - в работе."""
+    return {0: TaskStatus.COMPLETED, 1: TaskStatus.IN_PROGRESS}.get(
+        number % 10, TaskStatus.CREATED
+    )
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Процентиль отсортированного списка (nearest-rank)."""
+    if not values:
+        return 0.0
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+class Recorder:
+    """Задержки и ошибки запросов по эндпоинтам."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    def record(self, endpoint: str, seconds: float, ok: bool):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, elapsed: float) -> dict[str, Any]:
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            endpoints[endpoint] = {
+                "route": ENDPOINTS[endpoint],
+                "count": len(values),
+                "errors": self.errors.get(endpoint, 0),
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p95_ms": round(percentile(values, 95) * 1000, 3),
+                "p99_ms": round(percentile(values, 99) * 1000, 3),
+                "max_ms": round(values[-1] * 1000, 3),
+            }
+        count = sum(item["count"] for item in endpoints.values())
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "requests": count,
+            "errors": sum(self.errors.values()),
+            "throughput_rps": round(count / elapsed, 2),
+            "endpoints": endpoints,
+        }
+
+
+class Worker:
+    """Клиент нагрузки со своими задачами и генератором операций."""
+
+    def __init__(
+        self,
+        number: int,
+        client: httpx.AsyncClient,
+        recorder: Recorder,
+        seed_tasks: int,
+        seed: int,
+        run_id: str
+    ):
+        self.number = number
+        self.client = client
+        self.recorder = recorder
+        self.seed_tasks = seed_tasks
+        self.random = random.Random(seed * 1_000_003 + number)
+        self.prefix = f"load_{run_id}_{number}_"
+        self.created = 0
+        self.own: list[str] = []
+
+    async def request(
+        self, endpoint: str, method: str, url: str, **kwargs
+    ) -> Optional[httpx.Response]:
+        """Выполняет запрос и учитывает его задержку."""
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(endpoint, time.perf_counter() - start, False)
+            return None
+        ok = response.status_code < 400
+        if ok and endpoint.startswith("bulk_"):
+            ok = all(item["status_code"] < 400 for item in response.json())
+        self.recorder.record(endpoint, time.perf_counter() - start, ok)
+        return response if ok else None
+
+    def new_name(self) -> str:
+        self.created += 1
+        return f"{self.prefix}{self.created}"
+
+    def seeded_name(self) -> str:
+        return seed_name(self.random.randrange(self.seed_tasks))
+
+    def take_own(self, count: int = 1) -> list[str]:
+        names = self.own[-count:]
+        del self.own[-count:]
+        return names
+
+    async def op_get(self):
+        await self.request("get", "GET", f"/tasks/{self.seeded_name()}")
+
+    async def op_list(self):
+        params = self.random.choice([
+            {},
+            {"active": "true"},
+            {"status": TaskStatus.IN_PROGRESS.value},
+            {"name_prefix": self.seeded_name()[:-2]},
+        ])
+        await self.request("list", "GET", "/tasks/", params=params)
+
+    async def op_search(self):
+        await self.request(
+            "search", "GET", "/tasks/search",
+            params={"q": self.seeded_name(), "limit": 20}
+        )
+
+    async def op_stats(self):
+        await self.request("stats", "GET", "/tasks/stats")
+
+    async def op_archive(self):
+        await self.request("archive", "GET", "/tasks/archive")
+
+    async def op_export(self):
+        """Выгрузка читается до конца потоком, без хранения ответа."""
+        start = time.perf_counter()
+        ok = False
+        try:
+            async with self.client.stream("GET", "/tasks/export") as response:
+                async for _ in response.aiter_raw():
+                    pass
+                ok = response.status_code < 400
+        except httpx.HTTPError:
+            pass
+        self.recorder.record("export", time.perf_counter() - start, ok)
+
+    async def op_poll(self):
+        await self.request(
+            "poll", "GET", "/tasks/events/poll", params={"timeout": 0}
+        )
+
+    async def op_create(self):
+        name = self.new_name()
+        if await self.request("create", "POST", "/tasks/", json={
+            "name": name, "description": f"Задача {name}"
+        }):
+            self.own.append(name)
+
+    async def op_patch(self):
+        if not self.own:
+            return await self.op_create()
+        await self.request(
+            "patch", "PATCH", f"/tasks/{self.random.choice(self.own)}",
+            json={"description": f"Изменено {self.random.random()}"}
+        )
+
+    async def op_put(self):
+        if not self.own:
+            return await self.op_create()
+        name = self.random.choice(self.own)
+        await self.request("put", "PUT", f"/tasks/{name}", json={
+            "name": name,
+            "description": f"Заменено {self.random.random()}",
+            "status": self.random.choice(list(TaskStatus)).value,
+        })
+
+    async def op_delete(self):
+        if not self.own:
+            return await self.op_create()
+        for name in self.take_own():
+            await self.request("delete", "DELETE", f"/tasks/{name}")
+
+    async def op_bulk_create(self):
+        names = [self.new_name() for _ in range(BULK_SIZE)]
+        if await self.request("bulk_create", "POST", "/tasks/bulk", json=[
+            {"name": name} for name in names
+        ]):
+            self.own.extend(names)
+
+    async def op_bulk_update(self):
+        if not self.own:
+            return await self.op_bulk_create()
+        names = self.random.sample(self.own, min(BULK_SIZE, len(self.own)))
+        await self.request("bulk_update", "PATCH", "/tasks/bulk", json=[
+            {"name": name, "description": f"Пакет {self.random.random()}"}
+            for name in names
+        ])
+
+    async def op_bulk_delete(self):
+        if not self.own:
+            return await self.op_bulk_create()
+        await self.request(
+            "bulk_delete", "DELETE", "/tasks/bulk",
+            json=self.take_own(BULK_SIZE)
+        )
+
+    async def op_claim(self):
+        """Захват задачи, продление и освобождение аренды."""
+        worker = f"{self.prefix}worker"
+        response = await self.request(
+            "claim", "POST", "/tasks/claim",
+            params={"worker": worker, "limit": 1}
+        )
+        if response is None:
+            return
+        for lease in response.json():
+            name = lease["task"]["name"]
+            await self.request(
+                "renew", "POST", f"/tasks/{name}/lease",
+                params={"worker": worker}
+            )
+            await self.request(
+                "release", "DELETE", f"/tasks/{name}/lease",
+                params={"worker": worker}
+            )
+
+    async def run(
+        self,
+        weights: dict[str, int],
+        requests: Optional[int],
+        deadline: Optional[float]
+    ):
+        operations = [getattr(self, f"op_{name}") for name in weights]
+        counts = list(weights.values())
+        done = 0
+        while True:
+            if requests is not None and done >= requests:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            await self.random.choices(operations, counts)[0]()
+            done += 1
+
+    async def cleanup(self):
+        """Удаляет созданные тестом задачи (без учета в результатах)."""
+        while self.own:
+            await self.client.request(
+                "DELETE", "/tasks/bulk", json=self.take_own(1000)
+            )
+
+
+async def seed(client: httpx.AsyncClient, total: int, concurrency: int):
+    """
+    Создает задачи bench_<номер> пакетами через POST /tasks/bulk.
+    Пропускает заполнение, если последняя задача уже существует.
+    """
+    response = await client.get(f"/tasks/{seed_name(total - 1)}")
+    if response.status_code == 200:
+        return
+    starts = iter(range(0, total, SEED_BATCH_SIZE))
+
+    async def seed_batches():
+        for start in starts:
+            stop = min(start + SEED_BATCH_SIZE, total)
+            response = await client.post("/tasks/bulk", json=[
+                {
+                    "name": seed_name(number),
+                    "description": f"Описание задачи {number}",
+                    "status": seed_status(number).value,
+                }
+                for number in range(start, stop)
+            ])
+            response.raise_for_status()
+            print(f"заполнено {stop} из {total}", file=sys.stderr)
+
+    await asyncio.gather(*(seed_batches() for _ in range(concurrency)))
+
+
+async def run_workload(
+    client: httpx.AsyncClient,
+    seed_tasks: int,
+    concurrency: int = 10,
+    duration: Optional[float] = None,
+    requests: Optional[int] = None,
+    weights: Optional[dict[str, int]] = None,
+    random_seed: int = 0
+) -> dict[str, Any]:
+    """
+    Выполняет смешанную нагрузку: requests запросов всего (поровну
+    на клиента) или в течение duration секунд. Возвращает сводку.
+    """
+    weights = {
+        name: weight
+        for name, weight in (weights or DEFAULT_WEIGHTS).items() if weight > 0
+    }
+    recorder = Recorder()
+    run_id = f"{random_seed}_{int(time.time())}"
+    workers = [
+        Worker(number, client, recorder, seed_tasks, random_seed, run_id)
+        for number in range(concurrency)
+    ]
+    per_worker = None if requests is None else -(-requests // concurrency)
+    start = time.perf_counter()
+    deadline = None if duration is None else start + duration
+    try:
+        await asyncio.gather(*(
+            worker.run(weights, per_worker, deadline) for worker in workers
+        ))
+        elapsed = time.perf_counter() - start
+    finally:
+        await asyncio.gather(*(worker.cleanup() for worker in workers))
+    return recorder.summary(elapsed)
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], threshold: float
+) -> list[str]:
+    """
+    Сравнивает результаты с базовыми. Возвращает описания регрессий:
+    рост p95 или падение пропускной способности больше threshold %.
+    """
+    regressions = []
+    for endpoint, current in results["endpoints"].items():
+        base = baseline["endpoints"].get(endpoint)
+        if base is None or min(base["count"], current["count"]) < MIN_SAMPLES:
+            continue
+        p95_change = (current["p95_ms"] / base["p95_ms"] - 1) * 100 \
+            if base["p95_ms"] else 0.0
+        rps_change = (
+            current["throughput_rps"] / base["throughput_rps"] - 1
+        ) * 100 if base["throughput_rps"] else 0.0
+        print(
+            f"{current['route']:28} p95 {base['p95_ms']:9.2f} -> "
+            f"{current['p95_ms']:9.2f} мс ({p95_change:+6.1f}%), "
+            f"{base['throughput_rps']:8.1f} -> "
+            f"{current['throughput_rps']:8.1f} rps ({rps_change:+6.1f}%)"
+        )
+        if p95_change > threshold:
+            regressions.append(
+                f"{current['route']}: p95 вырос на {p95_change:.1f}%"
+            )
+        if -rps_change > threshold:
+            regressions.append(
+                f"{current['route']}: пропускная способность "
+                f"снизилась на {-rps_change:.1f}%"
+            )
+    return regressions
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def open_client(args) -> AsyncIterator[httpx.AsyncClient]:
+    """Клиент для выбранной цели нагрузки."""
+    limits = httpx.Limits(max_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+    if args.url:
+        async with httpx.AsyncClient(
+            base_url=args.url, limits=limits, timeout=timeout
+        ) as client:
+            yield client
+    elif args.target == "asgi":
+        from app.main import app
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url="http://asgi", timeout=timeout
+            ) as client:
+                yield client
+    else:
+        port = free_port()
+        server = subprocess.Popen([
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(args.workers), "--log-level", "warning",
+        ])
+        try:
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{port}",
+                limits=limits, timeout=timeout
+            ) as client:
+                await wait_ready(client, server)
+                yield client
+        finally:
+            server.terminate()
+            server.wait()
+
+
+async def wait_ready(client: httpx.AsyncClient, server: subprocess.Popen):
+    """Ожидает запуска uvicorn (до 30 сек)."""
+    for _ in range(300):
+        if server.poll() is not None:
+            raise RuntimeError("uvicorn завершился при запуске.")
+        try:
+            await client.get("/metrics/db")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("uvicorn не запустился за 30 сек.")
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_weights(values: list[str]) -> dict[str, int]:
+    weights = dict(DEFAULT_WEIGHTS)
+    for value in values:
+        name, _, weight = value.partition("=")
+        if name not in DEFAULT_WEIGHTS or not weight.isdigit():
+            raise argparse.ArgumentTypeError(
+                f"Неверный вес операции {value!r}, операции: "
+                f"{', '.join(DEFAULT_WEIGHTS)}."
+            )
+        weights[name] = int(weight)
+    return weights
+
+
+def print_summary(results: dict[str, Any]):
+    for current in results["endpoints"].values():
+        print(
+            f"{current['route']:28} {current['count']:7} запр. "
+            f"{current['errors']:5} ошиб. {current['throughput_rps']:9.1f} "
+            f"rps  p50 {current['p50_ms']:8.2f}  p95 {current['p95_ms']:8.2f}"
+            f"  p99 {current['p99_ms']:8.2f} мс"
+        )
+    print(
+        f"всего: {results['requests']} запросов, {results['errors']} "
+        f"ошибок, {results['throughput_rps']} rps за {results['elapsed_s']} с"
+    )
+
+
+async def run(args) -> dict[str, Any]:
+    async with open_client(args) as client:
+        if args.seed_tasks:
+            await seed(client, args.seed_tasks, args.concurrency)
+        return await run_workload(
+            client,
+            args.seed_tasks,
+            concurrency=args.concurrency,
+            duration=None if args.requests else args.duration,
+            requests=args.requests,
+            weights=args.weights,
+            random_seed=args.seed
+        )
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--target", choices=("asgi", "uvicorn"), default="asgi"
+    )
+    parser.add_argument("--url", help="адрес уже запущенного сервера")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="число процессов uvicorn")
+    parser.add_argument("--seed-tasks", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--requests", type=int,
+                        help="число операций вместо --duration")
+    parser.add_argument("--weight", action="append", default=[],
+                        help="вес операции, например export=0")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--threshold", type=float, default=10,
+                        help="допустимое ухудшение, %%")
+    args = parser.parse_args(argv)
+    if args.seed_tasks < 1:
+        parser.error("--seed-tasks должно быть не меньше 1.")
+    try:
+        args.weights = parse_weights(args.weight)
+    except argparse.ArgumentTypeError as exc:
+        parser.error(str(exc))
+    started = datetime.now(timezone.utc)
+    results = asyncio.run(run(args))
+    results["meta"] = {
+        "time": started.isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "target": args.url or args.target,
+        "workers": args.workers,
+        "seed_tasks": args.seed_tasks,
+        "concurrency": args.concurrency,
+        "duration": None if args.requests else args.duration,
+        "requests": args.requests,
+        "weights": args.weights,
+        "seed": args.seed,
+    }
+    print_summary(results)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load_{started:%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+    print(f"результаты сохранены в {output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for regression in regressions:
+            print(f"РЕГРЕССИЯ {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
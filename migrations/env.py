@@ -22,6 +22,7 @@ else:
 config.set_section_option(section, "DB_USER", os.getenv("POSTGRES_USER"))
 config.set_section_option(section, "DB_PASS", os.getenv("POSTGRES_PASSWORD"))
 config.set_section_option(section, "DB_HOST", os.getenv("DB_HOST"))
+config.set_section_option(section, "DB_PORT", os.getenv("DB_PORT", "5432"))
 
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
@@ -0,0 +1,42 @@
+"""Частичные индексы активных задач
+
+Revision ID: 0b8d2e7f4a16
+Revises: f19a3c5d7b20
+Create Date: 2026-10-17 17:22:40.918364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b8d2e7f4a16'
+down_revision: Union[str, Sequence[str], None] = 'f19a3c5d7b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_tasks_active_name_uuid',
+        'tasks',
+        ['name', 'uuid'],
+        unique=False,
+        postgresql_where=sa.text("status <> 'COMPLETED'")
+    )
+    op.create_index(
+        'ix_tasks_active_version',
+        'tasks',
+        ['version'],
+        unique=False,
+        postgresql_where=sa.text("status <> 'COMPLETED'")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_active_version', table_name='tasks')
+    op.drop_index('ix_tasks_active_name_uuid', table_name='tasks')
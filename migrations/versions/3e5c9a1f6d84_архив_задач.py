@@ -0,0 +1,63 @@
+"""Архив задач
+
+Revision ID: 3e5c9a1f6d84
+Revises: 0b8d2e7f4a16
+Create Date: 2026-10-17 17:58:14.662091
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e5c9a1f6d84'
+down_revision: Union[str, Sequence[str], None] = '0b8d2e7f4a16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'tasks_archive',
+        sa.Column('uuid', sa.UUID(as_uuid=False), nullable=False),
+        sa.Column('name', sa.String(length=256), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column(
+            'status',
+            postgresql.ENUM(name='taskstatus', create_type=False),
+            nullable=False
+        ),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            'archived_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False
+        ),
+        sa.PrimaryKeyConstraint('uuid')
+    )
+    op.create_index(
+        'ix_tasks_archive_name_uuid',
+        'tasks_archive',
+        ['name', 'uuid'],
+        unique=False
+    )
+    op.create_index(
+        'ix_tasks_completed_updated_at',
+        'tasks',
+        ['updated_at'],
+        unique=False,
+        postgresql_where=sa.text("status = 'COMPLETED'")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_completed_updated_at', table_name='tasks')
+    op.drop_index('ix_tasks_archive_name_uuid', table_name='tasks_archive')
+    op.drop_table('tasks_archive')
@@ -0,0 +1,214 @@
+"""Число изменений задач по статусам
+
+Revision ID: 4b9e2d7c1a53
+Revises: d5a8c3f1e6b7
+Create Date: 2026-10-18 10:21:36.804112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b9e2d7c1a53'
+down_revision: Union[str, Sequence[str], None] = 'd5a8c3f1e6b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTER_SLOTS = 16
+
+# Измененные строки UPDATE: версия меняется, только если поля задачи
+# получили новые значения.
+CHANGED_ROWS = (
+    "FROM new_rows AS n JOIN old_rows AS o USING (uuid)"
+    " WHERE n.version <> o.version"
+)
+
+
+def pending(counter: str, status: str) -> str:
+    """Накопленное в транзакции изменение счетчика статуса."""
+    return (
+        f"coalesce(nullif(current_setting("
+        f"'{counter}.' || {status}, true), ''), '0')::bigint"
+    )
+
+
+def add_pending(counter: str, deltas: str) -> str:
+    """Добавление изменений оператора к накопленным в транзакции."""
+    return f"""
+                PERFORM set_config(
+                    '{counter}.' || d.status,
+                    ({pending(counter, 'd.status')} + d.delta)::text,
+                    true
+                )
+                FROM ({deltas}) AS d
+                WHERE d.delta <> 0;"""
+
+
+def count_function(with_changes: bool) -> str:
+    """
+    Текст функции триггеров оператора: накапливает изменения числа
+    задач и, с with_changes, числа изменений задач по статусам.
+    """
+    insert = add_pending(
+        "task_counts",
+        "SELECT status, count(*) AS delta FROM new_rows GROUP BY status"
+    )
+    delete = add_pending(
+        "task_counts",
+        "SELECT status, -count(*) AS delta FROM old_rows GROUP BY status"
+    )
+    update = add_pending(
+        "task_counts",
+        "SELECT status, sum(delta) AS delta FROM ("
+        " SELECT status, 1 AS delta FROM new_rows"
+        " UNION ALL SELECT status, -1 AS delta FROM old_rows"
+        ") AS changes GROUP BY status"
+    )
+    if with_changes:
+        insert += add_pending(
+            "task_changes",
+            "SELECT status, count(*) AS delta FROM new_rows GROUP BY status"
+        )
+        delete += add_pending(
+            "task_changes",
+            "SELECT status, count(*) AS delta FROM old_rows GROUP BY status"
+        )
+        # Задача, сменившая статус, меняет списки обоих статусов.
+        update += add_pending(
+            "task_changes",
+            "SELECT status, count(*) AS delta FROM ("
+            f" SELECT n.status {CHANGED_ROWS}"
+            f" UNION ALL SELECT o.status {CHANGED_ROWS}"
+            " AND n.status <> o.status"
+            ") AS changes GROUP BY status"
+        )
+    return f"""
+        CREATE OR REPLACE FUNCTION count_task_statuses()
+        RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN{insert}
+            ELSIF TG_OP = 'DELETE' THEN{delete}
+            ELSE{update}
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+
+
+def apply_function(with_changes: bool) -> str:
+    """
+    Текст функции отложенного триггера: применяет накопленные
+    изменения счетчиков при фиксации транзакции.
+    """
+    changes = {
+        "select": f", {pending('task_changes', 's.status')} AS changes",
+        "skip": " AND change.changes = 0",
+        "reset": """
+                PERFORM set_config(
+                    'task_changes.' || change.status, '0', true
+                );""",
+        "columns": ", changes",
+        "values": ", change.changes",
+        "update": ", changes = c.changes + EXCLUDED.changes",
+    }
+    if not with_changes:
+        changes = dict.fromkeys(changes, "")
+    return f"""
+        CREATE OR REPLACE FUNCTION apply_task_status_counts()
+        RETURNS trigger AS $$
+        DECLARE
+            counter_slot smallint := txid_current() % {COUNTER_SLOTS};
+            change record;
+        BEGIN
+            FOR change IN
+                SELECT s.status, {pending('task_counts', 's.status')} AS delta
+                    {changes['select']}
+                FROM unnest(enum_range(NULL::taskstatus)) AS s(status)
+                ORDER BY s.status
+            LOOP
+                CONTINUE WHEN change.delta = 0{changes['skip']};
+                PERFORM set_config(
+                    'task_counts.' || change.status, '0', true
+                );{changes['reset']}
+                INSERT INTO task_status_counts AS c (
+                    status, slot, count{changes['columns']}
+                )
+                VALUES (
+                    change.status, counter_slot, change.delta
+                    {changes['values']}
+                )
+                ON CONFLICT (status, slot)
+                DO UPDATE SET count = c.count + EXCLUDED.count
+                    {changes['update']};
+            END LOOP;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+
+
+def apply_update_trigger(condition: str) -> str:
+    """Текст отложенного триггера UPDATE с условием постановки в очередь."""
+    return f"""
+        CREATE CONSTRAINT TRIGGER tasks_count_apply_update
+        AFTER UPDATE ON tasks
+        DEFERRABLE INITIALLY DEFERRED
+        FOR EACH ROW
+        WHEN ({condition})
+        EXECUTE FUNCTION apply_task_status_counts()
+        """
+
+
+def reset_function(statement: str) -> str:
+    """Текст функции триггера TRUNCATE."""
+    return f"""
+        CREATE OR REPLACE FUNCTION reset_task_status_counts()
+        RETURNS trigger AS $$
+        BEGIN
+            {statement};
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Число изменений задач каждого статуса растет при фиксации
+    # транзакции вместе с числом задач: это версия списка задач для
+    # ETag, которая читается из нескольких строк счетчиков, а не
+    # вычисляется по таблице задач. Последовательность версий строк
+    # для этого не подходит: nextval виден до фиксации транзакции.
+    op.add_column(
+        'task_status_counts',
+        sa.Column(
+            'changes', sa.BigInteger(), server_default='0', nullable=False
+        )
+    )
+    op.execute(count_function(with_changes=True))
+    op.execute(apply_function(with_changes=True))
+    op.execute("DROP TRIGGER tasks_count_apply_update ON tasks")
+    op.execute(apply_update_trigger(
+        "NEW.version IS DISTINCT FROM OLD.version"
+    ))
+    # После очистки таблицы число изменений не сбрасывается, чтобы версия
+    # списка не повторила прежнюю.
+    op.execute(reset_function(
+        "UPDATE task_status_counts SET count = 0, changes = changes + 1"
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(reset_function("DELETE FROM task_status_counts"))
+    op.execute("DROP TRIGGER tasks_count_apply_update ON tasks")
+    op.execute(apply_update_trigger(
+        "NEW.status IS DISTINCT FROM OLD.status"
+    ))
+    op.execute(apply_function(with_changes=False))
+    op.execute(count_function(with_changes=False))
+    op.drop_column('task_status_counts', 'changes')
@@ -0,0 +1,45 @@
+"""Индексы для пагинации задач
+
+Revision ID: 5d2a7c4e9b13
+Revises: ec77e2216027
+Create Date: 2026-10-17 10:12:31.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2a7c4e9b13'
+down_revision: Union[str, Sequence[str], None] = 'ec77e2216027'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_tasks_name_uuid', 'tasks', ['name', 'uuid'], unique=False
+    )
+    op.create_index(
+        'ix_tasks_status_name_uuid',
+        'tasks',
+        ['status', 'name', 'uuid'],
+        unique=False
+    )
+    op.create_index(
+        'ix_tasks_name_pattern',
+        'tasks',
+        ['name'],
+        unique=False,
+        postgresql_ops={'name': 'varchar_pattern_ops'}
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_name_pattern', table_name='tasks')
+    op.drop_index('ix_tasks_status_name_uuid', table_name='tasks')
+    op.drop_index('ix_tasks_name_uuid', table_name='tasks')
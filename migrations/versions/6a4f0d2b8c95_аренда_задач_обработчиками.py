@@ -0,0 +1,74 @@
+"""Аренда задач обработчиками
+
+Revision ID: 6a4f0d2b8c95
+Revises: 3e5c9a1f6d84
+Create Date: 2026-10-17 18:37:05.374520
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a4f0d2b8c95'
+down_revision: Union[str, Sequence[str], None] = '3e5c9a1f6d84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'tasks', sa.Column('lease_owner', sa.String(length=256), nullable=True)
+    )
+    op.add_column('tasks', sa.Column(
+        'lease_expires_at', sa.DateTime(timezone=True), nullable=True
+    ))
+    op.create_index(
+        'ix_tasks_claimable',
+        'tasks',
+        ['updated_at'],
+        unique=False,
+        postgresql_where=sa.text("status = 'CREATED'")
+    )
+    op.create_index(
+        'ix_tasks_lease_expires_at',
+        'tasks',
+        ['lease_expires_at'],
+        unique=False,
+        postgresql_where=sa.text("status = 'IN_PROGRESS'")
+    )
+    # Аренда действует, только пока задача в работе: при любом другом
+    # статусе (завершение, возврат в очередь) она снимается.
+    op.execute(
+        """
+        CREATE FUNCTION clear_task_lease() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.status <> 'IN_PROGRESS' THEN
+                NEW.lease_owner := NULL;
+                NEW.lease_expires_at := NULL;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER tasks_clear_lease
+        BEFORE UPDATE OF status ON tasks
+        FOR EACH ROW EXECUTE FUNCTION clear_task_lease()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER tasks_clear_lease ON tasks")
+    op.execute("DROP FUNCTION clear_task_lease()")
+    op.drop_index('ix_tasks_lease_expires_at', table_name='tasks')
+    op.drop_index('ix_tasks_claimable', table_name='tasks')
+    op.drop_column('tasks', 'lease_expires_at')
+    op.drop_column('tasks', 'lease_owner')
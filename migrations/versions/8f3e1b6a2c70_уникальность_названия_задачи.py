@@ -0,0 +1,32 @@
+"""Уникальность названия задачи
+
+Revision ID: 8f3e1b6a2c70
+Revises: 5d2a7c4e9b13
+Create Date: 2026-10-17 11:04:52.918377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3e1b6a2c70'
+down_revision: Union[str, Sequence[str], None] = '5d2a7c4e9b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Перед миграцией в таблице не должно быть задач с одинаковым
+    # названием, иначе создание уникального индекса завершится ошибкой.
+    op.drop_index(op.f('ix_tasks_name'), table_name='tasks')
+    op.create_index(op.f('ix_tasks_name'), 'tasks', ['name'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_tasks_name'), table_name='tasks')
+    op.create_index(op.f('ix_tasks_name'), 'tasks', ['name'], unique=False)
@@ -0,0 +1,66 @@
+"""Статус в уведомлениях о задачах
+
+Revision ID: 9c1e7b3a5d62
+Revises: 6a4f0d2b8c95
+Create Date: 2026-10-17 19:12:48.530716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1e7b3a5d62'
+down_revision: Union[str, Sequence[str], None] = '6a4f0d2b8c95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def notify_function(with_status: bool) -> str:
+    """Текст функции уведомлений, со статусом задачи или без него."""
+    status = {
+        "OLD": ",\n'status', OLD.status" if with_status else "",
+        "NEW": ",\n'status', NEW.status" if with_status else "",
+    }
+    return f"""
+        CREATE OR REPLACE FUNCTION notify_task_change() RETURNS trigger AS $$
+        DECLARE
+            payload json;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                payload := json_build_object(
+                    'op', 'delete',
+                    'name', OLD.name,
+                    'version', nextval('tasks_change_seq'){status["OLD"]}
+                );
+            ELSIF TG_OP = 'UPDATE' THEN
+                payload := json_build_object(
+                    'op', 'update',
+                    'name', NEW.name,
+                    'old_name', OLD.name,
+                    'version', nextval('tasks_change_seq'){status["NEW"]}
+                );
+            ELSE
+                payload := json_build_object(
+                    'op', 'insert',
+                    'name', NEW.name,
+                    'version', nextval('tasks_change_seq'){status["NEW"]}
+                );
+            END IF;
+            PERFORM pg_notify('tasks_changes', payload::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(notify_function(with_status=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(notify_function(with_status=False))
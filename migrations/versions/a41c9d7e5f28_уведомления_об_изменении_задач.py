@@ -0,0 +1,69 @@
+"""Уведомления об изменении задач
+
+Revision ID: a41c9d7e5f28
+Revises: 8f3e1b6a2c70
+Create Date: 2026-10-17 13:26:07.551902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c9d7e5f28'
+down_revision: Union[str, Sequence[str], None] = '8f3e1b6a2c70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE SEQUENCE tasks_change_seq")
+    op.execute(
+        """
+        CREATE FUNCTION notify_task_change() RETURNS trigger AS $$
+        DECLARE
+            payload json;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                payload := json_build_object(
+                    'op', 'delete',
+                    'name', OLD.name,
+                    'version', nextval('tasks_change_seq')
+                );
+            ELSIF TG_OP = 'UPDATE' THEN
+                payload := json_build_object(
+                    'op', 'update',
+                    'name', NEW.name,
+                    'old_name', OLD.name,
+                    'version', nextval('tasks_change_seq')
+                );
+            ELSE
+                payload := json_build_object(
+                    'op', 'insert',
+                    'name', NEW.name,
+                    'version', nextval('tasks_change_seq')
+                );
+            END IF;
+            PERFORM pg_notify('tasks_changes', payload::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER tasks_notify_change
+        AFTER INSERT OR UPDATE OR DELETE ON tasks
+        FOR EACH ROW EXECUTE FUNCTION notify_task_change()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER tasks_notify_change ON tasks")
+    op.execute("DROP FUNCTION notify_task_change()")
+    op.execute("DROP SEQUENCE tasks_change_seq")
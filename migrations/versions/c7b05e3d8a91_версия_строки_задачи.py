@@ -0,0 +1,68 @@
+"""Версия строки задачи
+
+Revision ID: c7b05e3d8a91
+Revises: a41c9d7e5f28
+Create Date: 2026-10-17 14:41:36.032117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7b05e3d8a91'
+down_revision: Union[str, Sequence[str], None] = 'a41c9d7e5f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Версии выдаются из общей последовательности, поэтому max(version)
+    # растет при любой вставке или изменении задачи.
+    op.execute("CREATE SEQUENCE tasks_version_seq")
+    op.add_column('tasks', sa.Column(
+        'version',
+        sa.BigInteger(),
+        server_default=sa.text("nextval('tasks_version_seq')"),
+        nullable=False
+    ))
+    op.add_column('tasks', sa.Column(
+        'updated_at',
+        sa.DateTime(timezone=True),
+        server_default=sa.text('now()'),
+        nullable=False
+    ))
+    op.create_index('ix_tasks_version', 'tasks', ['version'], unique=False)
+    op.execute(
+        """
+        CREATE FUNCTION bump_task_version() RETURNS trigger AS $$
+        BEGIN
+            IF NEW IS DISTINCT FROM OLD THEN
+                NEW.version := nextval('tasks_version_seq');
+                NEW.updated_at := now();
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER tasks_bump_version
+        BEFORE UPDATE ON tasks
+        FOR EACH ROW EXECUTE FUNCTION bump_task_version()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER tasks_bump_version ON tasks")
+    op.execute("DROP FUNCTION bump_task_version()")
+    op.drop_index('ix_tasks_version', table_name='tasks')
+    op.drop_column('tasks', 'updated_at')
+    op.drop_column('tasks', 'version')
+    op.execute("DROP SEQUENCE tasks_version_seq")
@@ -0,0 +1,78 @@
+"""Изменение задачи без новых значений
+
+Revision ID: d5a8c3f1e6b7
+Revises: 9c1e7b3a5d62
+Create Date: 2026-10-17 23:12:47.508316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a8c3f1e6b7'
+down_revision: Union[str, Sequence[str], None] = '9c1e7b3a5d62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def bump_function(condition: str) -> str:
+    """Текст функции версии строки с условием изменения задачи."""
+    return f"""
+        CREATE OR REPLACE FUNCTION bump_task_version() RETURNS trigger AS $$
+        BEGIN
+            IF {condition} THEN
+                NEW.version := nextval('tasks_version_seq');
+                NEW.updated_at := now();
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Вычисляемый search_vector в BEFORE-триггере еще не заполнен, поэтому
+    # сравнение строк целиком отличало любое изменение, даже без новых
+    # значений. Сравниваются только изменяемые поля задачи.
+    op.execute(bump_function(
+        "(NEW.name, NEW.description, NEW.status,"
+        " NEW.lease_owner, NEW.lease_expires_at)"
+        " IS DISTINCT FROM (OLD.name, OLD.description, OLD.status,"
+        " OLD.lease_owner, OLD.lease_expires_at)"
+    ))
+    # Уведомление об изменении отправляется, только если версия строки
+    # изменилась.
+    op.execute("DROP TRIGGER tasks_notify_change ON tasks")
+    op.execute(
+        """
+        CREATE TRIGGER tasks_notify_change
+        AFTER INSERT OR DELETE ON tasks
+        FOR EACH ROW EXECUTE FUNCTION notify_task_change()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER tasks_notify_update
+        AFTER UPDATE ON tasks
+        FOR EACH ROW
+        WHEN (NEW.version IS DISTINCT FROM OLD.version)
+        EXECUTE FUNCTION notify_task_change()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER tasks_notify_update ON tasks")
+    op.execute("DROP TRIGGER tasks_notify_change ON tasks")
+    op.execute(
+        """
+        CREATE TRIGGER tasks_notify_change
+        AFTER INSERT OR UPDATE OR DELETE ON tasks
+        FOR EACH ROW EXECUTE FUNCTION notify_task_change()
+        """
+    )
+    op.execute(bump_function("NEW IS DISTINCT FROM OLD"))
@@ -0,0 +1,70 @@
+"""Поиск задач
+
+Revision ID: e2b6f94d0c3a
+Revises: c7b05e3d8a91
+Create Date: 2026-10-17 16:05:12.481930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b6f94d0c3a'
+down_revision: Union[str, Sequence[str], None] = 'c7b05e3d8a91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(description, '')), "
+            "'B')",
+            persisted=True
+        ),
+        nullable=True
+    ))
+    op.create_index(
+        'ix_tasks_search_vector',
+        'tasks',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin'
+    )
+    # pg_trgm входит в contrib и может отсутствовать в сборке PostgreSQL,
+    # тогда поиск работает без нечеткого сравнения названий.
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM pg_available_extensions
+                WHERE name = 'pg_trgm'
+            ) THEN
+                CREATE EXTENSION IF NOT EXISTS pg_trgm;
+                CREATE INDEX ix_tasks_name_trgm
+                    ON tasks USING gin (name gin_trgm_ops);
+            END IF;
+        END
+        $$
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_tasks_name_trgm")
+    op.drop_index(
+        'ix_tasks_search_vector',
+        table_name='tasks',
+        postgresql_using='gin'
+    )
+    op.drop_column('tasks', 'search_vector')
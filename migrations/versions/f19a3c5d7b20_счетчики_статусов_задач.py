@@ -0,0 +1,198 @@
+"""Счетчики статусов задач
+
+Revision ID: f19a3c5d7b20
+Revises: e2b6f94d0c3a
+Create Date: 2026-10-17 16:48:53.207415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f19a3c5d7b20'
+down_revision: Union[str, Sequence[str], None] = 'e2b6f94d0c3a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Число строк-счетчиков на статус: параллельные транзакции пишут в разные
+# строки и не ждут блокировки одной строки.
+COUNTER_SLOTS = 16
+
+
+def pending_count(status: str) -> str:
+    """Накопленное в транзакции изменение счетчика статуса."""
+    return (
+        f"coalesce(nullif(current_setting("
+        f"'task_counts.' || {status}, true), ''), '0')::bigint"
+    )
+
+
+def add_pending(deltas: str) -> str:
+    """Добавление изменений оператора к накопленным в транзакции."""
+    return f"""
+                PERFORM set_config(
+                    'task_counts.' || d.status,
+                    ({pending_count('d.status')} + d.delta)::text,
+                    true
+                )
+                FROM ({deltas}) AS d
+                WHERE d.delta <> 0;"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'task_status_counts',
+        sa.Column(
+            'status',
+            postgresql.ENUM(name='taskstatus', create_type=False),
+            nullable=False
+        ),
+        sa.Column('slot', sa.SmallInteger(), nullable=False),
+        sa.Column(
+            'count', sa.BigInteger(), server_default='0', nullable=False
+        ),
+        sa.PrimaryKeyConstraint('status', 'slot')
+    )
+    op.execute(
+        """
+        INSERT INTO task_status_counts (status, slot, count)
+        SELECT status, 0, count(*) FROM tasks GROUP BY status
+        """
+    )
+    # Триггеры оператора только накапливают изменения в локальных
+    # настройках транзакции и ничего не блокируют.
+    op.execute(
+        f"""
+        CREATE FUNCTION count_task_statuses() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN{add_pending(
+                "SELECT status, count(*) AS delta FROM new_rows GROUP BY status"
+            )}
+            ELSIF TG_OP = 'DELETE' THEN{add_pending(
+                "SELECT status, -count(*) AS delta FROM old_rows GROUP BY status"
+            )}
+            ELSE{add_pending(
+                "SELECT status, sum(delta) AS delta FROM ("
+                " SELECT status, 1 AS delta FROM new_rows"
+                " UNION ALL SELECT status, -1 AS delta FROM old_rows"
+                ") AS changes GROUP BY status"
+            )}
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    # Накопленные изменения применяются при фиксации транзакции отложенным
+    # триггером: строки счетчиков блокируются после всех блокировок строк
+    # задач, в слоте транзакции и в порядке статусов, поэтому транзакции
+    # не могут взаимно заблокировать друг друга на счетчиках. Первый вызов
+    # применяет и обнуляет изменения, остальные ничего не делают.
+    op.execute(
+        f"""
+        CREATE FUNCTION apply_task_status_counts() RETURNS trigger AS $$
+        DECLARE
+            counter_slot smallint := txid_current() % {COUNTER_SLOTS};
+            change record;
+        BEGIN
+            FOR change IN
+                SELECT s.status, {pending_count('s.status')} AS delta
+                FROM unnest(enum_range(NULL::taskstatus)) AS s(status)
+                ORDER BY s.status
+            LOOP
+                CONTINUE WHEN change.delta = 0;
+                PERFORM set_config(
+                    'task_counts.' || change.status, '0', true
+                );
+                INSERT INTO task_status_counts AS c (status, slot, count)
+                VALUES (change.status, counter_slot, change.delta)
+                ON CONFLICT (status, slot)
+                DO UPDATE SET count = c.count + EXCLUDED.count;
+            END LOOP;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    # Триггеры уровня оператора: изменения считаются один раз на оператор,
+    # а не на каждую строку (пакетные операции, ON CONFLICT).
+    op.execute(
+        """
+        CREATE TRIGGER tasks_count_insert
+        AFTER INSERT ON tasks
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION count_task_statuses()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER tasks_count_update
+        AFTER UPDATE ON tasks
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION count_task_statuses()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER tasks_count_delete
+        AFTER DELETE ON tasks
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION count_task_statuses()
+        """
+    )
+    # Отложенные триггеры бывают только строчными; изменение без смены
+    # статуса в очередь не попадает.
+    op.execute(
+        """
+        CREATE CONSTRAINT TRIGGER tasks_count_apply
+        AFTER INSERT OR DELETE ON tasks
+        DEFERRABLE INITIALLY DEFERRED
+        FOR EACH ROW EXECUTE FUNCTION apply_task_status_counts()
+        """
+    )
+    op.execute(
+        """
+        CREATE CONSTRAINT TRIGGER tasks_count_apply_update
+        AFTER UPDATE ON tasks
+        DEFERRABLE INITIALLY DEFERRED
+        FOR EACH ROW
+        WHEN (NEW.status IS DISTINCT FROM OLD.status)
+        EXECUTE FUNCTION apply_task_status_counts()
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION reset_task_status_counts() RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM task_status_counts;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER tasks_count_truncate
+        AFTER TRUNCATE ON tasks
+        FOR EACH STATEMENT EXECUTE FUNCTION reset_task_status_counts()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER tasks_count_truncate ON tasks")
+    op.execute("DROP TRIGGER tasks_count_apply_update ON tasks")
+    op.execute("DROP TRIGGER tasks_count_apply ON tasks")
+    op.execute("DROP TRIGGER tasks_count_delete ON tasks")
+    op.execute("DROP TRIGGER tasks_count_update ON tasks")
+    op.execute("DROP TRIGGER tasks_count_insert ON tasks")
+    op.execute("DROP FUNCTION reset_task_status_counts()")
+    op.execute("DROP FUNCTION apply_task_status_counts()")
+    op.execute("DROP FUNCTION count_task_statuses()")
+    op.drop_table('task_status_counts')
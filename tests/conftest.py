@@ -7,12 +7,27 @@
 параметров для тестирования валидации входных данных.
 Модуль использует переменную окружения TESTING для переключения
 на тестовую БД, обеспечивая изоляцию тестов и безопасность основной БД.
+Миграции применяются один раз к шаблонной БД (TEST_DB_NAME_template),
+которая пересоздается только при изменении файлов миграций. Тестовая
+БД копируется из шаблона (CREATE DATABASE ... TEMPLATE) один раз за
+сессию, для каждого воркера pytest-xdist (pytest -n N) - своя копия.
+Приложение запускается один раз за сессию, а перед каждым тестом
+таблицы задач очищаются (TRUNCATE) и сбрасывается кэш задач, поэтому
+тесты не зависят от порядка запуска.
+С хранилищем в памяти (STORAGE_BACKEND=memory) тестовая БД не
+создается: перед каждым тестом подставляется новое хранилище в памяти,
+а тесты с меткой postgres (триггеры, счетчики, уведомления из БД,
+реплики, планы запросов) пропускаются.
 """
 
+import hashlib
 import os
+from pathlib import Path
 
 import pytest
-from sqlalchemy import create_engine
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import scoped_session, sessionmaker
 from alembic import command
@@ -20,44 +35,184 @@ from alembic.config import Config
 from sqlalchemy_utils import create_database, drop_database
 
 # Устанавливаем os.environ, чтобы использовать тестовую БД
+load_dotenv()
 os.environ["TESTING"] = "True"
+TEST_DB_NAME = os.getenv("TEST_DB_NAME", "test_db_name")
+TEMPLATE_DB_NAME = f"{TEST_DB_NAME}_template"
+# Каждый воркер pytest-xdist работает со своей копией тестовой БД.
+XDIST_WORKER = os.getenv("PYTEST_XDIST_WORKER")
+if XDIST_WORKER:
+    os.environ["TEST_DB_NAME"] = f"{TEST_DB_NAME}_{XDIST_WORKER}"
 
 
 from app.db import SQLALCHEMY_DATABASE_URL as db
 from app.main import app
+from app.storage import STORAGE_BACKEND
+from app.storage.memory import MemoryTaskRepository
+from app.utils import tasks_utils
+from app.utils.cache import task_cache
 
 
-@pytest.fixture(scope="module")
+BASE_DIR = Path(__file__).resolve().parent.parent
+# Ключ advisory-блокировки, под которой воркеры создают шаблонную БД.
+TEMPLATE_LOCK_KEY = 7302025
+# Таблицы, которые очищаются перед каждым тестом.
+DATA_TABLES = ("tasks", "tasks_archive", "task_status_counts")
+
+
+# Фикстуры, с которыми тест работает с тестовой БД напрямую.
+DATABASE_FIXTURES = {"temp_db", "db_engine", "db_session"}
+
+
+def pytest_collection_modifyitems(config, items):
+    """
+    Отмечает меткой postgres тесты, работающие с тестовой БД напрямую,
+    и пропускает тесты с этой меткой при хранилище в памяти.
+    """
+    skip = pytest.mark.skip(reason="тест требует хранилища PostgreSQL")
+    for item in items:
+        if DATABASE_FIXTURES & set(getattr(item, "fixturenames", ())):
+            item.add_marker(pytest.mark.postgres)
+        if STORAGE_BACKEND == "memory" and "postgres" in item.keywords:
+            item.add_marker(skip)
+
+
+def migrations_fingerprint() -> str:
+    """Хэш файлов миграций: шаблон пересоздается при их изменении."""
+    digest = hashlib.sha1()
+    migrations = BASE_DIR / "migrations"
+    for path in sorted(migrations.glob("**/*.py")):
+        if "__pycache__" not in path.parts:
+            digest.update(path.relative_to(migrations).as_posix().encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def build_template(connection, template_url: str):
+    """
+    Создает шаблонную БД с примененными миграциями, если ее нет или она
+    создана по другим файлам миграций. Версия шаблона хранится
+    в комментарии к БД.
+    """
+    fingerprint = migrations_fingerprint()
+    template = connection.execute(
+        text(
+            "SELECT shobj_description(oid, 'pg_database') "
+            "FROM pg_database WHERE datname = :name"
+        ),
+        {"name": TEMPLATE_DB_NAME}
+    ).first()
+    if template is not None:
+        if template[0] == fingerprint:
+            return
+        drop_database(template_url)
+    create_database(template_url)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("TEST_DB_NAME", TEMPLATE_DB_NAME)
+        command.upgrade(Config(str(BASE_DIR / "alembic.ini")), "head")
+    connection.execute(text(
+        f'COMMENT ON DATABASE "{TEMPLATE_DB_NAME}" IS \'{fingerprint}\''
+    ))
+
+
+@pytest.fixture(scope="session")
 def temp_db():
-    """Создает временную тестовую БД."""
+    """
+    Создает временную тестовую БД копией шаблонной БД с миграциями.
+    Шаблон создается и копируется под advisory-блокировкой, чтобы
+    воркеры pytest-xdist не создавали его одновременно.
+    """
+    if STORAGE_BACKEND == "memory":
+        pytest.skip("тест требует хранилища PostgreSQL")
+    url = make_url(db)
+    template_url = url.set(database=TEMPLATE_DB_NAME)
+    engine = create_engine(
+        url.set(database="postgres"), isolation_level="AUTOCOMMIT"
+    )
     try:
-        create_database(db)
-        base_dir = os.path.dirname(os.path.dirname(__file__))
-        alembic_cfg = Config(os.path.join(base_dir, "alembic.ini"))
-        command.upgrade(alembic_cfg, "head")
+        with engine.connect() as connection:
+            connection.execute(
+                text("SELECT pg_advisory_lock(:key)"),
+                {"key": TEMPLATE_LOCK_KEY}
+            )
+            try:
+                build_template(connection, template_url)
+                connection.execute(text(
+                    f'DROP DATABASE IF EXISTS "{url.database}" WITH (FORCE)'
+                ))
+                create_database(db, template=TEMPLATE_DB_NAME)
+            finally:
+                connection.execute(
+                    text("SELECT pg_advisory_unlock(:key)"),
+                    {"key": TEMPLATE_LOCK_KEY}
+                )
         yield db
     finally:
+        engine.dispose()
         drop_database(db)
 
 
+@pytest.fixture(scope="session")
+def db_engine(temp_db):
+    """Создает движок SQLAlchemy для тестовой БД."""
+    engine = create_engine(temp_db)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def clean_db(request, monkeypatch):
+    """
+    Очищает таблицы задач и кэш задач перед тестом. Счетчики статусов
+    очищаются в том же операторе TRUNCATE, что и задачи (их сброс
+    триггером TRUNCATE на tasks здесь ничего не добавляет).
+    Откат транзакции теста (force_rollback в databases) не подходит:
+    слушатель уведомлений (LISTEN) и подключения к репликам - отдельные
+    соединения, которые не видят незафиксированных изменений теста, а
+    отложенные триггеры счетчиков срабатывают только при фиксации.
+    С хранилищем в памяти подставляет новое пустое хранилище.
+    """
+    if STORAGE_BACKEND == "memory":
+        monkeypatch.setattr(
+            tasks_utils, "repository", MemoryTaskRepository()
+        )
+    else:
+        db_engine = request.getfixturevalue("db_engine")
+        with db_engine.begin() as connection:
+            connection.execute(text("SET LOCAL lock_timeout = '5s'"))
+            connection.execute(text(f"TRUNCATE {', '.join(DATA_TABLES)}"))
+    task_cache.clear()
+
+
 @pytest.fixture(scope="function")
-def db_session(temp_db):
+def db_session(db_engine, clean_db):
     """Создает и возвращает сессию БД для тестов."""
-    engine = create_engine(temp_db)
-    Session = scoped_session(sessionmaker(bind=engine))
+    Session = scoped_session(sessionmaker(bind=db_engine))
     session = Session()
     yield session
     session.close()
     Session.remove()
 
 
-@pytest.fixture(scope="function")
-def client():
-    """Создает тестовый клиент с подключением к тестовой БД."""
+@pytest.fixture(scope="session")
+def app_client(request):
+    """
+    Создает тестовый клиент с подключением к тестовой БД. Приложение
+    (lifespan: пулы соединений, слушатель событий) запускается один раз
+    за сессию.
+    """
+    if STORAGE_BACKEND != "memory":
+        request.getfixturevalue("temp_db")
     with TestClient(app) as test_client:
         yield test_client
 
 
+@pytest.fixture(scope="function")
+def client(app_client, clean_db):
+    """Возвращает тестовый клиент с очищенными таблицами задач."""
+    return app_client
+
+
 @pytest.fixture
 def bad_params():
     """Возвращает невалидные параметры."""
@@ -0,0 +1,53 @@
+"""
+Модуль с тестами нагрузочного теста API задач: короткий прогон
+смешанной нагрузки в процессе через ASGI, расчет процентилей и
+сравнение с базовым результатом.
+"""
+
+import httpx
+
+from app.main import app
+from benchmarks import load_test
+
+
+def test_percentile():
+    values = [float(value) for value in range(1, 101)]
+    assert load_test.percentile(values, 50) == 50
+    assert load_test.percentile(values, 99) == 99
+    assert load_test.percentile([7.0], 95) == 7
+    assert load_test.percentile([], 50) == 0
+
+
+def test_compare_with_baseline():
+    def results(p95_ms: float, rps: float) -> dict:
+        return {"endpoints": {"get": {
+            "route": "GET /tasks/{name}", "count": 100,
+            "p95_ms": p95_ms, "throughput_rps": rps,
+        }}}
+
+    baseline = results(10, 100)
+    assert load_test.compare(results(10.5, 98), baseline, 10) == []
+    regressions = load_test.compare(results(12, 80), baseline, 10)
+    assert len(regressions) == 2
+
+
+def test_load_workload(client):
+    """Тестирование короткого прогона нагрузки на тестовом хранилище."""
+
+    async def run() -> dict:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://asgi"
+        ) as http_client:
+            await load_test.seed(http_client, 50, concurrency=2)
+            return await load_test.run_workload(
+                http_client, 50, concurrency=3, requests=150, random_seed=1
+            )
+
+    results = client.portal.call(run)
+    assert results["errors"] == 0
+    assert results["requests"] >= 150
+    assert {"get", "create", "list"} <= set(results["endpoints"])
+    for item in results["endpoints"].values():
+        assert item["p50_ms"] <= item["p95_ms"] <= item["p99_ms"]
+    tasks = client.get("/tasks/", params={"name_prefix": "load_"}).json()
+    assert tasks == []
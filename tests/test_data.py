@@ -6,9 +6,27 @@
 (временная БД, сессии, клиент).
 """
 
+import asyncio
+import base64
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
 import pytest
 
 from app.models.tasks_model import tasks_table, TaskStatus
+from app.storage import postgres
+from app.utils import (
+    metrics, query_log, responses, task_feed, tasks_utils
+)
+from app.utils.archiver import TaskArchiver
+from app.utils.lease_reaper import LeaseReaper
+
+
+def make_cursor(*position) -> str:
+    """Кодирует произвольную позицию в курсор (без проверок)."""
+    raw = json.dumps(position).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
 
 
 def test_get_all_tasks(client, db_session):
@@ -26,9 +44,277 @@ def test_get_all_tasks(client, db_session):
     assert tasks[0]["name"] == task_name
 
 
+def test_get_tasks_page(client, db_session):
+    """Тестирование постраничного получения задач с фильтрами."""
+    names = [f"page_task_{i}" for i in range(5)]
+    db_session.execute(tasks_table.insert(), [
+        {"name": name, "status": TaskStatus.CREATED} for name in names
+    ])
+    db_session.execute(tasks_table.insert().values(
+        name="page_task_done", status=TaskStatus.COMPLETED
+    ))
+    db_session.commit()
+    received = []
+    params = {"name_prefix": "page_task_", "status": "Создано", "limit": 2}
+    while True:
+        response = client.get("/tasks/", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 2
+        received.extend(task["name"] for task in page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params["after"] = cursor
+    assert received == names
+    response = client.get(
+        "/tasks/", params={"name_prefix": "page_task_", "status": "Завершено"}
+    )
+    assert [task["name"] for task in response.json()] == ["page_task_done"]
+    response = client.get(
+        "/tasks/", params={"name_prefix": "page_task_", "active": True}
+    )
+    assert [task["name"] for task in response.json()] == names
+    response = client.get("/tasks/", params={"after": "bad_cursor"})
+    assert response.status_code == 400
+    for position in (
+        (1, "6f1c2b8e-4d0a-4c5e-9a3b-2e7d8f0a1b2c"),
+        ("page_task_1", "not-a-uuid"),
+        ("page_task_1", None),
+    ):
+        response = client.get(
+            "/tasks/", params={"after": make_cursor(*position)}
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Некорректный курсор."
+    response = client.get("/tasks/", params={"limit": 0})
+    assert response.status_code == 422
+
+
+def test_get_tasks_via_api(client):
+    """
+    Тестирование получения задач, созданных через API (для любого
+    хранилища задач).
+    """
+    names = [f"api_page_task_{i}" for i in range(3)]
+    client.post("/tasks/bulk", json=[{"name": name} for name in names] + [
+        {"name": "api_page_task_done", "status": "Завершено"}
+    ])
+    received = []
+    params = {"name_prefix": "api_page_task_", "status": "Создано", "limit": 2}
+    while True:
+        response = client.get("/tasks/", params=params)
+        assert response.status_code == 200
+        received.extend(task["name"] for task in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params["after"] = cursor
+    assert received == names
+    response = client.get(
+        "/tasks/", params={"name_prefix": "api_page_task_", "active": True}
+    )
+    assert [task["name"] for task in response.json()] == names
+    response = client.get("/tasks/api_page_task_done")
+    assert response.status_code == 200
+    assert response.json()["status"] == "Завершено"
+
+
+@pytest.mark.parametrize("export_format", ["ndjson", "json"])
+def test_export_tasks(client, db_session, export_format):
+    """Тестирование потоковой выгрузки всех задач."""
+    task_name = f"export_task_{export_format}"
+    db_session.execute(tasks_table.insert().values(
+        name=task_name, status=TaskStatus.IN_PROGRESS
+    ))
+    db_session.commit()
+    count = db_session.execute(tasks_table.select()).rowcount
+    response = client.get("/tasks/export", params={"format": export_format})
+    assert response.status_code == 200
+    if export_format == "json":
+        tasks = response.json()
+    else:
+        assert response.headers["content-type"] == "application/x-ndjson"
+        tasks = [json.loads(line) for line in response.text.splitlines()]
+    assert len(tasks) == count
+    exported = [task for task in tasks if task["name"] == task_name]
+    assert exported[0]["status"] == "В работе"
+
+
+def test_export_tasks_via_api(client):
+    """Тестирование выгрузки задач, созданных через API."""
+    client.post("/tasks/bulk", json=[
+        {"name": "api_export_task", "status": "В работе"},
+        {"name": "api_export_task_other"},
+    ])
+    response = client.get("/tasks/export")
+    assert response.status_code == 200
+    tasks = [json.loads(line) for line in response.text.splitlines()]
+    assert len(tasks) == client.get("/tasks/stats").json()["total"]
+    exported = [task for task in tasks if task["name"] == "api_export_task"]
+    assert exported[0]["status"] == "В работе"
+
+
+def test_search_tasks(client, db_session):
+    """Тестирование поиска задач по названию и описанию."""
+    db_session.execute(tasks_table.insert(), [
+        {
+            "name": "отчет_за_квартал",
+            "description": None,
+            "status": TaskStatus.CREATED
+        },
+        {
+            "name": "search_task_b",
+            "description": "Подготовить отчеты для руководства",
+            "status": TaskStatus.IN_PROGRESS
+        },
+        {
+            "name": "search_task_c",
+            "description": "Другое",
+            "status": TaskStatus.CREATED
+        },
+    ])
+    db_session.commit()
+    received = []
+    params = {"q": "отчет", "limit": 1}
+    while True:
+        response = client.get("/tasks/search", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 1
+        received.extend(task["name"] for task in page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params["after"] = cursor
+    assert received == ["отчет_за_квартал", "search_task_b"]
+    response = client.get(
+        "/tasks/search", params={"q": "отчет", "status": "В работе"}
+    )
+    assert [task["name"] for task in response.json()] == ["search_task_b"]
+    response = client.get("/tasks/search", params={"q": ""})
+    assert response.status_code == 422
+    response = client.get(
+        "/tasks/search", params={"q": "отчет", "after": "bad_cursor"}
+    )
+    assert response.status_code == 400
+    task_uuid = "6f1c2b8e-4d0a-4c5e-9a3b-2e7d8f0a1b2c"
+    for position in (
+        ("0.5", "search_task_b", task_uuid),
+        (True, "search_task_b", task_uuid),
+        (0.5, "search_task_b", "not-a-uuid"),
+    ):
+        response = client.get("/tasks/search", params={
+            "q": "отчет", "after": make_cursor(*position)
+        })
+        assert response.status_code == 400
+    response = client.get("/tasks/search", params={
+        "q": "отчет", "after": make_cursor(1, "search_task_b", task_uuid)
+    })
+    assert response.status_code == 200
+
+
+def test_search_tasks_via_api(client):
+    """Тестирование поиска задач, созданных через API."""
+    client.post("/tasks/bulk", json=[
+        {"name": "отчет_api"},
+        {
+            "name": "api_search_task_b",
+            "description": "Подготовить отчеты для руководства",
+            "status": "В работе"
+        },
+        {"name": "api_search_task_c", "description": "Другое"},
+    ])
+    response = client.get("/tasks/search", params={"q": "отчет"})
+    assert response.status_code == 200
+    assert [task["name"] for task in response.json()] == [
+        "отчет_api", "api_search_task_b"
+    ]
+    response = client.get(
+        "/tasks/search", params={"q": "отчет", "status": "В работе"}
+    )
+    assert [task["name"] for task in response.json()] == [
+        "api_search_task_b"
+    ]
+
+
+def test_task_stats(client, db_session):
+    """Тестирование счетчиков задач по статусам."""
+    before = client.get("/tasks/stats").json()["counts"]
+    client.post("/tasks/bulk", json=[
+        {"name": "stats_task_1"},
+        {"name": "stats_task_2", "status": "В работе"},
+    ])
+    client.patch("/tasks/stats_task_1", json={"status": "Завершено"})
+    client.put("/tasks/stats_task_3", json={"name": "stats_task_3"})
+    client.delete("/tasks/stats_task_2")
+    response = client.get("/tasks/stats", params={"verify": True})
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["consistent"] is True
+    assert stats["counts"] == stats["actual"]
+    assert stats["counts"]["Создано"] == before["Создано"] + 1
+    assert stats["counts"]["В работе"] == before["В работе"]
+    assert stats["counts"]["Завершено"] == before["Завершено"] + 1
+    assert stats["total"] == sum(stats["counts"].values())
+
+
+def test_archive_tasks(client, db_session):
+    """Тестирование переноса завершенных задач в архив."""
+    old = datetime.now(timezone.utc) - timedelta(days=2)
+    db_session.execute(tasks_table.insert(), [
+        {"name": name, "status": task_status, "updated_at": updated_at}
+        for name, task_status, updated_at in (
+            ("archive_task_1", TaskStatus.COMPLETED, old),
+            ("archive_task_2", TaskStatus.COMPLETED, old),
+            (
+                "archive_task_new", TaskStatus.COMPLETED,
+                datetime.now(timezone.utc)
+            ),
+            ("archive_task_active", TaskStatus.IN_PROGRESS, old),
+        )
+    ])
+    db_session.commit()
+    archiver = TaskArchiver(age=24 * 3600, batch_size=1, batch_delay=0)
+    assert client.portal.call(archiver.run_once) == 2
+    assert archiver.batches == 2
+    assert client.get("/tasks/archive_task_1").status_code == 404
+    response = client.get(
+        "/tasks/archive_task_1", params={"include_archived": True}
+    )
+    assert response.status_code == 200
+    assert response.json()["status"] == "Завершено"
+    response = client.get(
+        "/tasks/archive", params={"name_prefix": "archive_task_"}
+    )
+    assert [task["name"] for task in response.json()] == [
+        "archive_task_1", "archive_task_2"
+    ]
+    response = client.get("/tasks/archive", params={
+        "name_prefix": "archive_task_", "limit": 1
+    })
+    assert [task["name"] for task in response.json()] == ["archive_task_1"]
+    response = client.get("/tasks/archive", params={
+        "name_prefix": "archive_task_",
+        "after": response.headers["X-Next-Cursor"]
+    })
+    assert [task["name"] for task in response.json()] == ["archive_task_2"]
+    for cursor in (
+        "bad_cursor",
+        make_cursor(1, "6f1c2b8e-4d0a-4c5e-9a3b-2e7d8f0a1b2c"),
+        make_cursor("archive_task_1", "not-a-uuid"),
+    ):
+        response = client.get("/tasks/archive", params={"after": cursor})
+        assert response.status_code == 400
+    for name in ("archive_task_new", "archive_task_active"):
+        assert client.get(f"/tasks/{name}").status_code == 200
+    stats = client.get("/tasks/stats", params={"verify": True}).json()
+    assert stats["consistent"] is True
+
+
 def test_get_one_task(client, db_session):
     """Тестирование успешного получения задачи по имени."""
-    task_name = "test_get_name_task"
+    task_name = "test_get_one_name_task"
     test_task = tasks_table.insert().values(
         name=task_name, status=TaskStatus.CREATED
     )
@@ -174,6 +460,7 @@ def test_patch_task(
     response = client.patch(f"/tasks/{task_name}", json=task_data_patch)
     assert response.status_code == 200
     task = response.json()
+    assert task["uuid"] is not None
     if "name" in task_data_patch:
         assert task["name"] == task_data_patch["name"]
     else:
@@ -212,10 +499,31 @@ def test_patch_bad_task(client, db_session, bad_params):
             assert original_task == no_update_task
 
 
+def test_patch_task_name_conflict(client, db_session):
+    """Тестирование переименования задачи в уже занятое название."""
+    db_session.execute(tasks_table.insert(), [
+        {"name": "conflict_task_1", "status": TaskStatus.CREATED},
+        {"name": "conflict_task_2", "status": TaskStatus.CREATED}
+    ])
+    db_session.commit()
+    response = client.patch(
+        "/tasks/conflict_task_1", json={"name": "conflict_task_2"}
+    )
+    assert response.status_code == 400
+    rows = db_session.execute(tasks_table.select().where(
+        tasks_table.c.name.in_(["conflict_task_1", "conflict_task_2"])
+    )).fetchall()
+    assert len(rows) == 2
+
+
 def test_patch_lost_task(client, temp_db):
     """Тестирование частичного изменения несуществующей задачи."""
     response = client.patch("/tasks/lost_patch_task")
     assert response.status_code == 404
+    response = client.patch(
+        "/tasks/lost_patch_task", json={"status": "Завершено"}
+    )
+    assert response.status_code == 404
 
 
 def test_put_task(client, temp_db, db_session):
@@ -268,6 +576,25 @@ def test_put_task(client, temp_db, db_session):
     assert modify_task["status"] == update_task["status"]
 
 
+def test_put_same_name_task(client, db_session):
+    """Тестирование повторного PUT задачи без смены названия."""
+    task_name = "upsert_put_task"
+    body = {"name": task_name, "status": "В работе"}
+    response = client.put(f"/tasks/{task_name}", json=body)
+    assert response.status_code == 201
+    created = response.json()
+    body = {"name": task_name, "description": "Обновленное описание."}
+    response = client.put(f"/tasks/{task_name}", json=body)
+    assert response.status_code == 200
+    updated = response.json()
+    assert updated["uuid"] == created["uuid"]
+    assert updated["description"] == body["description"]
+    assert updated["status"] == "В работе"
+    rows = db_session.execute(tasks_table.select().where(
+        tasks_table.c.name == task_name)).fetchall()
+    assert len(rows) == 1
+
+
 def test_put_bad_task(client, db_session, bad_params):
     """Тестирование изменения или создания задачи с невалидными данными."""
     for param in bad_params:
@@ -315,3 +642,496 @@ def test_delete_lost_task(client, temp_db):
     """Тестирование удаления несуществующей задачи."""
     response = client.delete("/tasks/task_lost_delete")
     assert response.status_code == 404
+
+
+def test_bulk_tasks(client, db_session, monkeypatch):
+    """Тестирование пакетных создания, изменения и удаления задач."""
+    monkeypatch.setattr(postgres, "BULK_BATCH_SIZE", 2)
+    db_session.execute(tasks_table.insert().values(
+        name="bulk_task_existing", status=TaskStatus.CREATED
+    ))
+    db_session.commit()
+    response = client.post("/tasks/bulk", json=[
+        {"name": "bulk_task_1"},
+        {"name": "bulk_task_2", "status": "В работе"},
+        {"name": "bulk_task_existing"},
+        {"name": "bulk_task_1"}
+    ])
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["status_code"] for r in results] == [201, 201, 400, 400]
+    assert results[1]["task"]["status"] == "В работе"
+    response = client.patch("/tasks/bulk", json=[
+        {"name": "bulk_task_1", "status": "Завершено"},
+        {"name": "bulk_task_2", "description": "Описание"},
+        {"name": "bulk_task_lost", "status": "Завершено"}
+    ])
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["status_code"] for r in results] == [200, 200, 404]
+    assert results[0]["task"]["status"] == "Завершено"
+    assert results[1]["task"]["description"] == "Описание"
+    assert results[1]["task"]["status"] == "В работе"
+    response = client.request(
+        "DELETE",
+        "/tasks/bulk",
+        json=["bulk_task_1", "bulk_task_2", "bulk_task_lost"]
+    )
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["status_code"] for r in results] == [204, 204, 404]
+    rows = db_session.execute(tasks_table.select().where(
+        tasks_table.c.name.like("bulk_task_%"))).fetchall()
+    assert [row.name for row in rows] == ["bulk_task_existing"]
+    response = client.post("/tasks/bulk", json=[])
+    assert response.status_code == 422
+
+
+def test_bulk_tasks_via_api(client):
+    """Тестирование пакетных операций над задачами, созданными через API."""
+    client.post("/tasks/", json={"name": "api_bulk_task_existing"})
+    response = client.post("/tasks/bulk", json=[
+        {"name": "api_bulk_task_1"},
+        {"name": "api_bulk_task_existing"},
+    ])
+    assert [r["status_code"] for r in response.json()] == [201, 400]
+    response = client.patch("/tasks/bulk", json=[
+        {"name": "api_bulk_task_1", "status": "Завершено"},
+        {"name": "api_bulk_task_lost", "status": "Завершено"}
+    ])
+    assert [r["status_code"] for r in response.json()] == [200, 404]
+    response = client.request(
+        "DELETE", "/tasks/bulk", json=["api_bulk_task_1", "api_bulk_task_lost"]
+    )
+    assert [r["status_code"] for r in response.json()] == [204, 404]
+    response = client.get("/tasks/", params={"name_prefix": "api_bulk_task_"})
+    assert [task["name"] for task in response.json()] == [
+        "api_bulk_task_existing"
+    ]
+
+
+@pytest.mark.postgres
+def test_db_pool_metrics(client):
+    """Тестирование метрик пула соединений с БД."""
+    client.get("/tasks/lost_metrics_task")
+    response = client.get("/metrics/db")
+    assert response.status_code == 200
+    metrics = response.json()
+    assert metrics["max_size"] >= metrics["size"] >= metrics["in_use"]
+    assert metrics["acquired_total"] >= 1
+    assert metrics["acquire_wait_seconds_total"] >= 0
+
+
+def test_request_metrics(client, db_session):
+    """Тестирование метрик HTTP-запросов в формате Prometheus."""
+    labels = ("POST", "/tasks/")
+    requests = metrics.HTTP_REQUESTS.get((*labels, "201"))
+    queries, _ = metrics.HTTP_REQUEST_DB_QUERIES.get(labels)
+    response = client.post("/tasks/", json={"name": "metrics_task"})
+    assert response.status_code == 201
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert metrics.HTTP_REQUESTS.get((*labels, "201")) == requests + 1
+    count, total = metrics.HTTP_REQUEST_DB_QUERIES.get(labels)
+    assert count == queries + 1 and total >= 1
+    client.get("/tasks/metrics_task")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert (
+        'http_requests_total{method="GET",route="/tasks/{name}",'
+        'status="200"}' in text
+    )
+    assert (
+        'http_request_duration_seconds_bucket{method="POST",'
+        'route="/tasks/",le="+Inf"}' in text
+    )
+    assert 'db_pool_size{pool="primary"}' in text
+    assert "http_requests_in_progress" in text
+    client.delete("/tasks/metrics_task")
+
+
+def test_slow_query_log(client, db_session, monkeypatch, caplog):
+    """Тестирование журнала медленных запросов и планов запросов."""
+    log = query_log.query_log
+    monkeypatch.setattr(log, "threshold", 1e-9)
+    monkeypatch.setattr(log, "sample_rate", 1.0)
+    # fileConfig в миграциях Alembic отключает созданные ранее логгеры.
+    monkeypatch.setattr(query_log.logger, "disabled", False)
+    client.delete("/metrics/queries")
+    client.post("/tasks/", json={"name": "slow_task"})
+    with caplog.at_level("WARNING", logger="app.utils.query_log"):
+        client.get("/tasks/?status=Создано")
+    slow = [
+        record for record in caplog.records
+        if getattr(record, "sql", "").startswith("SELECT")
+    ]
+    assert slow and "str" in slow[0].params
+    metrics = client.get("/metrics/queries", params={"limit": 5}).json()
+    assert metrics["slow"] >= 2 and len(metrics["top"]) <= 5
+    assert metrics["top"][0]["total_ms"] >= metrics["top"][-1]["total_ms"]
+    for _ in range(50):
+        plans = client.get("/metrics/queries/plans").json()
+        if plans:
+            break
+        time.sleep(0.02)
+    assert plans and plans[0]["sql"].startswith("SELECT")
+    assert "Buffers" in plans[0]["plan"] or "Scan" in plans[0]["plan"]
+    client.delete("/tasks/slow_task")
+    assert query_log.explainable("SELECT 1")
+    assert not query_log.explainable("SELECT 1 FOR UPDATE SKIP LOCKED")
+    assert not query_log.explainable("UPDATE tasks SET version = 1")
+
+
+def test_task_cache(client, db_session):
+    """Тестирование кэширования задачи и его обновления при записи."""
+    task_name = "cached_task"
+    response = client.post("/tasks/", json={"name": task_name})
+    assert response.status_code == 201
+    hits = client.get("/metrics/cache").json()["hits"]
+    response = client.get(f"/tasks/{task_name}")
+    assert response.json()["status"] == "Создано"
+    assert client.get("/metrics/cache").json()["hits"] == hits + 1
+    client.patch(f"/tasks/{task_name}", json={"status": "Завершено"})
+    assert client.get(f"/tasks/{task_name}").json()["status"] == "Завершено"
+    client.delete(f"/tasks/{task_name}")
+    assert client.get(f"/tasks/{task_name}").status_code == 404
+
+
+def test_task_cache_bulk(client):
+    """
+    Тестирование кэша при пакетных операциях и захвате задач: записи
+    удаляются, но не добавляются.
+    """
+    names = [f"cache_bulk_task_{i}" for i in range(5)]
+    size = client.get("/metrics/cache").json()["size"]
+    client.post("/tasks/bulk", json=[{"name": name} for name in names])
+    assert client.get("/metrics/cache").json()["size"] == size
+    client.get(f"/tasks/{names[0]}")
+    client.patch("/tasks/bulk", json=[
+        {"name": name, "description": "Описание"} for name in names
+    ])
+    assert client.get("/metrics/cache").json()["size"] == size
+    task = client.get(f"/tasks/{names[0]}").json()
+    assert task["description"] == "Описание"
+    response = client.post(
+        "/tasks/claim", params={"worker": "worker", "limit": 5}
+    )
+    assert len(response.json()) == 5
+    assert client.get("/metrics/cache").json()["size"] == size
+    assert client.get(f"/tasks/{names[0]}").json()["status"] == "В работе"
+
+
+def test_task_cache_invalidation_by_event(client, db_session):
+    """Тестирование инвалидации кэша по уведомлению из БД."""
+    task_name = "notified_task"
+    client.post("/tasks/", json={"name": task_name})
+    assert client.get(f"/tasks/{task_name}").json()["status"] == "Создано"
+    db_session.execute(tasks_table.update().where(
+        tasks_table.c.name == task_name
+    ).values(status=TaskStatus.COMPLETED))
+    db_session.commit()
+    for _ in range(50):
+        task = client.get(f"/tasks/{task_name}").json()
+        if task["status"] == "Завершено":
+            break
+        time.sleep(0.05)
+    assert task["status"] == "Завершено"
+
+
+def test_task_etag(client, db_session):
+    """Тестирование ETag и условных запросов к задаче."""
+    task_name = "etag_task"
+    response = client.post("/tasks/", json={"name": task_name})
+    etag = response.headers["ETag"]
+    response = client.get(f"/tasks/{task_name}")
+    assert response.headers["ETag"] == etag
+    response = client.get(
+        f"/tasks/{task_name}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    response = client.patch(
+        f"/tasks/{task_name}",
+        json={"status": "В работе"},
+        headers={"If-Match": etag}
+    )
+    assert response.status_code == 200
+    new_etag = response.headers["ETag"]
+    assert new_etag != etag
+    response = client.patch(
+        f"/tasks/{task_name}",
+        json={"status": "В работе"},
+        headers={"If-Match": new_etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] == new_etag
+    response = client.patch(
+        f"/tasks/{task_name}",
+        json={"status": "Завершено"},
+        headers={"If-Match": etag}
+    )
+    assert response.status_code == 412
+    response = client.put(
+        f"/tasks/{task_name}",
+        json={"name": task_name, "description": "Описание"},
+        headers={"If-Match": etag}
+    )
+    assert response.status_code == 412
+    response = client.delete(
+        f"/tasks/{task_name}", headers={"If-Match": etag}
+    )
+    assert response.status_code == 412
+    response = client.put(
+        "/tasks/etag_lost_task", headers={"If-Match": "*"}
+    )
+    assert response.status_code == 412
+    response = client.delete(
+        f"/tasks/{task_name}", headers={"If-Match": new_etag}
+    )
+    assert response.status_code == 204
+
+
+def test_task_if_match_strong(client):
+    """
+    Тестирование строгого сравнения в If-Match: слабые теги и теги
+    с той же версией, но другим uuid не совпадают.
+    """
+    task_name = "etag_strong_task"
+    etag = client.post("/tasks/", json={"name": task_name}).headers["ETag"]
+    version = etag.strip('"').rpartition("-")[2]
+    response = client.get(
+        f"/tasks/{task_name}", headers={"If-None-Match": f"W/{etag}"}
+    )
+    assert response.status_code == 304
+    for if_match in (f"W/{etag}", f'"{"0" * 32}-{version}"', etag[1:-1]):
+        for body in ({"status": "В работе"}, {}):
+            response = client.patch(
+                f"/tasks/{task_name}", json=body,
+                headers={"If-Match": if_match}
+            )
+            assert response.status_code == 412
+        response = client.delete(
+            f"/tasks/{task_name}", headers={"If-Match": if_match}
+        )
+        assert response.status_code == 412
+    response = client.patch(
+        f"/tasks/{task_name}",
+        json={"status": "В работе"},
+        headers={"If-Match": f"W/{etag}, {etag}"}
+    )
+    assert response.status_code == 200
+
+
+def test_tasks_list_etag(client, db_session):
+    """Тестирование ETag списка задач."""
+    params = {"name_prefix": "etag_list_task_"}
+    db_session.execute(tasks_table.insert().values(
+        name="etag_list_task_1", status=TaskStatus.CREATED
+    ))
+    db_session.commit()
+    response = client.get("/tasks/", params=params)
+    etag = response.headers["ETag"]
+    response = client.get(
+        "/tasks/", params=params, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    db_session.execute(tasks_table.update().where(
+        tasks_table.c.name == "etag_list_task_1"
+    ).values(description="Новое описание"))
+    db_session.commit()
+    response = client.get(
+        "/tasks/", params=params, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()[0]["description"] == "Новое описание"
+
+
+def test_tasks_list_etag_commit(client, db_session):
+    """
+    Тестирование версии списка задач: она меняется при фиксации
+    изменения или удаления задачи, но не при изменении без новых значений.
+    """
+    params = {"status": TaskStatus.CREATED.value}
+    db_session.execute(tasks_table.insert().values(
+        name="etag_commit_task", description="Описание",
+        status=TaskStatus.CREATED
+    ))
+    db_session.commit()
+    etag = client.get("/tasks/", params=params).headers["ETag"]
+    db_session.execute(tasks_table.update().where(
+        tasks_table.c.name == "etag_commit_task"
+    ).values(description="Описание"))
+    db_session.commit()
+    response = client.get(
+        "/tasks/", params=params, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    db_session.execute(tasks_table.update().where(
+        tasks_table.c.name == "etag_commit_task"
+    ).values(description="Новое описание"))
+    response = client.get(
+        "/tasks/", params=params, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    db_session.commit()
+    response = client.get(
+        "/tasks/", params=params, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    db_session.execute(tasks_table.delete().where(
+        tasks_table.c.name == "etag_commit_task"
+    ))
+    db_session.commit()
+    response = client.get(
+        "/tasks/", params=params, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200 and response.json() == []
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_json_response_backend(client, db_session, monkeypatch, use_orjson):
+    """Тестирование ответа со списком задач для обоих JSON-кодировщиков."""
+    monkeypatch.setattr(responses, "USE_ORJSON", use_orjson)
+    task_name = f"json_backend_task_{use_orjson}"
+    db_session.execute(tasks_table.insert().values(
+        name=task_name, description="Описание", status=TaskStatus.CREATED
+    ))
+    db_session.commit()
+    response = client.get("/tasks/", params={"name_prefix": task_name})
+    assert response.headers["content-type"] == "application/json"
+    task = response.json()[0]
+    assert task["description"] == "Описание"
+    assert task["status"] == "Создано"
+    assert len(task["uuid"]) == 32
+
+
+def test_claim_tasks(client, db_session):
+    """Тестирование захвата задач обработчиками и аренды задач."""
+    names = [f"claim_task_{i}" for i in range(6)]
+    db_session.execute(tasks_table.insert(), [
+        {"name": name, "status": TaskStatus.CREATED} for name in names
+    ])
+    db_session.commit()
+
+    async def claim_concurrently():
+        return await asyncio.gather(*(
+            tasks_utils.claim_tasks(f"worker_{i}", limit=100)
+            for i in range(4)
+        ))
+
+    claimed = [
+        task_lease.task.name
+        for leases in client.portal.call(claim_concurrently)
+        for task_lease in leases
+    ]
+    assert len(claimed) == len(set(claimed))
+    assert set(names) <= set(claimed)
+    response = client.post("/tasks/claim", params={"worker": "worker_0"})
+    assert response.status_code == 200
+    assert response.json() == []
+
+    name = client.get(
+        "/tasks/", params={"name_prefix": "claim_task_"}
+    ).json()[0]["name"]
+    owner = db_session.execute(
+        tasks_table.select().where(tasks_table.c.name == name)
+    ).one().lease_owner
+    other = "worker_x" if owner != "worker_x" else "worker_y"
+    response = client.post(f"/tasks/{name}/lease", params={"worker": other})
+    assert response.status_code == 409
+    response = client.post(
+        f"/tasks/{name}/lease", params={"worker": owner, "lease": 120}
+    )
+    assert response.status_code == 200
+    assert response.json()["task"]["status"] == "В работе"
+    assert response.json()["lease_owner"] == owner
+    response = client.post(
+        "/tasks/claim_lost_task/lease", params={"worker": owner}
+    )
+    assert response.status_code == 404
+    response = client.delete(
+        f"/tasks/{name}/lease", params={"worker": owner, "status": "Завершено"}
+    )
+    assert response.status_code == 200
+    assert response.json()["status"] == "Завершено"
+    row = db_session.execute(
+        tasks_table.select().where(tasks_table.c.name == name)
+    ).one()
+    assert row.lease_owner is None and row.lease_expires_at is None
+
+    expired = names[-1]
+    db_session.execute(tasks_table.update().where(
+        tasks_table.c.name == expired
+    ).values(lease_expires_at=datetime.now(timezone.utc) - timedelta(1)))
+    db_session.commit()
+    owner = db_session.execute(
+        tasks_table.select().where(tasks_table.c.name == expired)
+    ).one().lease_owner
+    response = client.delete(
+        f"/tasks/{expired}/lease", params={"worker": owner}
+    )
+    assert response.status_code == 409
+    assert client.portal.call(LeaseReaper(batch_size=1).run_once) >= 1
+    assert client.get(f"/tasks/{expired}").json()["status"] == "Создано"
+
+
+@pytest.mark.postgres
+def test_task_events_feed(client):
+    """Тестирование ленты изменений задач (long-poll и SSE)."""
+    for _ in range(100):
+        if client.get("/metrics/cache").json()["events"]["connected"]:
+            break
+        time.sleep(0.05)
+    task_name = "feed_task"
+    params = {"name": task_name, "timeout": 0}
+    cursor = client.get("/tasks/events/poll", params=params).json()["cursor"]
+    client.post("/tasks/", json={"name": task_name})
+    client.patch(f"/tasks/{task_name}", json={"status": "В работе"})
+    client.patch(f"/tasks/{task_name}", json={"status": "В работе"})
+    client.delete(f"/tasks/{task_name}")
+    events = []
+    for _ in range(10):
+        response = client.get("/tasks/events/poll", params={
+            **params, "since": cursor, "timeout": 5
+        })
+        assert response.status_code == 200
+        body = response.json()
+        assert body["reset"] is False
+        events.extend(body["events"])
+        cursor = body["cursor"]
+        if len(events) >= 3:
+            break
+    # Изменение без новых значений не отправляет уведомление.
+    assert [(event["op"], event["status"]) for event in events] == [
+        ("insert", "CREATED"), ("update", "IN_PROGRESS"),
+        ("delete", "IN_PROGRESS")
+    ]
+    response = client.get(
+        "/tasks/events/poll", params={"since": "stale-1", "timeout": 0}
+    )
+    assert response.json()["reset"] is True
+
+    response = client.get(
+        "/tasks/events", headers={"Last-Event-ID": "stale-1"}
+    )
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("event: reset\ndata: ")
+
+    async def read_stream():
+        stream = task_feed.subscribe_events([task_name])
+        try:
+            ready = await anext(stream)
+            task_feed.task_feed.publish({"op": "delete", "name": "other"})
+            task_feed.task_feed.publish({"op": "delete", "name": task_name})
+            return ready, await anext(stream)
+        finally:
+            await stream.aclose()
+
+    ready, event = client.portal.call(read_stream)
+    assert ready.startswith(b"event: ready\n")
+    lines = event.decode("utf-8").split("\n")
+    assert lines[0].startswith("id: ") and lines[1] == "event: task"
+    assert json.loads(lines[2][len("data: "):])["name"] == task_name
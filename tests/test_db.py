@@ -0,0 +1,222 @@
+"""
+Модуль с тестами слоя подключения к БД: маршрутизация читающих
+запросов по репликам, переключение при недоступной реплике,
+закрепление чтений за основной БД после записи и за одной репликой,
+планы медленных запросов на той БД, где выполнен запрос, а также
+статистика запросов, кэш задач, лента событий об изменении задач и
+периодические фоновые задачи.
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy.engine import make_url
+
+from app.db import PooledDatabase, ReadReplicaRouter, _primary_pinned
+from app.models.tasks_model import tasks_table, TaskStatus
+from app.utils.cache import TTLCache
+from app.utils.periodic import PeriodicTask
+from app.utils.query_log import QueryLog, normalize_sql
+from app.utils.task_feed import (
+    FeedReset, TaskFeed, subscribe_events, task_feed
+)
+
+
+def test_read_replica_failover(temp_db):
+    """Тестирование переключения с недоступной реплики на доступную."""
+    unavailable = make_url(temp_db).set(
+        host="127.0.0.1", port=1
+    ).render_as_string(hide_password=False)
+
+    async def scenario():
+        primary = PooledDatabase(temp_db, min_size=1, max_size=2)
+        router = ReadReplicaRouter(primary, [unavailable, temp_db])
+        await primary.connect()
+        await router.connect()
+        try:
+            status = router.status()
+            assert [replica["healthy"] for replica in status] == [
+                False, True
+            ]
+            for _ in range(3):
+                rows = await router.fetch_all(tasks_table.select())
+                assert isinstance(rows, list)
+            assert router.replicas[1].pool_stats()["acquired_total"] == 3
+            assert router.replicas[0].is_connected is False
+            await primary.execute(tasks_table.insert().values(
+                name="replica_pinned_task", status=TaskStatus.CREATED.name
+            ))
+            assert _primary_pinned.get() is True
+            row = await router.fetch_one(tasks_table.select().where(
+                tasks_table.c.name == "replica_pinned_task"
+            ))
+            assert row["name"] == "replica_pinned_task"
+            assert router.replicas[1].pool_stats()["acquired_total"] == 3
+        finally:
+            await router.disconnect()
+            await primary.disconnect()
+
+    asyncio.run(scenario())
+
+
+def test_read_replica_same_database(temp_db):
+    """Тестирование закрепления чтений контекста за одной репликой."""
+    async def scenario():
+        primary = PooledDatabase(temp_db, min_size=1, max_size=2)
+        router = ReadReplicaRouter(primary, [temp_db, temp_db])
+        await router.connect()
+        try:
+            async with router.same_database():
+                for _ in range(4):
+                    await router.fetch_all(tasks_table.select())
+            acquired = [
+                replica.pool_stats()["acquired_total"]
+                for replica in router.replicas
+            ]
+            assert sorted(acquired) == [0, 4]
+            await router.fetch_all(tasks_table.select())
+            await router.fetch_all(tasks_table.select())
+            assert [
+                replica.pool_stats()["acquired_total"]
+                for replica in router.replicas
+            ] == [value + 1 for value in acquired]
+        finally:
+            await router.disconnect()
+
+    asyncio.run(scenario())
+
+
+def test_query_log_explain_backend(temp_db):
+    """Тестирование получения плана на той БД, где выполнен запрос."""
+    async def scenario():
+        primary = PooledDatabase(temp_db, min_size=1, max_size=1)
+        replica = PooledDatabase(temp_db, min_size=1, max_size=1)
+        await primary.connect()
+        await replica.connect()
+        try:
+            log = QueryLog(threshold=1e-9, sample_rate=1.0)
+            await replica.fetch_all(tasks_table.select())
+            log.observe(
+                "fetch_all", ("SELECT count(*) FROM tasks", []), 0.5,
+                replica._backend
+            )
+            await log._explain_task
+            assert "Aggregate" in log.plans()[0]["plan"]
+            assert replica.pool_stats()["acquired_total"] == 2
+            assert primary.pool_stats()["acquired_total"] == 0
+        finally:
+            await replica.disconnect()
+            await primary.disconnect()
+
+    asyncio.run(scenario())
+
+
+def test_query_log_statements():
+    """Тестирование нормализации запросов и вытеснения из статистики."""
+    assert normalize_sql(
+        "SELECT * FROM tasks WHERE tasks.name IN ($1, $2, $3) "
+        "AND tasks.status = 'CREATED' LIMIT 10"
+    ) == (
+        "SELECT * FROM tasks WHERE tasks.name IN (...) "
+        "AND tasks.status = ? LIMIT ?"
+    )
+    assert normalize_sql(
+        "INSERT INTO tasks (name, status) VALUES ($1, $2), ($3, $4)"
+    ) == "INSERT INTO tasks (name, status) VALUES (...)"
+    log = QueryLog(threshold=0, stats_size=2)
+    for sql in (
+        "SELECT 1", "SELECT 2", "SELECT $1", "SELECT name FROM tasks",
+        "SELECT uuid FROM tasks"
+    ):
+        log.observe("fetch_one", (sql, []), 0.001, None)
+    assert log.stats()["statements"] == 2 and log.stats()["evicted"] == 1
+    assert [(item["sql"], item["calls"]) for item in log.top()] == [
+        ("SELECT ?", 3), ("SELECT uuid FROM tasks", 1)
+    ]
+
+
+def test_ttl_cache(monkeypatch):
+    """Тестирование вытеснения, истечения и инвалидации записей кэша."""
+    now = [100.0]
+    monkeypatch.setattr("app.utils.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+    generation = cache.generation
+    cache.invalidate("a")
+    cache.set_if_fresh("a", 1, generation)
+    assert cache.get("a") is None
+    now[0] += 11
+    assert cache.get("c") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["expirations"], stats["size"]) == (1, 1, 0)
+
+
+def test_periodic_task_errors():
+    """Тестирование продолжения фоновой задачи после ошибки запуска."""
+    class FailingTask(PeriodicTask):
+        calls = 0
+
+        async def run_once(self):
+            self.calls += 1
+            if self.calls == 1:
+                raise RuntimeError("run_once")
+
+    async def scenario():
+        task = FailingTask(interval=0)
+        await task.start()
+        while task.calls < 3:
+            await asyncio.sleep(0)
+        assert task.stats() == {"running": True, "errors": 1}
+        await task.stop()
+        assert task.stats()["running"] is False
+
+    asyncio.run(scenario())
+
+
+def test_task_feed():
+    """Тестирование буфера ленты событий и отключения медленных клиентов."""
+    async def scenario():
+        feed = TaskFeed(buffer_size=3, client_buffer=2)
+        start = feed.cursor
+        slow = feed.subscribe()
+        filtered = feed.subscribe(["b"])
+        for name in ("a", "b", "c"):
+            feed.publish({"op": "update", "name": name})
+        assert slow.evicted and feed.stats()["evicted"] == 1
+        with pytest.raises(FeedReset):
+            await slow.get()
+        assert (await filtered.get())["name"] == "b"
+        assert filtered.get_nowait() is None
+        events = feed.read_since(start)
+        assert [event["name"] for event in events] == ["a", "b", "c"]
+        assert feed.read_since(events[0]["id"], ["c"]) == events[2:]
+        feed.publish({"op": "update", "name": "d"})
+        for cursor in (start, "other-0"):
+            with pytest.raises(FeedReset):
+                feed.read_since(cursor)
+        feed.reset()
+        with pytest.raises(FeedReset):
+            filtered.get_nowait()
+
+    asyncio.run(scenario())
+
+
+def test_task_feed_stream_subscription():
+    """Тестирование подписки потока SSE только на время его чтения."""
+    async def scenario():
+        subscribers = task_feed.stats()["subscribers"]
+        stream = subscribe_events(["feed_stream_task"])
+        assert task_feed.stats()["subscribers"] == subscribers
+        await stream.aclose()
+        stream = subscribe_events(["feed_stream_task"])
+        assert (await anext(stream)).startswith(b"event: ready\n")
+        assert task_feed.stats()["subscribers"] == subscribers + 1
+        await stream.aclose()
+        assert task_feed.stats()["subscribers"] == subscribers
+
+    asyncio.run(scenario())
@@ -0,0 +1,80 @@
+"""
+Модуль с тестами неблокирующего логирования: отбрасывание записей при
+заполненной очереди, JSON-формат записей и уровень логирования,
+заданный для отдельного запроса.
+"""
+
+import asyncio
+import json
+import logging
+import queue
+import sys
+
+from app.utils import logs
+from app.utils.logs import (
+    DropQueueHandler, JsonFormatter, RequestLevelFilter,
+    RequestLogLevelMiddleware, request_log_level
+)
+
+
+def make_record(level: int = logging.INFO, **extra) -> logging.LogRecord:
+    return logging.makeLogRecord({
+        "name": "app.test", "levelno": level,
+        "levelname": logging.getLevelName(level),
+        "msg": "Задача %s создана", "args": ("test_task",), **extra
+    })
+
+
+def test_drop_queue_handler():
+    """Тестирование отбрасывания записей при заполненной очереди."""
+    handler = DropQueueHandler(queue.Queue(maxsize=2))
+    for _ in range(5):
+        handler.handle(make_record())
+    assert handler.stats() == {"queued": 2, "capacity": 2, "dropped": 3}
+    record = handler.queue.get_nowait()
+    assert (record.msg, record.args) == ("Задача test_task создана", None)
+
+
+def test_json_formatter():
+    """Тестирование JSON-формата записи с extra и исключением."""
+    try:
+        raise ValueError("ошибка")
+    except ValueError:
+        record = make_record(logging.ERROR, task_name="test_task")
+        record.exc_info = sys.exc_info()
+    handler = DropQueueHandler(queue.Queue())
+    entry = json.loads(JsonFormatter().format(handler.prepare(record)))
+    assert entry["level"] == "ERROR"
+    assert entry["message"] == "Задача test_task создана"
+    assert entry["task_name"] == "test_task"
+    assert "ValueError: ошибка" in entry["exception"]
+
+
+def test_request_log_level(monkeypatch):
+    """
+    Тестирование уровня логирования, заданного заголовком запроса:
+    только подробнее LOG_LEVEL и не ниже LOG_REQUEST_MIN_LEVEL.
+    """
+    monkeypatch.setattr(logs, "LOG_LEVEL", logging.WARNING)
+    monkeypatch.setattr(logs, "LOG_REQUEST_MIN_LEVEL", logging.INFO)
+    level_filter = RequestLevelFilter(logging.WARNING)
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(tuple(
+            level_filter.filter(make_record(level))
+            for level in (logging.DEBUG, logging.INFO, logging.WARNING)
+        ))
+
+    middleware = RequestLogLevelMiddleware(app)
+    for headers in (
+        [(b"x-log-level", b"critical")], [(b"x-log-level", b"info")],
+        [(b"x-log-level", b"debug")], [], [(b"x-log-level", b"bad")]
+    ):
+        scope = {"type": "http", "headers": headers}
+        asyncio.run(middleware(scope, None, None))
+    assert seen == [
+        (False, False, True), (False, True, True), (False, True, True),
+        (False, False, True), (False, False, True)
+    ]
+    assert request_log_level.get() is None
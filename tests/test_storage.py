@@ -0,0 +1,243 @@
+"""
+Модуль с тестами хранилищ задач: одни и те же проверки операций
+выполняются для хранилища в памяти и для PostgreSQL (на тестовой БД),
+а API - с хранилищем в памяти, без подключения к БД.
+"""
+
+import asyncio
+import sys
+
+import pytest
+from anyio.from_thread import start_blocking_portal
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.tasks_model import TaskStatus
+from app.storage import create_repository, postgres
+from app.storage.base import TaskExistsError
+from app.storage.memory import MemoryTaskRepository
+from app.utils import tasks_utils
+
+
+@pytest.fixture(params=[
+    "memory", pytest.param("postgres", marks=pytest.mark.postgres)
+])
+def storage(request, monkeypatch):
+    """
+    Возвращает функцию вызова асинхронных методов и хранилище задач.
+    Для PostgreSQL методы выполняются в цикле событий приложения
+    на тестовой БД.
+    """
+    repository = create_repository(request.param)
+    monkeypatch.setattr(tasks_utils, "repository", repository)
+    if request.param == "postgres":
+        yield request.getfixturevalue("client").portal.call, repository
+    else:
+        with start_blocking_portal() as portal:
+            yield portal.call, repository
+
+
+def test_repository_write(storage):
+    """Тестирование создания, изменения и удаления задач."""
+    call, repository = storage
+    row = call(repository.create, "repo_task", "Описание", TaskStatus.CREATED)
+    assert row["name"] == "repo_task"
+    assert call(
+        repository.create, "repo_task", None, TaskStatus.CREATED
+    ) is None
+    call(repository.create, "repo_other", None, TaskStatus.CREATED)
+    assert call(repository.exists, "repo_task")
+    version = row["version"]
+    task_uuid = str(row["uuid"]).replace("-", "")
+    assert call(
+        repository.update, "repo_task", {"description": "Новое"},
+        [(task_uuid, version + 100)]
+    ) is None
+    updated = call(
+        repository.update, "repo_task", {"status": TaskStatus.COMPLETED},
+        [(task_uuid, version)]
+    )
+    assert updated["status"] == TaskStatus.COMPLETED
+    assert updated["version"] > version
+    with pytest.raises(TaskExistsError):
+        call(repository.update, "repo_task", {"name": "repo_other"})
+    row, inserted = call(repository.upsert, "repo_new", {})
+    assert inserted and row["status"] == TaskStatus.CREATED
+    row, inserted = call(
+        repository.upsert, "repo_new", {"description": "Описание"}
+    )
+    assert not inserted and row["description"] == "Описание"
+    assert call(
+        repository.delete, "repo_new",
+        [(str(row["uuid"]).replace("-", ""), row["version"] + 100)]
+    ) is False
+    assert call(repository.delete, "repo_new")
+    assert call(repository.get, "repo_new") is None
+    rows = call(repository.bulk_create, [
+        ("repo_bulk_1", None, TaskStatus.CREATED),
+        ("repo_task", None, TaskStatus.CREATED),
+        ("repo_bulk_1", "Повтор", TaskStatus.COMPLETED),
+    ])
+    assert [
+        (row["name"], row["description"]) for row in rows
+    ] == [("repo_bulk_1", None)]
+    rows = call(repository.bulk_update, [
+        ("repo_bulk_1", "Описание", None),
+        ("repo_lost", None, TaskStatus.COMPLETED),
+        ("repo_bulk_1", "Новое", None),
+    ])
+    assert [
+        (row["name"], row["description"], row["status"]) for row in rows
+    ] == [("repo_bulk_1", "Новое", TaskStatus.CREATED)]
+    assert call(
+        repository.bulk_delete, ["repo_task", "repo_bulk_1", "repo_task"]
+    ) == {"repo_bulk_1", "repo_task"}
+
+
+def test_repository_bulk_order(storage, monkeypatch):
+    """
+    Тестирование параллельных пакетов с общими задачами в обратном
+    порядке: строки блокируются в порядке названий, без взаимоблокировок.
+    """
+    call, repository = storage
+    monkeypatch.setattr(postgres, "BULK_BATCH_SIZE", 1)
+    names = [f"order_task_{i}" for i in range(10)]
+
+    async def concurrently(method, *arguments):
+        return await asyncio.gather(*(
+            getattr(repository, method)(items) for items in arguments
+        ))
+
+    created = call(
+        concurrently, "bulk_create",
+        [(name, None, TaskStatus.CREATED) for name in names],
+        [(name, None, TaskStatus.CREATED) for name in reversed(names)]
+    )
+    assert sorted(row["name"] for rows in created for row in rows) == names
+    updated = call(
+        concurrently, "bulk_update",
+        [(name, "Первый", None) for name in names],
+        [(name, "Второй", None) for name in reversed(names)]
+    )
+    assert all(len(rows) == len(names) for rows in updated)
+    deleted = call(concurrently, "bulk_delete", names, names[::-1])
+    assert set.union(*deleted) == set(names)
+
+
+def test_repository_lists(storage):
+    """Тестирование списков, версии списка, счетчиков и поиска."""
+    call, repository = storage
+    statuses = [
+        TaskStatus.CREATED, TaskStatus.IN_PROGRESS, TaskStatus.COMPLETED
+    ]
+    call(repository.bulk_create, [
+        (f"list_{i}", "Квартальный отчет" if i < 2 else None, statuses[i % 3])
+        for i in range(6)
+    ] + [("other_task", None, TaskStatus.CREATED)])
+    rows = call(repository.list_tasks, 4, None, None, "list_")
+    assert [row["name"] for row in rows] == [f"list_{i}" for i in range(4)]
+    last = rows[1]
+    rows = call(
+        repository.list_tasks, 10, (last["name"], str(last["uuid"])), None,
+        "list_", True
+    )
+    assert [row["name"] for row in rows] == ["list_3", "list_4"]
+    rows = call(repository.list_tasks, 10, None, TaskStatus.COMPLETED)
+    assert [row["name"] for row in rows] == ["list_2", "list_5"]
+    count, version = call(repository.list_version, None, None, True)
+    assert count == 5
+    counts = call(repository.status_counts, True)
+    assert counts["counters"][TaskStatus.CREATED] == 3
+    assert counts["actual"] == counts["counters"]
+    rows = call(repository.search, "отчет", 1)
+    assert [row["name"] for row in rows] == ["list_0"]
+    first = rows[0]
+    rows = call(
+        repository.search, "отчет", 10,
+        (first["rank"], first["name"], str(first["uuid"]))
+    )
+    assert [row["name"] for row in rows] == ["list_1"]
+    call(repository.update, "list_0", {"description": "Изменено"})
+    assert call(repository.list_version, None, None, True) != (
+        count, version
+    )
+
+
+def test_memory_name_order():
+    """
+    Тестирование порядка названий по кодам символов и префикса из
+    последнего символа Unicode в хранилище в памяти.
+    """
+    top = chr(sys.maxunicode)
+    names = ["a", "a" + top, "a" + top + "b", "b", "Б", top, top + top]
+    repository = MemoryTaskRepository()
+    with start_blocking_portal() as portal:
+        portal.call(repository.bulk_create, [
+            (name, None, TaskStatus.CREATED) for name in reversed(names)
+        ])
+        rows = portal.call(repository.list_tasks, 10)
+        assert [row["name"] for row in rows] == names
+        for prefix, expected in (("a" + top, names[1:3]), (top, names[5:])):
+            rows = portal.call(repository.list_tasks, 10, None, None, prefix)
+            assert [row["name"] for row in rows] == expected
+
+
+def test_repository_leases_and_archive(storage):
+    """Тестирование аренды задач, возврата в очередь и архива."""
+    call, repository = storage
+    for name in ("lease_1", "lease_2", "lease_3"):
+        call(repository.create, name, None, TaskStatus.CREATED)
+    rows = call(repository.claim, "worker", 2, 60)
+    assert [row["name"] for row in rows] == ["lease_1", "lease_2"]
+    assert all(row["lease_owner"] == "worker" for row in rows)
+    assert call(repository.renew_lease, "lease_1", "other", 60) is None
+    assert call(repository.renew_lease, "lease_1", "worker", 120)
+    row = call(
+        repository.release, "lease_1", "worker", TaskStatus.COMPLETED
+    )
+    assert row["status"] == TaskStatus.COMPLETED
+    assert call(repository.get, "lease_1")["status"] == TaskStatus.COMPLETED
+    call(repository.claim, "worker", 1, -1)
+    assert call(
+        repository.release, "lease_3", "worker", TaskStatus.COMPLETED
+    ) is None
+    assert call(repository.renew_lease, "lease_3", "worker", 60) is None
+    assert call(repository.reap_expired_leases, 10) == ["lease_3"]
+    assert call(repository.archive_completed, 0, 10) == ["lease_1"]
+    assert call(repository.get, "lease_1") is None
+    assert call(repository.get_archived, "lease_1")["name"] == "lease_1"
+    rows = call(repository.list_archived, 10, None, "lease_")
+    assert [row["name"] for row in rows] == ["lease_1"]
+
+
+def test_memory_storage_api(monkeypatch):
+    """Тестирование API с хранилищем в памяти (без БД)."""
+    monkeypatch.setattr(tasks_utils, "repository", MemoryTaskRepository())
+    # Без запуска lifespan: хранилищу в памяти подключение не нужно.
+    client = TestClient(app)
+    response = client.post("/tasks/", json={"name": "memory_task"})
+    assert response.status_code == 201
+    response = client.post("/tasks/", json={"name": "memory_task"})
+    assert response.status_code == 400
+    response = client.get("/tasks/")
+    etag = response.headers["ETag"]
+    assert [task["name"] for task in response.json()] == ["memory_task"]
+    response = client.get("/tasks/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    response = client.patch(
+        "/tasks/memory_task", json={"description": "Описание"}
+    )
+    assert response.json()["description"] == "Описание"
+    response = client.put(
+        "/tasks/memory_task", json={"name": "memory_renamed"}
+    )
+    assert response.status_code == 200
+    assert client.get("/tasks/memory_task").status_code == 404
+    response = client.get("/tasks/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    response = client.post("/tasks/claim", params={"worker": "worker"})
+    assert response.json()[0]["lease_owner"] == "worker"
+    response = client.get("/tasks/stats")
+    assert response.json()["counts"]["В работе"] == 1
+    assert client.delete("/tasks/memory_renamed").status_code == 204
+    assert client.get("/tasks/memory_renamed").status_code == 404